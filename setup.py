@@ -11,5 +11,12 @@ setup(
     packages=["uaclient", "uaclient.theme"],
     license="GNU General Public License",
     install_requires=["asyncua", "opcua-widgets>=0.6.0", "PyQt5"],
-    entry_points={"console_scripts": ["opc-explorer = uaclient.mainwindow:main"]},
+    extras_require={"parquet": ["pyarrow"]},
+    entry_points={
+        "console_scripts": [
+            "opc-explorer = uaclient.mainwindow:main",
+            "opc-explorer-export = uaclient.history_export:main",
+            "opc-explorer-snapshot = uaclient.snapshot:main",
+        ]
+    },
 )
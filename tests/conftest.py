@@ -1,5 +1,10 @@
+from datetime import datetime, timedelta, timezone
+import time
+
 import pytest
+from asyncua import ua
 from asyncua.sync import Server
+from PyQt5.QtCore import QCoreApplication, QEvent
 from uaclient.mainwindow import Window
 
 
@@ -18,10 +23,70 @@ def server(url):
 
 
 @pytest.fixture
-def client(qtbot, url, server):
-    client = Window()
-    qtbot.addWidget = client
+def make_window(qtbot):
+    """
+    create main windows destroyed in the GUI thread after the test,
+    not by whichever thread collects them
+    """
+    windows = []
+
+    def make():
+        windows.append(Window())
+        return windows[-1]
+
+    yield make
+    for window in windows:
+        window.disconnect()
+        window.wait_disconnected(10)
+        window.uaclient.loop.stop()
+        window.deleteLater()
+    QCoreApplication.sendPostedEvents(None, QEvent.DeferredDelete)
+
+
+@pytest.fixture
+def client(qtbot, url, server, make_window):
+    client = make_window()
     client.ui.addrComboBox.setCurrentText(url)
-    client.connect()
+    with qtbot.waitSignal(client.connected, timeout=10000):
+        client.connect()
     yield client
-    client.disconnect()
+
+
+@pytest.fixture
+def historized_variable(server):
+    namepace = server.register_namespace("custom_namespace")
+    variable = server.nodes.objects.add_variable(namepace, "history_variable", 0.0)
+    server.tloop.post(
+        server.aio_obj.historize_node_data_change(variable.aio_obj, period=None)
+    )
+    now = datetime.now(timezone.utc)
+    for i in range(1, 11):
+        variable.write_value(
+            ua.DataValue(
+                ua.Variant(float(i)), SourceTimestamp=now - timedelta(seconds=100 - i)
+            )
+        )
+    # changes are recorded asynchronously by the server
+    deadline = time.time() + 5
+    while len(variable.read_raw_history()) < 11 and time.time() < deadline:
+        time.sleep(0.05)
+    yield variable, now
+
+
+@pytest.fixture
+def fire_model_change(server):
+    """
+    fire a GeneralModelChangeEvent, asyncua servers do not on their own
+    """
+
+    def fire(*changes):
+        generator = server.get_event_generator(ua.ObjectIds.GeneralModelChangeEventType)
+        generator.event.Changes = [
+            ua.ModelChangeStructureDataType(Affected=nodeid, Verb=verb)
+            for nodeid, verb in changes
+        ]
+        # asyncua stores the DataType NodeId where a VariantType is needed
+        generator.event.data_types["Changes"] = ua.VariantType.ExtensionObject
+        generator.trigger()
+
+    yield fire
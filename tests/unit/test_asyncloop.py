@@ -0,0 +1,62 @@
+import asyncio
+import threading
+
+import pytest
+
+from uaclient.asyncloop import AsyncLoop
+
+
+@pytest.fixture
+def loop():
+    loop = AsyncLoop()
+    yield loop
+    loop.stop()
+
+
+async def answer():
+    await asyncio.sleep(0)
+    return 42, threading.current_thread()
+
+
+async def fail():
+    raise ValueError("failed")
+
+
+def test_run(loop):
+    result, thread = loop.run(answer())
+    assert result == 42
+    assert thread is loop.tloop
+
+
+def test_submit_callback_in_gui_thread(qtbot, loop):
+    results = []
+    loop.submit(
+        answer(), callback=lambda res: results.append(threading.current_thread())
+    )
+    qtbot.waitUntil(lambda: len(results) == 1)
+    assert results[0] is threading.main_thread()
+
+
+def test_submit_errback(qtbot, loop):
+    errors = []
+    loop.submit(fail(), callback=lambda res: errors.append(None), errback=errors.append)
+    qtbot.waitUntil(lambda: len(errors) == 1)
+    assert isinstance(errors[0], ValueError)
+
+
+def test_progress_in_gui_thread(qtbot, loop):
+    reports = []
+
+    async def count(progress):
+        for i in range(3):
+            progress(i)
+        return len(loop._progress)
+
+    progress = loop.progress(lambda i: reports.append((i, threading.current_thread())))
+    assert loop.run(count(progress)) == 1
+    qtbot.waitUntil(lambda: len(reports) == 3)
+    assert [i for i, _ in reports] == [0, 1, 2]
+    assert all(thread is threading.main_thread() for _, thread in reports)
+    # the callback is released once the loop thread drops the function
+    del progress
+    qtbot.waitUntil(lambda: not loop._progress)
@@ -0,0 +1,53 @@
+from asyncua import ua
+
+from uaclient.browse_cache import BrowseCache, BrowseFilter, CHILDREN
+
+
+def descs(count):
+    return [ua.ReferenceDescription() for _ in range(count)]
+
+
+def test_lru_eviction():
+    cache = BrowseCache(max_references=5)
+    a, b, c = ua.NodeId(1), ua.NodeId(2), ua.NodeId(3)
+    cache.put(a, descs(2))
+    cache.put(b, descs(2))
+    assert cache.get(a) is not None  # b is now the least recently used
+    cache.put(c, descs(2))
+    assert cache.get(b) is None
+    assert cache.get(a) is not None and cache.get(c) is not None
+    assert cache.size == 4
+
+    # empty nodes count too, a single large node is kept
+    cache.put(b, descs(0))
+    assert len(cache) == 3 and cache.size == 5
+    cache.put(b, descs(10))
+    assert len(cache) == 1 and cache.size == 10
+
+
+def test_filters_and_invalidate():
+    cache = BrowseCache()
+    nodeid = ua.NodeId(1)
+    inverse = BrowseFilter(direction=ua.BrowseDirection.Inverse)
+    assert BrowseFilter() == CHILDREN and hash(BrowseFilter()) == hash(CHILDREN)
+    assert inverse != CHILDREN
+    cache.put(nodeid, descs(1))
+    cache.put(nodeid, descs(2), inverse)
+    assert len(cache.get(nodeid, inverse)) == 2
+    cache.put(ua.NodeId(2), descs(1))
+    cache.invalidate(nodeid)
+    assert cache.get(nodeid) is None and cache.get(nodeid, inverse) is None
+    assert len(cache) == 1 and cache.size == 1
+    cache.clear()
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_referrers():
+    cache = BrowseCache()
+    parent, child = ua.NodeId(1), ua.NodeId(2)
+    desc = ua.ReferenceDescription()
+    desc.NodeId = child
+    cache.put(parent, [desc])
+    cache.put(child, descs(0))
+    assert cache.referrers(child) == {parent}
+    assert cache.referrers(parent) == set()
@@ -1,5 +1,13 @@
+import asyncio
+import itertools
+import time
+from unittest.mock import patch
+
+import pytest
 from PyQt5.QtCore import Qt
-from uaclient.mainwindow import Window
+from PyQt5.QtWidgets import QApplication, QStyleOptionViewItem
+from asyncua import ua
+from uaclient.snapshot_widget import SnapshotWidget
 
 
 def get_attr_value(text, client):
@@ -16,10 +24,23 @@ def get_attr_value(text, client):
     return item.data(Qt.UserRole).value
 
 
-def test_select_objects(client, server):
+def wait_for_restored_node(qtbot, client, url):
+    saved_nodeid = client.settings.value("current_node")[url]
+
+    def restored():
+        current_node = client.tree_ui.get_current_node()
+        return (
+            current_node is not None and current_node.nodeid.to_string() == saved_nodeid
+        )
+
+    qtbot.waitUntil(restored)
+
+
+def test_select_objects(qtbot, client, server):
     objects = server.nodes.objects
     client.tree_ui.expand_to_node(objects)
-    assert objects == client.tree_ui.get_current_node()
+    qtbot.waitUntil(lambda: objects == client.tree_ui.get_current_node())
+    qtbot.waitUntil(lambda: client.attrs_ui.current_node == objects)
     assert client.attrs_ui.model.rowCount() > 6
     assert client.refs_ui.model.rowCount() > 1
 
@@ -27,10 +48,11 @@ def test_select_objects(client, server):
     assert data == objects.nodeid
 
 
-def test_select_server_node(client, server):
+def test_select_server_node(qtbot, client, server):
     server_node = server.nodes.server
     client.tree_ui.expand_to_node(server_node)
-    assert server_node == client.tree_ui.get_current_node()
+    qtbot.waitUntil(lambda: server_node == client.tree_ui.get_current_node())
+    qtbot.waitUntil(lambda: client.attrs_ui.current_node == server_node)
     assert client.attrs_ui.model.rowCount() > 6
     assert client.refs_ui.model.rowCount() > 10
 
@@ -38,23 +60,31 @@ def test_select_server_node(client, server):
     assert data == server_node.nodeid
 
 
-def test_connect(server, url, client):
+def test_connect(qtbot, server, url, client):
     assert client._address_list[0] == "opc.tcp://localhost:48400/freeopcua/server/"
     assert client.uaclient._connected
-    current_node = client.tree_ui.get_current_node()
-    assert (
-        client.uaclient.settings.value("current_node")[url]
-        == current_node.nodeid.to_string()
-    )
+    wait_for_restored_node(qtbot, client, url)
 
 
-def test_disconnect(qtbot, url, server):
-    client = Window()
-    qtbot.addWidget = client
+def test_disconnect(qtbot, url, server, make_window):
+    client = make_window()
     client.ui.addrComboBox.setCurrentText(url)
-    client.connect()
+    with qtbot.waitSignal(client.connected, timeout=10000):
+        client.connect()
+    wait_for_restored_node(qtbot, client, url)
     current_node = client.tree_ui.get_current_node()
-    client.disconnect()
+    closed = client.uaclient.client.aio_obj.disconnect
+
+    async def slow_disconnect():
+        await asyncio.sleep(1)
+        await closed()
+
+    client.uaclient.client.aio_obj.disconnect = slow_disconnect
+    started = time.monotonic()
+    future = client.disconnect()
+    # the session is closed in the background
+    assert time.monotonic() - started < 0.5 and not future.done()
+    qtbot.waitUntil(future.done, timeout=5000)
 
     assert not client.uaclient._connected
     assert (
@@ -66,9 +96,352 @@ def test_disconnect(qtbot, url, server):
     assert len(client.event_ui._subscribed_nodes) == 0
 
 
-def test_load_current_node(client, server, url):
+def test_connect_restores_path(qtbot, url, server, make_window):
+    server_node = server.nodes.server
+    client = make_window()
+    client.ui.addrComboBox.setCurrentText(url)
+    with qtbot.waitSignal(client.connected, timeout=10000):
+        client.connect()
+    client.tree_ui.expand_to_node(server_node)
+    qtbot.waitUntil(lambda: server_node == client.get_current_node())
+    client.disconnect()
+    assert client.settings.value("current_path")[url] == [
+        node.nodeid.to_string()
+        for node in (server.nodes.root, server.nodes.objects, server_node)
+    ]
+
+    # the path was browsed while connecting, expanding it reads nothing
+    get_children = patch.object(
+        client.uaclient,
+        "get_children_async",
+        wraps=client.uaclient.get_children_async,
+    )
+    with get_children as get_children_async:
+        with qtbot.waitSignal(client.connected, timeout=10000):
+            client.connect()
+        assert server_node == client.get_current_node()
+        assert get_children_async.call_count == 0
+    assert "browse" in client.uaclient.connect_timings
+    client.disconnect()
+
+
+def test_prewarm(qtbot, url, server, make_window):
+    client = make_window()
+    client.ui.actionPrewarm.setChecked(True)
+    client.ui.addrComboBox.setCurrentText(url)
+    client._schedule_prewarm(url)
+    qtbot.waitUntil(lambda: client.uaclient._warm is not None, timeout=10000)
+    warm = client.uaclient._warm[3]
+    with qtbot.waitSignal(client.connected, timeout=10000):
+        client.connect()
+    assert client.uaclient.client is warm
+    client.disconnect()
+
+
+def test_probe_addresses(qtbot, client, url):
+    combo = client.ui.addrComboBox
+    if combo.findText(url) < 0:
+        combo.addItem(url)
+    index = combo.findText(url)
+    qtbot.waitUntil(lambda: client._probe_future.done())
+    client.probe_addresses()
+    delegate = combo.itemDelegate()
+    qtbot.waitUntil(lambda: url in delegate.status, timeout=10000)
+    status = delegate.status[url]
+    assert status.endswith(" ms")
+    option = QStyleOptionViewItem()
+    delegate.initStyleOption(option, combo.model().index(index, 0))
+    assert option.text == f"{url}    ({status})"
+
+
+def test_expand_all(qtbot, client, server):
+    server_node = server.nodes.server
+    client.tree_ui.expand_to_node(server_node)
+    qtbot.waitUntil(lambda: server_node == client.tree_ui.get_current_node())
+    tree = client.tree_ui
+    path = ["ServerStatus", "BuildInfo", "ProductName"]
+
+    def expanded():
+        idx = tree.view.currentIndex().sibling(tree.view.currentIndex().row(), 0)
+        for name in path:
+            rows = [
+                tree.model.index(row, 0, idx) for row in range(tree.model.rowCount(idx))
+            ]
+            idx = next((i for i in rows if i.data() == name), None)
+            if idx is None or not tree.view.isExpanded(idx.parent()):
+                return False
+        return True
+
+    uaclient = client.uaclient
+    with patch.object(
+        uaclient, "get_children_list_async", wraps=uaclient.get_children_list_async
+    ) as browse_levels, patch.object(
+        uaclient, "get_children_async", wraps=uaclient.get_children_async
+    ) as browse_one:
+        tree.expand_all_current()
+        qtbot.waitUntil(expanded, timeout=10000)
+        assert browse_one.call_count == 0
+        assert browse_levels.call_count <= len(path) + 1
+
+
+def test_load_current_node(qtbot, client, server, url):
     server_node = server.nodes.server
     current_nodes = client.settings.value("current_node", None)
     current_nodes[url] = server_node.nodeid.to_string()
     client.settings.setValue("current_node", current_nodes)
-    assert server_node == client.get_current_node()
+    qtbot.waitUntil(lambda: server_node == client.get_current_node())
+
+
+def test_model_change_updates_tree(qtbot, client, server, fire_model_change):
+    def names(node):
+        item = next(i for i in client.tree_ui._items() if i.data(Qt.UserRole) == node)
+        return [item.child(row, 0).text() for row in range(item.rowCount())]
+
+    uaclient = client.uaclient
+    uaclient.subscribe_model_changes(client._model_change_handler)
+    idx = server.register_namespace("model_change_tree")
+    folder = server.nodes.objects.add_folder(idx, "model_change_folder")
+    old = folder.add_variable(idx, "a", 1.0)
+    sub = folder.add_folder(idx, "sub")
+    deep = sub.add_variable(idx, "deep", 1.0)
+    # Objects was browsed while connecting
+    fire_model_change((folder.nodeid, ua.ModelChangeStructureVerbMask.NodeAdded))
+    qtbot.waitUntil(lambda: "model_change_folder" in names(server.nodes.objects))
+    client.tree_ui.expand_to_node(deep)
+    qtbot.waitUntil(lambda: client.get_current_node() == deep, timeout=10000)
+    assert names(folder) == ["a", "sub"]
+    new = folder.add_variable(idx, "b", 2.0)
+    old.delete()
+    fire_model_change(
+        (new.nodeid, ua.ModelChangeStructureVerbMask.NodeAdded),
+        (old.nodeid, ua.ModelChangeStructureVerbMask.NodeDeleted),
+    )
+    qtbot.waitUntil(lambda: names(folder) == ["b", "sub"], timeout=10000)
+    # what is expanded below the kept rows stays
+    assert names(sub) == ["deep"]
+    assert client.get_current_node() == deep
+
+
+def test_node_view_batched(qtbot, client, server):
+    server_node = server.nodes.server
+    client.tree_ui.expand_to_node(server_node)
+    qtbot.waitUntil(lambda: client.attrs_ui.current_node == server_node)
+    tree = client.tree_ui
+    idx = tree.view.currentIndex()
+    rows = [tree.model.index(row, 0, idx) for row in range(tree.model.rowCount(idx))]
+    method = next(i for i in rows if i.data() == "GetMonitoredItems")
+    uaclient = client.uaclient
+    with patch.object(
+        uaclient, "read_node_view_async", wraps=uaclient.read_node_view_async
+    ) as read, patch.object(
+        uaclient, "browse_async", wraps=uaclient.browse_async
+    ) as browse:
+        # moving quickly over rows reads the last one only
+        for i in rows[:5] + [method]:
+            tree.view.setCurrentIndex(i)
+        assert client.ui.actionCall.isEnabled()
+        qtbot.waitUntil(lambda: client.refs_ui.node == method.data(Qt.UserRole))
+        assert read.call_count == 1 and browse.call_count == 1
+        assert get_attr_value("NodeClass", client) == ua.NodeClass.Method
+
+
+@pytest.fixture
+def paging(client):
+    """
+    asyncua servers ignore RequestedMaxReferencesPerNode, page like a server
+    would. yield {continuation point: (references still to return, page
+    size)} and the list of released points
+    """
+    aio_client = client.uaclient.client.aio_obj.uaclient
+    browse = aio_client.browse
+    points = itertools.count()
+    held = {}
+    released = []
+
+    def page(result, refs, size):
+        result.References = refs[:size] if size else refs
+        if size and len(refs) > size:
+            result.ContinuationPoint = str(next(points)).encode()
+            held[result.ContinuationPoint] = (refs[size:], size)
+        return result
+
+    async def paged_browse(params):
+        size = params.RequestedMaxReferencesPerNode
+        return [
+            page(result, result.References, size) for result in await browse(params)
+        ]
+
+    async def paged_browse_next(params):
+        results = []
+        for point in params.ContinuationPoints:
+            if point not in held:
+                result = ua.BrowseResult()
+                result.StatusCode = ua.StatusCode(
+                    ua.StatusCodes.BadContinuationPointInvalid
+                )
+                results.append(result)
+                continue
+            refs, size = held.pop(point)
+            if params.ReleaseContinuationPoints:
+                released.append(point)
+                results.append(ua.BrowseResult())
+            else:
+                results.append(page(ua.BrowseResult(), refs, size))
+        return results
+
+    with patch.object(aio_client, "browse", paged_browse), patch.object(
+        aio_client, "browse_next", paged_browse_next
+    ):
+        yield held, released
+
+
+def add_paged_folder(server, name, count):
+    idx = server.register_namespace("paged_tree")
+    folder = server.nodes.objects.add_folder(idx, name)
+    for i in range(count):
+        folder.add_variable(idx, f"v{i:02d}", float(i))
+    return folder
+
+
+def show_paged_folder(qtbot, client, folder):
+    # expanded with its first page, return its index
+    tree = client.tree_ui
+    tree.expand_to_node(folder)
+    qtbot.waitUntil(lambda: client.get_current_node() == folder, timeout=10000)
+    idx = tree.view.currentIndex()
+    tree.view.expand(idx)
+    qtbot.waitUntil(lambda: tree.model.rowCount(idx) == tree.model.page_size + 1)
+    return idx
+
+
+def child_names(tree, idx):
+    return [
+        tree.model.index(row, 0, idx).data() for row in range(tree.model.rowCount(idx))
+    ]
+
+
+def test_paged_folder(qtbot, client, server, paging):
+    held, released = paging
+    folder = add_paged_folder(server, "paged_folder", 12)
+    tree = client.tree_ui
+    tree.model.page_size = 5
+    objects = next(
+        i for i in tree._items() if i.data(Qt.UserRole) == server.nodes.objects
+    )
+    tree.reload(objects)
+    idx = show_paged_folder(qtbot, client, folder)
+    more = tree.model.index(5, 0, idx)
+    assert more.data() == "Load more..." and tree.get_current_node(more) is None
+    assert tree.model.has_more_pages(idx)
+    # reloading gives the continuation point back to the server
+    tree.reload(tree.model.itemFromIndex(idx))
+    qtbot.waitUntil(lambda: len(released) == 1)
+    assert held == {}
+    # pages are fetched once their "Load more..." row is visible
+    client.show()
+    tree.view.expand(idx)
+    qtbot.waitUntil(lambda: tree.model.rowCount(idx) > 6, timeout=10000)
+    tree.view.scrollToBottom()
+    qtbot.waitUntil(lambda: tree.model.rowCount(idx) == 12, timeout=10000)
+    assert child_names(tree, idx) == [f"v{i:02d}" for i in range(12)]
+    assert held == {} and not tree.model.has_more_pages(idx)
+
+
+def test_paged_folder_points(qtbot, client, server, paging):
+    held, released = paging
+    first = add_paged_folder(server, "paged_first", 8)
+    second = add_paged_folder(server, "paged_second", 8)
+    tree = client.tree_ui
+    tree.model.page_size = 3
+    tree.model.max_held_pages = 1
+    objects = next(
+        i for i in tree._items() if i.data(Qt.UserRole) == server.nodes.objects
+    )
+    tree.reload(objects)
+    first_idx = show_paged_folder(qtbot, client, first)
+    assert len(held) == 1 and client.uaclient.held_continuation_points == 1
+    # the oldest point is released for the new one
+    second_idx = show_paged_folder(qtbot, client, second)
+    qtbot.waitUntil(lambda: len(released) == 1)
+    assert len(held) == 1 and client.uaclient.held_continuation_points == 1
+    # its folder is browsed again, without the rows shown twice
+    assert tree.model.has_more_pages(first_idx)
+    tree.model.fetch_next_page(first_idx)
+    qtbot.waitUntil(lambda: tree.model.rowCount(first_idx) == 7)
+    assert child_names(tree, first_idx)[:6] == [f"v{i:02d}" for i in range(6)]
+    # an expired point is replaced by browsing again as well
+    qtbot.waitUntil(lambda: len(released) == 2)
+    held.clear()
+    tree.model.fetch_next_page(first_idx)
+    qtbot.waitUntil(lambda: tree.model.rowCount(first_idx) == 8)
+    assert child_names(tree, first_idx) == [f"v{i:02d}" for i in range(8)]
+    assert tree.model.rowCount(second_idx) == 4
+
+
+def test_paged_folder_reordered(qtbot, client, server, paging):
+    held, _ = paging
+    folder = add_paged_folder(server, "paged_reordered", 8)
+    tree = client.tree_ui
+    tree.model.page_size = 3
+    tree.reload()
+    show_paged_folder(qtbot, client, folder)
+    assert held
+    # reloading above the folder gives its continuation point back too
+    tree.reload()
+    qtbot.waitUntil(lambda: held == {})
+    tree.model.max_held_pages = 0
+    idx = show_paged_folder(qtbot, client, folder)
+    qtbot.waitUntil(lambda: held == {})
+    browse_page = client.uaclient.browse_page_async
+
+    async def reordered(node, max_references, cache=True):
+        descs, _ = await browse_page(node, 0, cache=False)
+        return descs[::-1], None
+
+    # browsed again from a server listing the children the other way round
+    with patch.object(client.uaclient, "browse_page_async", reordered):
+        tree.model.fetch_next_page(idx)
+        qtbot.waitUntil(lambda: not tree.model.is_fetching(idx))
+    assert child_names(tree, idx) == [f"v{i:02d}" for i in (0, 1, 2, 7, 6, 5, 4, 3)]
+
+
+def test_crawl_snapshot(qtbot, client, tmp_path):
+    client.settings.setValue("snapshot_directory", str(tmp_path))
+    try:
+        client.ui.actionCrawlSnapshot.trigger()
+        qtbot.waitUntil(
+            lambda: len(client.findChildren(SnapshotWidget)) == 1, timeout=30000
+        )
+    finally:
+        client.settings.remove("snapshot_directory")
+    (widget,) = client.findChildren(SnapshotWidget)
+    assert widget.snapshot.read_meta("url") == client.ui.addrComboBox.currentText()
+    assert widget.show_node(client.uaclient.client.nodes.server.nodeid.to_string())
+    widget.close()
+
+
+def test_copy_path(qtbot, client, server):
+    server_node = server.nodes.server
+    client.tree_ui.expand_to_node(server_node)
+    qtbot.waitUntil(lambda: server_node == client.get_current_node())
+    QApplication.clipboard().clear()
+    client.tree_ui.copy_path()
+    qtbot.waitUntil(
+        lambda: QApplication.clipboard().text() == "0:Root,0:Objects,0:Server"
+    )
+
+
+def test_reload_node_view(qtbot, client, server):
+    server_node = server.nodes.server
+    client.tree_ui.expand_to_node(server_node)
+    qtbot.waitUntil(lambda: server_node == client.get_current_node())
+    qtbot.waitUntil(lambda: client.attrs_ui.model.rowCount() > 0)
+    client.attrs_ui.clear()
+    client.refs_ui.clear()
+    # reloading reads in the background, the rows come back afterwards
+    client.attrs_ui.reload()
+    client.refs_ui.node = server_node
+    client.refs_ui.reload()
+    qtbot.waitUntil(lambda: client.attrs_ui.model.rowCount() > 0)
+    qtbot.waitUntil(lambda: client.refs_ui.model.rowCount() > 0)
+    assert client.attrs_ui.current_node == server_node
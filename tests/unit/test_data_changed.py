@@ -1,6 +1,10 @@
 import pytest
-from uaclient.mainwindow import DataChangeUI
-from PyQt5.QtGui import QStandardItemModel
+from datetime import datetime, timezone
+from uaclient.mainwindow import DataChangeUI, DataChangeCoalescer
+from uaclient.subscription_model import SubscriptionModel
+from PyQt5.QtCore import Qt, QMimeData
+from PyQt5.QtWidgets import QWidget
+from asyncua import ua
 from unittest.mock import patch, Mock
 
 
@@ -10,9 +14,13 @@ def server_node(server):
 
 
 @pytest.fixture
-def window(server_node):
-    window = Mock()
-    window.get_current_node.return_value = server_node
+def window(qtbot, server_node):
+    # a widget owns the handlers, everything else is mocked
+    window = QWidget()
+    qtbot.addWidget(window)
+    for name in ("ui", "addAction", "get_selected_nodes", "show_error"):
+        setattr(window, name, Mock())
+    window.get_current_node = Mock(return_value=server_node)
     yield window
 
 
@@ -46,7 +54,101 @@ def test_clear(window, server_node, uaclient):
     datachange_ui = DataChangeUI(window, uaclient)
     datachange_ui._subscribe(server_node)
 
-    with patch.object(QStandardItemModel, "clear") as q_clear:
+    with patch.object(SubscriptionModel, "clear") as q_clear:
         datachange_ui.clear()
     assert len(datachange_ui._subscribed_nodes) == 0
     q_clear.assert_called_once()
+
+
+def test_update_subscription_model(window, server, uaclient):
+    datachange_ui = DataChangeUI(window, uaclient)
+    model = datachange_ui.model
+    nodes = [server.nodes.server, server.nodes.objects, server.nodes.types]
+    for node in nodes:
+        datachange_ui._subscribe(node)
+    assert [model.row_of(node) for node in nodes] == [0, 1, 2]
+
+    window.get_current_node.return_value = nodes[0]
+    datachange_ui._unsubscribe()
+    assert nodes[0] not in model
+    assert [model.row_of(node) for node in nodes[1:]] == [0, 1]
+
+    timestamp = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    model.update(nodes[2], ua.DataValue(ua.Variant(1.5), SourceTimestamp=timestamp))
+    assert model.index(1, 0).data(Qt.UserRole) == nodes[2]
+    assert model.index(1, 1).data() == "1.5"
+    assert model.index(1, 2).data() == timestamp.isoformat()
+    assert model.index(0, 1).data() == "No Data yet"
+    assert model.index(0, 2).data() == ""
+
+    datachange_ui.clear()
+    assert model.rowCount() == 0
+    assert nodes[2] not in model
+
+
+def test_coalescer(qtbot, server):
+    updates = []
+    coalescer = DataChangeCoalescer(lambda *args: updates.append(args), rate=50)
+    dropped = []
+    coalescer.dropped_changed.connect(dropped.append)
+    server_node, objects = server.nodes.server, server.nodes.objects
+    for i in range(10):
+        coalescer.push(server_node, str(i), "timestamp")
+    coalescer.push(objects, "value", "timestamp")
+
+    qtbot.waitUntil(lambda: len(updates) == 2)
+    assert (server_node, "9", "timestamp") in updates
+    assert (objects, "value", "timestamp") in updates
+    assert coalescer.dropped == 9
+    assert dropped == [9]
+
+    coalescer.push(server_node, "10", "timestamp")
+    coalescer.clear()
+    coalescer.flush()
+    assert len(updates) == 2
+    assert dropped == [9, 0]
+
+
+def test_show_dropped(window, uaclient, server):
+    window.ui.subDockWidget.windowTitle.return_value = "Subscriptions"
+    datachange_ui = DataChangeUI(window, uaclient)
+    for value in (1.0, 2.0, 3.0):
+        datachange_ui._coalescer.push(server.nodes.server, ua.DataValue(value))
+    datachange_ui._coalescer.flush()
+    window.ui.subDockWidget.setWindowTitle.assert_called_with(
+        "Subscriptions (2 skipped)"
+    )
+    datachange_ui.clear()
+    window.ui.subDockWidget.setWindowTitle.assert_called_with("Subscriptions")
+
+
+@pytest.mark.parametrize(
+    "rate, interval",
+    [(50, 20), ("10", 100), (0, 1000), (-5, 1000), (1e6, 1), ("x", 33), (None, 33)],
+)
+def test_coalescer_rate(qtbot, rate, interval):
+    coalescer = DataChangeCoalescer(lambda *args: None, rate)
+    assert coalescer._timer.interval() == interval
+    coalescer.set_rate(float("nan"))
+    assert coalescer._timer.interval() == 33
+
+
+def test_drop_nodes(window, server, uaclient):
+    datachange_ui = DataChangeUI(window, uaclient)
+    nodes = [server.nodes.server, server.nodes.objects, server.nodes.types]
+    uaclient.client.get_node.side_effect = {
+        node.nodeid.to_string(): node for node in nodes
+    }.get
+    mdata = QMimeData()
+    mdata.setText("\n".join(node.nodeid.to_string() for node in nodes))
+    datachange_ui.dropMimeData(mdata, Qt.CopyAction, -1, -1, None)
+    assert datachange_ui._subscribed_nodes == nodes
+    uaclient.subscribe_datachange_list_async.assert_called_once_with(
+        nodes, datachange_ui._subhandler
+    )
+
+    window.get_selected_nodes.return_value = [nodes[0], nodes[2]]
+    datachange_ui._unsubscribe_selected()
+    assert datachange_ui._subscribed_nodes == [nodes[1]]
+    assert datachange_ui.model.rowCount() == 1
+    assert datachange_ui.model.row_of(nodes[1]) == 0
@@ -0,0 +1,171 @@
+import uuid
+from functools import partial
+from unittest.mock import Mock, patch
+
+import pytest
+from asyncua import Client, ua
+from asyncua.common.structures104 import new_enum, new_struct, new_struct_field
+
+from uaclient import data_types, uaclient as uaclient_module
+from uaclient.data_types import DataType, DataTypeCache, register_data_types
+from uaclient.uaclient import UaClient
+
+
+@pytest.fixture
+def custom_types(server):
+    # unique names, generated classes stay in the ua module
+    suffix = uuid.uuid4().hex[:8]
+    idx = server.register_namespace(f"urn:custom_types:{suffix}")
+    enum_name, struct_name = f"Color{suffix}", f"Point{suffix}"
+    enum = server.tloop.post(new_enum(server.aio_obj, idx, enum_name, ["Red", "Blue"]))
+    struct, _ = server.tloop.post(
+        new_struct(
+            server.aio_obj,
+            idx,
+            struct_name,
+            [
+                new_struct_field("X", ua.VariantType.Double),
+                new_struct_field("Color", enum),
+            ],
+        )
+    )
+    # the value cannot be built by the server, it shares our ua module
+    variable = server.nodes.objects.add_variable(
+        idx, struct_name, None, datatype=struct.nodeid
+    )
+    yield enum_name, struct_name, variable
+
+
+@pytest.fixture
+def uaclient(tmp_path):
+    uaclient = UaClient()
+    uaclient.type_cache = DataTypeCache(str(tmp_path))
+    yield uaclient
+    uaclient.disconnect()
+
+
+def test_data_types_cached(uaclient, url, server, custom_types):
+    enum_name, struct_name, _ = custom_types
+    with patch.object(
+        uaclient_module, "load_data_types", wraps=data_types.load_data_types
+    ) as read:
+        uaclient.connect(url)
+        assert read.call_count == 1
+        assert hasattr(ua, enum_name) and hasattr(ua, struct_name)
+        point = getattr(ua, struct_name)(X=1.5, Color=getattr(ua, enum_name).Blue)
+        assert point.X == 1.5
+
+        # same model, types come from the cache
+        uaclient.disconnect()
+        uaclient.connect(url)
+        assert read.call_count == 1
+
+        # a new namespace changes the model
+        server.register_namespace(f"urn:custom_types:{uuid.uuid4().hex}")
+        uaclient.disconnect()
+        uaclient.connect(url)
+        assert read.call_count == 2
+
+
+def test_register_cached_types(uaclient, url, custom_types):
+    enum_name, struct_name, _ = custom_types
+    uaclient.connect(url)
+    key = uaclient.loop.run(data_types.read_model_key(uaclient, url))
+    types, dictionaries = uaclient.type_cache.load(url, key)
+    assert not dictionaries
+    names = [datatype.name for datatype in types]
+    assert names.index(enum_name) < names.index(struct_name)
+
+    # types round trip through JSON under new names, as in a new process
+    renamed = []
+    for datatype in types:
+        if datatype.name in (enum_name, struct_name):
+            data = datatype.to_json()
+            data[1] = "Cached" + data[1]
+            renamed.append(DataType.from_json(data))
+    new = uaclient.loop.run(register_data_types(renamed))
+    assert sorted(new) == sorted("Cached" + name for name in (enum_name, struct_name))
+    struct = getattr(ua, "Cached" + struct_name)
+    assert [f.Name for f in types[names.index(struct_name)].definition.Fields] == [
+        "X",
+        "Color",
+    ]
+    assert struct(X=2.0).X == 2.0
+
+
+def test_dictionaries_read_once(uaclient, url, custom_types):
+    calls = []
+    load = Client.load_type_definitions
+
+    async def load_type_definitions(client, nodes=None):
+        calls.append(nodes)
+        return await load(client, nodes)
+
+    with patch.object(Client, "load_type_definitions", load_type_definitions):
+        uaclient.connect(url)
+        # the server has no spec <= 1.03 dictionaries, not asked again
+        uaclient.disconnect()
+        uaclient.connect(url)
+    assert len(calls) == 1
+
+
+def test_corrupt_cache(tmp_path):
+    cache = DataTypeCache(str(tmp_path))
+    uri = "opc.tcp://localhost:4840"
+    assert cache.load(uri, {}) is None
+    with open(cache.path(uri), "w") as f:
+        f.write("{")
+    assert cache.load(uri, {}) is None
+    cache.save(uri, {"a": [1]}, [])
+    assert cache.load(uri, {"a": [1]}) == ([], True)
+    cache.save(uri, {"a": [1]}, [], dictionaries=False)
+    assert cache.load(uri, {"a": [1]}) == ([], False)
+    assert cache.load(uri, {"a": [2]}) is None
+
+
+def test_lazy_data_types(uaclient, url, custom_types):
+    enum_name, struct_name, variable = custom_types
+    uaclient.lazy_data_types = True
+    uaclient.connect(url)
+    assert not uaclient.data_types_loaded
+    assert not hasattr(ua, struct_name)
+    assert not uaclient.type_cache.load(url, None)
+
+    # the structure is read with the enum of its field
+    new = uaclient.loop.run(uaclient.load_node_data_types_async([variable]))
+    assert {enum_name, struct_name} <= set(new)
+    assert getattr(ua, struct_name)().Color == getattr(ua, enum_name).Red
+    assert uaclient.loop.run(uaclient.load_node_data_types_async([variable])) == {}
+
+
+def test_lazy_data_types_subscribe(uaclient, url, custom_types):
+    _, struct_name, variable = custom_types
+    uaclient.lazy_data_types = True
+    uaclient.connect(url)
+    uaclient.subscribe_datachange_list([variable], Mock())
+    assert hasattr(ua, struct_name)
+
+
+def test_data_types_progress(uaclient, url, custom_types):
+    uaclient.connect_async = partial(uaclient.connect_async, data_types=False)
+    uaclient.connect(url)
+    future = uaclient.submit(uaclient.load_data_types_async(url))
+    future.cancel()
+    assert not uaclient.data_types_loaded
+
+    messages = []
+    uaclient.loop.run(uaclient.load_data_types_async(url, messages.append))
+    assert uaclient.data_types_loaded
+    assert messages[0].startswith("Loading data type definitions")
+    assert any(text.startswith("Reading") for text in messages)
+
+    # cached now, the types are generated from the cache
+    messages.clear()
+    uaclient.loop.run(uaclient.load_data_types_async(url, messages.append))
+    assert messages[0].startswith("Generating")
+
+
+def test_window_loads_data_types(qtbot, client, custom_types):
+    _, struct_name, _ = custom_types
+    qtbot.waitUntil(lambda: client.uaclient.data_types_loaded, timeout=10000)
+    assert hasattr(ua, struct_name)
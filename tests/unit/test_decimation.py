@@ -0,0 +1,49 @@
+import numpy as np
+
+from uaclient.decimation import DecimatingBuffer, minmax_reduce
+
+
+def test_minmax_reduce():
+    positions = np.arange(10)
+    values = np.array([0, 5, 1, 2, -3, 4, 4, 4, 9, 0], dtype=float)
+    pos, mins, maxs = minmax_reduce(positions, values, values, 2)
+    assert list(pos) == [0, 5]
+    assert list(mins) == [-3, 0]
+    assert list(maxs) == [5, 9]
+
+
+def test_envelope_keeps_extremes():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=30000)
+    buf = DecimatingBuffer(20000)
+    for i, value in enumerate(values):
+        buf.append(float(i), value)
+    kept = values[-20000:]
+    for start, end, width in [(0, 20000, 100), (17, 19990, 300), (5, 900, 7)]:
+        positions, envelope = buf.envelope(start, end, width)
+        assert len(envelope) <= 2 * width
+        assert envelope.max() == kept[start:end].max()
+        assert envelope.min() == kept[start:end].min()
+        assert positions.min() >= start and positions.max() < end
+
+
+def test_envelope_full_detail_when_zoomed():
+    buf = DecimatingBuffer(1000)
+    buf.extend(np.arange(1000.0), np.arange(1000.0))
+    positions, values = buf.envelope(100, 110, 500)
+    assert list(positions) == list(range(100, 110))
+    assert list(values) == [float(i) for i in range(100, 110)]
+
+
+def test_extend_matches_append():
+    values = np.sin(np.arange(10000.0))
+    appended = DecimatingBuffer(10000)
+    for i, value in enumerate(values):
+        appended.append(float(i), value)
+    extended = DecimatingBuffer(10000)
+    extended.extend(np.arange(10000.0), values)
+    for width in (10, 100, 1000):
+        for left, right in zip(
+            appended.envelope(0, 10000, width), extended.envelope(0, 10000, width)
+        ):
+            assert np.array_equal(left, right)
@@ -2,6 +2,7 @@ import pytest
 from unittest.mock import patch, Mock
 from uaclient.mainwindow import EventUI
 from PyQt5.QtGui import QStandardItemModel
+from PyQt5.QtWidgets import QWidget
 
 
 @pytest.fixture
@@ -10,9 +11,13 @@ def server_node(server):
 
 
 @pytest.fixture
-def window(server_node):
-    window = Mock()
-    window.get_current_node.return_value = server_node
+def window(qtbot, server_node):
+    # a widget owns the handlers, everything else is mocked
+    window = QWidget()
+    qtbot.addWidget(window)
+    for name in ("ui", "addAction", "get_selected_nodes", "show_error"):
+        setattr(window, name, Mock())
+    window.get_current_node = Mock(return_value=server_node)
     yield window
 
 
@@ -39,7 +44,7 @@ def test_unsubscribe_event_subscription(window, server_node, uaclient):
     event_ui._unsubscribe(server_node)
     event_ui._unsubscribe(server_node)
     assert len(event_ui._subscribed_nodes) == 0
-    uaclient.unsubscribe_events.assert_called_once()
+    uaclient.unsubscribe_events_list_async.assert_called_once()
 
 
 def test_clear(window, server_node, uaclient):
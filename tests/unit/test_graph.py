@@ -1,22 +1,39 @@
-def test_add_to_graph(client, server):
+from array import array
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import numpy as np
+from asyncua import ua
+
+from uaclient.graph_history import AGGREGATES, ChannelHistory
+
+
+def add_channel(qtbot, client, node):
+    # the attributes of the node are read in the background
+    client.graph_ui._add_node_to_channel(node)
+    qtbot.waitUntil(lambda: not client.graph_ui._adding)
+
+
+def test_add_to_graph(qtbot, client, server):
     namepace = server.register_namespace("custom_namespace")
     objects = server.nodes.objects
     string_variable = objects.add_variable(namepace, "string_variable", "Value")
     float_variable = objects.add_variable(namepace, "float_variable", 1.0)
 
-    client.graph_ui._add_node_to_channel(string_variable)
-    client.graph_ui._add_node_to_channel(float_variable)
+    add_channel(qtbot, client, string_variable)
+    add_channel(qtbot, client, float_variable)
 
     # string is not a graphable value and therefore does not get added to the graph
     assert len(client.graph_ui._node_list) == 1
     assert client.graph_ui._node_list[0] == float_variable
 
 
-def test_remove_from_graph(client, server):
+def test_remove_from_graph(qtbot, client, server):
     namepace = server.register_namespace("custom_namespace")
     objects = server.nodes.objects
     float_variable = objects.add_variable(namepace, "float_variable", 1.0)
-    client.graph_ui._add_node_to_channel(float_variable)
+    add_channel(qtbot, client, float_variable)
 
     client.graph_ui._remove_node_from_channel(float_variable)
 
@@ -31,3 +48,225 @@ def test_restart_timer(client, server):
     assert client.graph_ui.timer.interval() == 5000
     assert client.graph_ui.N == 90
     assert client.graph_ui.timer.isActive()
+
+    client.ui.spinBoxIntervall.setValue(0.25)
+    client.graph_ui.restartTimer()
+    assert client.graph_ui.timer.interval() == 250
+
+
+def test_subscription_mode(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    client.ui.comboBoxAcquisition.setCurrentIndex(client.graph_ui.SUBSCRIPTION)
+    client.ui.spinBoxIntervall.setValue(1)
+    client.graph_ui.restartTimer()
+    assert client.graph_ui.timer.interval() == client.graph_ui.redraw_intervall
+
+    add_channel(qtbot, client, float_variable)
+    values = client.graph_ui._channels[0].values
+    qtbot.waitUntil(lambda: list(values()) == [1.0])
+    float_variable.write_value(2.0)
+    qtbot.waitUntil(lambda: list(values()) == [1.0, 2.0])
+    # samples carry the source timestamp
+    source = float_variable.read_data_value().SourceTimestamp.timestamp()
+    assert client.graph_ui._channels[0].times()[-1] == source
+
+    client.graph_ui._remove_node_from_channel(float_variable)
+    qtbot.waitUntil(lambda: client.uaclient._subs_graph == {})
+
+
+def test_apply_keeps_samples(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    add_channel(qtbot, client, float_variable)
+    for _ in range(3):
+        client.graph_ui.pushtoGraph()
+        qtbot.waitUntil(lambda: not client.graph_ui._polling)
+    client.ui.spinBoxNumberOfPoints.setValue(100000)
+    client.graph_ui.restartTimer()
+
+    assert list(client.graph_ui._channels[0].values()) == [1.0, 1.0, 1.0]
+    assert client.graph_ui._channels[0].capacity == 100000
+
+
+def test_curves_are_decimated(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    client.ui.spinBoxNumberOfPoints.setValue(1000000)
+    client.graph_ui.restartTimer()
+    add_channel(qtbot, client, float_variable)
+    channel = client.graph_ui._channels[0]
+    channel.extend(np.arange(500000.0), np.sin(np.arange(500000.0)))
+    client.graph_ui._draw(0)
+
+    xdata, ydata = client.graph_ui._curves[0].getData()
+    width = int(client.graph_ui.pw.getViewBox().width()) or 1000
+    assert len(ydata) <= 2 * width
+    assert ydata.max() == channel.values().max()
+
+
+def test_polling_reads_all_channels_at_once(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    variables = [
+        objects.add_variable(namepace, f"poll_variable_{i}", float(i)) for i in range(3)
+    ]
+    for var in variables:
+        add_channel(qtbot, client, var)
+    read = Mock(wraps=client.uaclient.read_values_async)
+    client.uaclient.read_values_async = read
+    client.graph_ui.pushtoGraph()
+    qtbot.waitUntil(lambda: not client.graph_ui._polling)
+
+    read.assert_called_once()
+    values = [list(channel.values()) for channel in client.graph_ui._channels]
+    assert values == [[0.0], [1.0], [2.0]]
+
+
+def test_polling_registered_nodes(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    client.graph_ui.register_nodes = True
+    add_channel(qtbot, client, float_variable)
+    qtbot.waitUntil(lambda: float_variable.nodeid in client.graph_ui._registered)
+    client.graph_ui.pushtoGraph()
+    qtbot.waitUntil(lambda: not client.graph_ui._polling)
+    assert list(client.graph_ui._channels[0].values()) == [1.0]
+
+    client.graph_ui._remove_node_from_channel(float_variable)
+    assert client.graph_ui._registered == {}
+
+
+def test_disconnect_resets_graph(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    graph_ui = client.graph_ui
+    graph_ui.register_nodes = True
+    add_channel(qtbot, client, float_variable)
+    qtbot.waitUntil(lambda: float_variable.nodeid in graph_ui._registered)
+    graph_ui._subscribed = True
+    timer = graph_ui.timer
+    assert timer.parent() is client and graph_ui._history_timer.parent() is client
+
+    client.disconnect()
+    assert graph_ui._registered == {} and not graph_ui._subscribed
+    assert graph_ui._node_list == [float_variable]
+    graph_ui.restartTimer()
+    assert graph_ui.timer is timer and timer.isActive()
+
+
+def test_time_axis(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    add_channel(qtbot, client, float_variable)
+    client.graph_ui.pushtoGraph()
+    qtbot.waitUntil(lambda: not client.graph_ui._polling)
+    source = float_variable.read_data_value().SourceTimestamp.timestamp()
+    xdata, ydata = client.graph_ui._curves[0].getData()
+    assert list(xdata) == [source]
+
+    # changing the timestamp source starts over
+    client.ui.comboBoxTimestamps.setCurrentIndex(client.graph_ui.CLIENT_TIME)
+    client.graph_ui.restartTimer()
+    assert len(client.graph_ui._channels[0]) == 0
+    before = time.time()
+    client.graph_ui.pushtoGraph()
+    qtbot.waitUntil(lambda: not client.graph_ui._polling)
+    assert client.graph_ui._channels[0].times()[0] >= before
+
+
+def test_timestamp_fallback(client):
+    now = datetime.now(timezone.utc)
+    datavalue = ua.DataValue(ua.Variant(1.0), ServerTimestamp=now)
+    client.graph_ui.timestamps = client.graph_ui.SOURCE_TIME
+    assert client.graph_ui._timestamp(datavalue) == now.timestamp()
+
+
+def test_history_for_view(qtbot, client, historized_variable):
+    variable, now = historized_variable
+    add_channel(qtbot, client, variable)
+    viewbox = client.graph_ui.pw.getViewBox()
+    start = (now - timedelta(seconds=200)).timestamp()
+    viewbox.setXRange(start, now.timestamp() + 10, padding=0)
+    client.graph_ui._fetch_history()
+    history = client.graph_ui._histories[0]
+    qtbot.waitUntil(lambda: not history.fetching)
+
+    assert history.start <= start
+    xdata, ydata = client.graph_ui._curves[0].getData()
+    assert list(ydata) == [float(i) for i in range(1, 11)] + [0.0]
+    # the view is covered, nothing more to read
+    assert not history.needs(start, now.timestamp(), 1000)
+
+
+def test_history_not_supported(qtbot, client, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    float_variable = objects.add_variable(namepace, "float_variable", 1.0)
+    add_channel(qtbot, client, float_variable)
+    client.graph_ui.pw.getViewBox().setXRange(0, 1000, padding=0)
+    client.graph_ui._fetch_history()
+    history = client.graph_ui._histories[0]
+    qtbot.waitUntil(lambda: not history.fetching)
+    assert not history.supported
+
+
+def test_history_aggregates(qtbot, client, historized_variable):
+    variable, now = historized_variable
+    start, end = now.timestamp() - 100, now.timestamp() + 10
+    calls = []
+
+    async def read_processed(node, start, end, interval, aggregate):
+        calls.append((interval, aggregate))
+        value = 0.0 if aggregate == ua.ObjectIds.AggregateFunction_Minimum else 9.0
+        return array("d", [start.timestamp()]), array("d", [value])
+
+    client.uaclient.read_processed_history_async = read_processed
+    history = ChannelHistory(client.uaclient, variable)
+    history.raw_per_pixel = 1  # 11 raw values do not fit in 2 pixels
+    history.fetch(start, end, 2, lambda: None)
+    qtbot.waitUntil(lambda: not history.fetching)
+
+    assert [aggregate for _, aggregate in calls] == list(AGGREGATES[0])
+    assert history.interval == calls[0][0] == (end - start) / 2
+    assert list(history.buffer.times()) == [start, start]
+    assert list(history.buffer.values()) == [0.0, 9.0]
+    # zooming in needs a finer resolution
+    assert not history.needs(start, end, 2)
+    assert history.needs(start, start + 10, 2)
+
+    # the range is known to hold too many raw values, they are not read again
+    read = client.uaclient.read_history_async
+    raw = []
+
+    async def read_history(*args):
+        raw.append(args)
+        return await read(*args)
+
+    client.uaclient.read_history_async = read_history
+    history.fetch(start - 100, end, 2, lambda: None)
+    qtbot.waitUntil(lambda: not history.fetching)
+    assert raw == [] and len(calls) == 4
+    # zoomed in on a few values, raw values are read again
+    history.fetch(start + 95, start + 96, 2, lambda: None)
+    qtbot.waitUntil(lambda: not history.fetching)
+    assert len(raw) == 1 and len(calls) == 4
+
+
+def test_history_aggregates_fallback(qtbot, client, historized_variable):
+    variable, now = historized_variable
+    history = ChannelHistory(client.uaclient, variable)
+    history.raw_per_pixel = 1
+    history.fetch(now.timestamp() - 100, now.timestamp() + 10, 2, lambda: None)
+    qtbot.waitUntil(lambda: not history.fetching)
+
+    # the test server has no aggregates, raw values are decimated instead
+    assert not history.processed
+    assert history.interval == 0
+    assert len(history.buffer) == 11
@@ -0,0 +1,199 @@
+import asyncio
+import csv
+import threading
+import time
+from datetime import timedelta
+from unittest.mock import Mock
+
+import pytest
+from asyncua import ua
+from PyQt5.QtWidgets import QWidget
+
+from uaclient import history_export
+from uaclient.history_export import export_history_async, main
+from uaclient.history_export_dialog import HistoryExportDialog
+from uaclient.uaclient import UaClient
+
+
+@pytest.fixture
+def uaclient(url):
+    uaclient = UaClient()
+    uaclient.connect(url)
+    yield uaclient
+    uaclient.disconnect()
+
+
+@pytest.fixture
+def missing_node(server, monkeypatch):
+    """
+    the test server reads no values for unknown nodes, make it fail
+    reading ns=2;s=missing as servers usually do
+    """
+    manager = server.aio_obj.iserver.history_manager
+    read_history = manager._read_history
+
+    async def _read_history(details, rv):
+        if rv.NodeId == ua.NodeId("missing", 2):
+            result = ua.HistoryReadResult()
+            result.StatusCode = ua.StatusCode(ua.StatusCodes.BadNodeIdUnknown)
+            return result
+        return await read_history(details, rv)
+
+    monkeypatch.setattr(manager, "_read_history", _read_history)
+    return ua.NodeId("missing", 2)
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.reader(f))
+
+
+def test_export_csv(uaclient, historized_variable, tmp_path):
+    variable, now = historized_variable
+    path = str(tmp_path / "history.csv")
+    progress = []
+    rows = uaclient.loop.run(
+        export_history_async(
+            uaclient,
+            [variable],
+            now - timedelta(seconds=200),
+            now + timedelta(seconds=10),
+            path,
+            progress=progress.append,
+        )
+    )
+    assert rows == 11
+    assert progress[-1] == 11
+    header, *lines = read_csv(path)
+    assert header == history_export.COLUMNS
+    nodeid = variable.nodeid.to_string()
+    assert all(line[0] == nodeid for line in lines)
+    assert all(line[3] == "Good" for line in lines)
+    assert sorted(float(line[4]) for line in lines) == [float(i) for i in range(11)]
+    assert (now - timedelta(seconds=99)).isoformat() in [line[1] for line in lines]
+
+
+def test_export_parquet(uaclient, historized_variable, tmp_path):
+    pyarrow = pytest.importorskip("pyarrow.parquet")
+    variable, now = historized_variable
+    path = str(tmp_path / "history.parquet")
+    rows = uaclient.loop.run(
+        export_history_async(
+            uaclient,
+            [variable],
+            now - timedelta(seconds=200),
+            now + timedelta(seconds=10),
+            path,
+        )
+    )
+    table = pyarrow.read_table(path)
+    assert table.num_rows == rows == 11
+    assert table.column_names == history_export.COLUMNS
+    assert sorted(table.column("value").to_pylist()) == [float(i) for i in range(11)]
+
+
+def test_parquet_needs_pyarrow(monkeypatch, tmp_path):
+    monkeypatch.setattr(history_export, "pyarrow", None)
+    with pytest.raises(RuntimeError):
+        history_export.open_writer(str(tmp_path / "history.parquet"))
+    assert history_export.guess_format("history.PQ") == "parquet"
+    assert history_export.guess_format("history.txt") == "csv"
+
+
+def test_cancel_waits_for_write(uaclient, historized_variable, monkeypatch):
+    variable, now = historized_variable
+    writing = threading.Event()
+    calls = []
+
+    class SlowWriter(object):
+        def write(self, nodeid, datavalues):
+            writing.set()
+            time.sleep(0.2)
+            calls.append("write")
+
+        def close(self):
+            calls.append("close")
+
+    monkeypatch.setattr(history_export, "open_writer", lambda *args: SlowWriter())
+    future = asyncio.run_coroutine_threadsafe(
+        export_history_async(
+            uaclient,
+            [variable],
+            now - timedelta(seconds=200),
+            now + timedelta(seconds=10),
+            "history.csv",
+        ),
+        uaclient.loop.loop,
+    )
+    assert writing.wait(5)
+    future.cancel()
+    deadline = time.time() + 5
+    while "close" not in calls and time.time() < deadline:
+        time.sleep(0.05)
+    # the writer is closed only once the page being written is
+    assert calls == ["write", "close"]
+
+
+def test_export_command_line(url, historized_variable, tmp_path, capsys):
+    variable, now = historized_variable
+    path = str(tmp_path / "history.csv")
+    start = (now - timedelta(seconds=200)).isoformat()
+    end = (now + timedelta(seconds=10)).isoformat()
+    nodeid = variable.nodeid.to_string()
+    assert main([url, nodeid, "-o", path, "--start", start, "--end", end]) == 0
+    assert len(read_csv(path)) == 12
+    assert "11 values" in capsys.readouterr().out
+
+    missing = str(tmp_path / "missing" / "history.csv")
+    assert main([url, nodeid, "-o", missing]) == 1
+
+
+def test_export_command_line_failed_node(
+    url, historized_variable, missing_node, tmp_path, capsys
+):
+    variable, now = historized_variable
+    path = str(tmp_path / "history.csv")
+    start = (now - timedelta(seconds=200)).isoformat()
+    end = (now + timedelta(seconds=10)).isoformat()
+    nodeid = variable.nodeid.to_string()
+    argv = [url, nodeid, "ns=2;s=missing", "-o", path, "--start", start]
+    assert main(argv + ["--end", end]) == 1
+    assert len(read_csv(path)) == 12
+    out, err = capsys.readouterr()
+    assert "11 values" in out
+    assert "ns=2;s=missing: BadNodeIdUnknown" in err
+
+
+def test_export_dialog(qtbot, uaclient, historized_variable, tmp_path):
+    variable, now = historized_variable
+    parent = QWidget()  # the progress dialog is shown over it
+    parent.uaclient = uaclient
+    parent.show_error = Mock()
+    dia = HistoryExportDialog(parent)
+    qtbot.addWidget(dia)
+    assert dia.end - dia.start == timedelta(days=1)
+    dia.path = str(tmp_path / "history.csv")
+    dia.ui.endDateTimeEdit.setDateTime(dia.ui.endDateTimeEdit.dateTime().addSecs(10))
+    dia.export([variable])
+    qtbot.waitUntil(lambda: dia._future.done(), timeout=10000)
+    assert dia._future.result() == 11
+    assert len(read_csv(dia.path)) == 12
+
+
+def test_export_dialog_failed_node(
+    qtbot, uaclient, historized_variable, missing_node, tmp_path
+):
+    variable, now = historized_variable
+    parent = QWidget()
+    parent.uaclient = uaclient
+    parent.show_error = Mock()
+    dia = HistoryExportDialog(parent)
+    qtbot.addWidget(dia)
+    dia.path = str(tmp_path / "history.csv")
+    dia.ui.endDateTimeEdit.setDateTime(dia.ui.endDateTimeEdit.dateTime().addSecs(10))
+    missing = uaclient.get_node(missing_node)
+    with qtbot.waitSignal(dia.exported, timeout=10000) as blocker:
+        dia.export([variable, missing])
+    rows, failed = blocker.args
+    assert rows == 11
+    assert failed == {missing_node: ua.StatusCode(ua.StatusCodes.BadNodeIdUnknown)}
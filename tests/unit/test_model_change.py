@@ -0,0 +1,35 @@
+from types import SimpleNamespace
+
+from asyncua import ua
+
+from uaclient.model_change import ModelChange
+
+
+def test_from_event():
+    verbs = ua.ModelChangeStructureVerbMask
+    a, b, c = ua.NodeId(1, 2), ua.NodeId(2, 2), ua.NodeId(3, 2)
+    change = ModelChange.from_event(
+        SimpleNamespace(
+            Changes=[
+                ua.ModelChangeStructureDataType(Affected=a, Verb=verbs.NodeAdded),
+                ua.ModelChangeStructureDataType(
+                    Affected=b, Verb=verbs.ReferenceAdded | verbs.DataTypeChanged
+                ),
+            ]
+        )
+    )
+    assert change.added == {a} and change.references == {b}
+    assert change.attributes == {b} and not change.everything
+    assert change.affects(b) and not change.affects(a)
+
+    semantic = ModelChange.from_event(
+        SimpleNamespace(Changes=[ua.SemanticChangeStructureDataType(Affected=c)])
+    )
+    assert semantic.attributes == {c} and not semantic.references
+    change.update(semantic)
+    assert change.attributes == {b, c}
+
+    # without the list of changes everything may have changed
+    unknown = ModelChange.from_event(SimpleNamespace(Changes=None))
+    assert unknown.everything and unknown.affects(a)
+    assert not ModelChange()
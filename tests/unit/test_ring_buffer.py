@@ -0,0 +1,40 @@
+import pytest
+
+from uaclient.ring_buffer import RingBuffer
+
+
+def test_append_wraps():
+    buf = RingBuffer(3)
+    assert len(buf.values()) == 0
+    for i in range(5):
+        buf.append(float(i), i * 10.0)
+    assert len(buf) == 3
+    assert list(buf.times()) == [2.0, 3.0, 4.0]
+    assert list(buf.values()) == [20.0, 30.0, 40.0]
+
+
+def test_extend():
+    buf = RingBuffer(4)
+    buf.append(0.0, 0.0)
+    buf.extend([1.0, 2.0, 3.0, 4.0, 5.0], [1.0, 2.0, 3.0, 4.0, 5.0])
+    assert list(buf.times()) == [2.0, 3.0, 4.0, 5.0]
+    buf.extend([6.0], [6.0])
+    assert list(buf.values()) == [3.0, 4.0, 5.0, 6.0]
+
+
+def test_resize_keeps_recent_samples():
+    buf = RingBuffer(5)
+    for i in range(7):
+        buf.append(float(i), float(i))
+    buf.resize(10)
+    assert list(buf.values()) == [2.0, 3.0, 4.0, 5.0, 6.0]
+    buf.append(7.0, 7.0)
+    assert list(buf.values())[-2:] == [6.0, 7.0]
+    buf.resize(2)
+    assert list(buf.values()) == [6.0, 7.0]
+    assert list(buf.times()) == [6.0, 7.0]
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        RingBuffer(0)
@@ -0,0 +1,210 @@
+import os
+import shutil
+from unittest.mock import patch
+
+import pytest
+from asyncua import ua
+from PyQt5.QtCore import Qt
+
+from uaclient.model_change import ModelChange
+from uaclient.snapshot import (
+    ROOT,
+    Snapshot,
+    crawl_async,
+    main,
+    snapshot_async,
+    snapshot_path,
+)
+from uaclient.snapshot_widget import SnapshotWidget
+from uaclient.uaclient import UaClient
+
+
+@pytest.fixture
+def uaclient(url):
+    uaclient = UaClient()
+    uaclient.connect(url)
+    yield uaclient
+    uaclient.disconnect()
+
+
+@pytest.fixture(scope="module")
+def nodes(server):
+    idx = server.register_namespace("snapshot")
+    folder = server.nodes.objects.add_folder(idx, "snapshot_folder")
+    variable = folder.add_variable(idx, "snapshot_variable", 1.0)
+    variable.write_attribute(
+        ua.AttributeIds.Description,
+        ua.DataValue(ua.Variant(ua.LocalizedText("a variable"))),
+    )
+    old = folder.add_variable(idx, "snapshot_old", 2)
+    yield folder, variable, old
+
+
+@pytest.fixture(scope="module")
+def crawled(url, server, nodes, tmp_path_factory):
+    """
+    path of a snapshot of the whole test server
+    """
+    uaclient = UaClient()
+    uaclient.connect(url)
+    try:
+        directory = str(tmp_path_factory.mktemp("snapshots"))
+        yield uaclient.loop.run(snapshot_async(uaclient, url, directory))
+    finally:
+        uaclient.disconnect()
+
+
+def test_crawl(crawled, nodes, url):
+    folder, variable, old = nodes
+    snapshot = Snapshot(crawled)
+    assert snapshot.read_meta("url") == url and snapshot.read_meta("crawled")
+    assert len(snapshot) > 1000
+    children = snapshot.children(folder.nodeid.to_string())
+    assert [desc.DisplayName.Text for desc in children] == [
+        "snapshot_old",
+        "snapshot_variable",
+    ]
+    assert children[1].NodeClass == ua.NodeClass.Variable
+    attrs = snapshot.node(variable.nodeid.to_string())
+    assert attrs["Description"] == "a variable"
+    assert attrs["DataType"] == ua.NodeId(ua.ObjectIds.Double).to_string()
+    assert snapshot.get_path(variable.nodeid.to_string()) == [
+        ROOT,
+        ua.NodeId(ua.ObjectIds.ObjectsFolder).to_string(),
+        folder.nodeid.to_string(),
+        variable.nodeid.to_string(),
+    ]
+    assert snapshot.search("SNAPSHOT_VAR")[0][0] == variable.nodeid.to_string()
+    assert snapshot.search("snapshot_")[0][1] == "snapshot_folder"
+    assert snapshot.search("i=2253")[0][1] == "Server"
+    assert snapshot.search("no_such_name") == []
+    snapshot.close()
+
+
+def test_resume(crawled, uaclient, tmp_path):
+    path = str(tmp_path / "resumed.sqlite")
+    shutil.copy(crawled, path)
+    snapshot = Snapshot(path)
+    # nodes browsed before are not browsed again
+    with patch.object(uaclient, "browse_async", wraps=uaclient.browse_async) as browse:
+        count = uaclient.loop.run(crawl_async(uaclient, snapshot))
+    assert count == len(snapshot)
+    assert all(not call.args[0] for call in browse.call_args_list)
+    snapshot.close()
+
+
+def _browsed(uaclient, browse):
+    # nodes browsed but the ones read_model_key() browses
+    namespaces = ua.NodeId(ua.ObjectIds.Server_Namespaces)
+    skipped = {namespaces} | {desc.NodeId for desc in uaclient.get_children(namespaces)}
+    return {
+        node.to_string()
+        for call in browse.call_args_list
+        for node in call.args[0]
+        if node not in skipped
+    }
+
+
+def test_refresh(crawled, uaclient, nodes, url):
+    folder, variable, old = nodes
+    directory = os.path.dirname(crawled)
+    idx = folder.nodeid.NamespaceIndex
+    new = folder.add_variable(idx, "snapshot_new", 3.0)
+    old.delete()
+    # as told by the model change events of the server
+    change = ModelChange()
+    change.added.add(new.nodeid)
+    change.deleted.add(old.nodeid)
+    change.attributes.add(variable.nodeid)
+    snapshot = Snapshot(crawled)
+    with snapshot._db:
+        snapshot._db.execute(
+            "UPDATE nodes SET description = NULL WHERE nodeid = ?",
+            (variable.nodeid.to_string(),),
+        )
+    snapshot.close()
+    read = uaclient.read_attributes_async
+    described = []
+
+    async def read_attributes(nodes, attr=ua.AttributeIds.Value):
+        if attr == ua.AttributeIds.Description:
+            described.extend(nodes)
+        return await read(nodes, attr)
+
+    with patch.object(uaclient, "read_attributes_async", read_attributes), patch.object(
+        uaclient, "browse_async", wraps=uaclient.browse_async
+    ) as browse:
+        assert (
+            uaclient.loop.run(snapshot_async(uaclient, url, directory, change=change))
+            == crawled
+        )
+    # only the nodes flagged and the new node are browsed and read again
+    assert _browsed(uaclient, browse) == {
+        folder.nodeid.to_string(),
+        new.nodeid.to_string(),
+    }
+    assert sorted(node.to_string() for node in described) == sorted(
+        node.nodeid.to_string() for node in (folder, variable, new)
+    )
+    snapshot = Snapshot(crawled)
+    names = [
+        desc.DisplayName.Text for desc in snapshot.children(folder.nodeid.to_string())
+    ]
+    assert names == ["snapshot_new", "snapshot_variable"]
+    assert snapshot.node(variable.nodeid.to_string())["Description"] == "a variable"
+    assert snapshot.node(old.nodeid.to_string()) is None
+    assert snapshot.node(new.nodeid.to_string())["DataType"] == "i=11"
+    snapshot.close()
+
+
+def test_refresh_namespace_version(crawled, uaclient, nodes, url, tmp_path):
+    folder, _, _ = nodes
+    path = snapshot_path(url, str(tmp_path))
+    shutil.copy(crawled, path)
+    snapshot = Snapshot(path)
+    key = snapshot.read_meta("model")
+    # as if the namespace had another version when crawled
+    key["namespace_versions"].append(["snapshot", "0.9", None])
+    snapshot.write_meta("model", key)
+    snapshot.close()
+    with patch.object(uaclient, "browse_async", wraps=uaclient.browse_async) as browse:
+        assert uaclient.loop.run(snapshot_async(uaclient, url, str(tmp_path))) == path
+    snapshot = Snapshot(path)
+    # the nodes of the namespace and their parents, nothing else
+    namespace = set(snapshot.namespace_nodes([folder.nodeid.NamespaceIndex]))
+    assert folder.nodeid.to_string() in namespace
+    assert _browsed(uaclient, browse) == namespace | {
+        ua.NodeId(ua.ObjectIds.ObjectsFolder).to_string()
+    }
+    assert (
+        snapshot.read_meta("model")["namespace_versions"] != key["namespace_versions"]
+    )
+    snapshot.close()
+
+
+def test_snapshot_command_line(url, server, tmp_path, capsys):
+    assert main([url, "-d", str(tmp_path)]) == 0
+    (name,) = [name for name in os.listdir(tmp_path) if name.endswith(".sqlite")]
+    assert name.startswith("localhost_48400-") and name.endswith(".sqlite")
+    assert name in capsys.readouterr().out
+
+
+def test_snapshot_widget(qtbot, crawled, nodes):
+    folder, variable, _ = nodes
+    widget = SnapshotWidget(crawled)
+    qtbot.addWidget(widget)
+    assert widget.model.index(0, 0).data() == "Root"
+    widget.search("snapshot_var")
+    assert widget.resultsView.count() == 1
+    widget.resultsView.setCurrentRow(0)
+    assert widget.get_current_nodeid() == variable.nodeid.to_string()
+    items = [
+        widget.attrView.topLevelItem(row)
+        for row in range(widget.attrView.topLevelItemCount())
+    ]
+    attrs = {item.text(0): item.text(1) for item in items}
+    assert attrs["Description"] == "a variable"
+    idx = widget.treeView.currentIndex().parent()
+    assert idx.data(Qt.UserRole) == folder.nodeid.to_string()
+    widget.search("x")
+    assert widget.resultsView.isHidden()
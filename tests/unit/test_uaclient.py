@@ -1,9 +1,13 @@
+from datetime import datetime, timedelta, timezone
+import time
+
 import pytest
 
 from uaclient.mainwindow import DataChangeHandler
 from uaclient.mainwindow import EventHandler
 from uaclient.uaclient import UaClient
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
+from asyncua import ua
 from asyncua.sync import Subscription, Client
 
 
@@ -80,3 +84,440 @@ def test_connect(uaclient, url):
     uaclient.connect(url)
     assert isinstance(uaclient.client, Client)
     assert uaclient.client.application_uri == uaclient.application_uri
+
+
+def test_connect_browses(uaclient, url, server):
+    root, objects = server.nodes.root, server.nodes.objects
+    missing = ua.NodeId("missing", 0)
+    children = uaclient.loop.run(
+        uaclient.connect_async(url, browse=[root.nodeid, objects.nodeid, missing])
+    )
+    assert set(children) == {root.nodeid, objects.nodeid}
+    for node in (root, objects):
+        assert children[node.nodeid] == uaclient.get_children(node)
+    # the root of the tree is described without another Read
+    assert uaclient.root_description.NodeId == root.nodeid
+    assert uaclient.root_description.DisplayName.Text == "Root"
+    assert {"session", "capabilities", "browse", "data types", "total"} <= set(
+        uaclient.connect_timings
+    )
+
+
+def test_endpoints_cached(uaclient, url):
+    uaclient.endpoints_ttl = 0
+    endpoints = uaclient.get_endpoints(url)
+    assert endpoints
+    assert uaclient.get_endpoints(url) is not endpoints
+    uaclient.endpoints_ttl = 300
+    endpoints = uaclient.get_endpoints(url)
+    assert uaclient.get_endpoints(url) is endpoints
+
+
+def test_probe_endpoints(uaclient, url):
+    down = "opc.tcp://localhost:1"
+    progress = []
+    results = uaclient.loop.run(
+        uaclient.probe_endpoints_async(
+            [url, down, url], lambda *args: progress.append(args)
+        )
+    )
+    seconds, ex = results[url]
+    assert ex is None and seconds > 0
+    assert isinstance(results[down][1], Exception)
+    assert sorted(uri for uri, _, _ in progress) == sorted([url, down])
+    assert uaclient._endpoints[url][1]
+
+
+def test_prewarm(uaclient, url):
+    uaclient.prewarm(url)  # already connected
+    assert uaclient._warm is None
+    uaclient.disconnect()
+    uaclient.prewarm(url)
+    warm = uaclient._warm[3]
+    uaclient.prewarm(url)
+    assert uaclient._warm[3] is warm
+    uaclient.connect(url)
+    assert uaclient.client is warm and uaclient._warm is None
+    assert uaclient.get_display_names([warm.nodes.objects]) == ["Objects"]
+
+    # a channel closed meanwhile is replaced when connecting
+    uaclient.disconnect()
+    uaclient.prewarm(url)
+    warm = uaclient._warm[3]
+    warm.aio_obj.disconnect_socket()
+    uaclient.connect(url)
+    assert uaclient.client is not warm
+    assert uaclient.get_display_names([uaclient.client.nodes.objects]) == ["Objects"]
+
+    # the session of a prewarmed channel gets the credentials of the uri
+    uaclient.disconnect()
+    secret = url.replace("opc.tcp://", "opc.tcp://user:secret@")
+    uaclient.prewarm(secret)
+    aio_client = uaclient._warm[3].aio_obj
+    activate_session = aio_client.activate_session
+    credentials = []
+
+    async def activate(username=None, password=None, **kwargs):
+        credentials.append((username, password))
+        return await activate_session(username=username, password=password, **kwargs)
+
+    aio_client.activate_session = activate
+    uaclient.connect(secret)
+    assert uaclient.client.aio_obj is aio_client
+    assert credentials == [("user", "secret")]
+    uaclient.disconnect()
+    assert uaclient._password is None
+
+
+def test_subscribe_datachange_list(uaclient, server):
+    handler = DataChangeHandler()
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    variables = [
+        objects.add_variable(namepace, f"bulk_variable_{i}", float(i)) for i in range(5)
+    ]
+    missing = uaclient.get_node(ua.NodeId("missing", namepace))
+    uaclient.max_items_per_call = 2
+    handles = uaclient.subscribe_datachange_list(variables + [missing], handler)
+    assert len(handles) == 6
+    assert isinstance(handles[-1], ua.StatusCode)
+    assert missing.nodeid not in uaclient._subs_dc
+    assert [uaclient._subs_dc[var.nodeid] for var in variables] == handles[:5]
+
+    uaclient.unsubscribe_datachange_list(variables)
+    assert uaclient._subs_dc == {}
+
+
+def test_subscribe_events_list(uaclient, server):
+    handler = EventHandler()
+    nodes = [server.nodes.server, server.nodes.objects]
+    handles = uaclient.subscribe_events_list(nodes, handler)
+    # Objects is not an event notifier
+    assert isinstance(handles[1], ua.StatusCode)
+    assert uaclient._subs_ev == {nodes[0].nodeid: handles[0]}
+
+    uaclient.unsubscribe_events_list(nodes)
+    assert uaclient._subs_ev == {}
+
+
+def test_unsubscribe_not_subscribed(uaclient, server):
+    # nothing to delete, no subscription needed
+    nodes = [server.nodes.server]
+    uaclient.unsubscribe_datachange_list(nodes)
+    uaclient.unsubscribe_events_list(nodes)
+    uaclient.unsubscribe_graph_list(nodes)
+    assert uaclient._datachange_sub is None and uaclient._event_sub is None
+
+
+def test_get_display_names(uaclient, server):
+    nodes = [server.nodes.server, server.nodes.objects]
+    assert uaclient.get_display_names(nodes) == ["Server", "Objects"]
+
+
+def test_server_capabilities(uaclient):
+    caps = uaclient.capabilities
+    assert isinstance(caps.max_nodes_per_read, int)
+    assert isinstance(caps.max_monitored_items_per_call, int)
+
+
+def test_bulk_respects_server_limits(uaclient, server):
+    namepace = server.register_namespace("custom_namespace")
+    objects = server.nodes.objects
+    variables = [
+        objects.add_variable(namepace, f"limit_variable_{i}", float(i))
+        for i in range(7)
+    ]
+    for var in variables:
+        var.set_writable()
+    uaclient.capabilities.max_nodes_per_read = 2
+    uaclient.capabilities.max_nodes_per_write = 3
+    uaclient.capabilities.max_nodes_per_browse = 2
+    dvs = uaclient.read_attributes(variables)
+    assert [dv.Value.Value for dv in dvs] == [float(i) for i in range(7)]
+
+    values = [ua.Variant(float(i * 10), ua.VariantType.Double) for i in range(7)]
+    statuses = uaclient.write_values(variables, values)
+    assert all(status.is_good() for status in statuses)
+    dvs = uaclient.read_attributes(variables)
+    assert [dv.Value.Value for dv in dvs] == [float(i * 10) for i in range(7)]
+
+    results = uaclient.browse_nodes([server.nodes.root, server.nodes.objects] * 2)
+    assert len(results) == 4
+    assert all(result.StatusCode.is_good() for result in results)
+
+
+def test_browse_cache(uaclient, server):
+    nodes = [server.nodes.root, server.nodes.objects]
+    children = uaclient.get_children_list(nodes)
+    assert len(uaclient.browse_cache) == 2
+    failing = Mock(side_effect=AssertionError("browsed again"))
+    with patch.object(uaclient.client.aio_obj.uaclient, "browse", failing):
+        assert uaclient.get_children_list(nodes) == children
+        assert uaclient.get_children(server.nodes.objects) == children[nodes[1].nodeid]
+    uaclient.browse_cache.invalidate(nodes[1].nodeid)
+    assert uaclient.get_children(server.nodes.objects) == children[nodes[1].nodeid]
+    uaclient.disconnect()
+    assert len(uaclient.browse_cache) == 0
+
+
+def test_browse_next(uaclient, server):
+    # asyncua servers ignore RequestedMaxReferencesPerNode, page like a server would
+    aio_client = uaclient.client.aio_obj.uaclient
+    browse = aio_client.browse
+    held = {}  # continuation point -> references still to return
+
+    def page(result, refs, point):
+        result.References = refs[:2]
+        if len(refs) > 2:
+            held[point] = refs[2:]
+            result.ContinuationPoint = point
+        return result
+
+    async def paged_browse(params):
+        assert (
+            params.RequestedMaxReferencesPerNode == uaclient.max_references_per_browse
+        )
+        results = await browse(params)
+        return [
+            page(result, result.References, str(i).encode())
+            for i, result in enumerate(results)
+        ]
+
+    async def paged_browse_next(params):
+        assert not params.ReleaseContinuationPoints
+        return [
+            page(ua.BrowseResult(), held.pop(point), point + b"+")
+            for point in params.ContinuationPoints
+        ]
+
+    nodes = [server.nodes.root, server.nodes.objects, server.nodes.server]
+    expected = uaclient.get_children_list(nodes)
+    uaclient.browse_cache.clear()
+    with patch.object(aio_client, "browse", paged_browse), patch.object(
+        aio_client, "browse_next", paged_browse_next
+    ):
+        assert uaclient.get_children_list(nodes) == expected
+    assert held == {}
+    assert len(expected[server.nodes.server.nodeid]) > 4
+
+
+def test_browse_page(uaclient, server):
+    node = server.nodes.server
+    uaclient.browse_cache.clear()
+    # all references fit in the page, they are cached sorted
+    descs, point = uaclient.loop.run(uaclient.browse_page_async(node, 1000))
+    assert point is None
+    assert sorted(descs, key=lambda desc: desc.BrowseName) == uaclient.get_children(
+        node
+    )
+    assert uaclient.browse_cache.get(node.nodeid) is not None
+    uaclient.browse_cache.clear()
+    aio_client = uaclient.client.aio_obj.uaclient
+    browse = aio_client.browse
+
+    async def paged_browse(params):
+        assert params.RequestedMaxReferencesPerNode == 2
+        results = await browse(params)
+        results[0].References = results[0].References[:2]
+        results[0].ContinuationPoint = b"next"
+        return results
+
+    with patch.object(aio_client, "browse", paged_browse):
+        descs, point = uaclient.loop.run(uaclient.browse_page_async(node, 2))
+    assert len(descs) == 2 and point == b"next"
+    assert uaclient.browse_cache.get(node.nodeid) is None
+    # held points are left out of the budget of browse_async
+    assert uaclient.held_continuation_points == 1
+
+    async def browse_next(params):
+        return [ua.BrowseResult() for _ in params.ContinuationPoints]
+
+    with patch.object(aio_client, "browse_next", browse_next):
+        uaclient.loop.run(uaclient.release_continuation_points_async([point]))
+    assert uaclient.held_continuation_points == 0
+
+
+def test_read_history(uaclient, historized_variable):
+    variable, now = historized_variable
+    # the test server selects history by server timestamp
+    times, values = uaclient.read_history(
+        variable, now - timedelta(seconds=200), now + timedelta(seconds=10)
+    )
+    # sorted by source timestamp, the initial value being the most recent
+    assert list(values) == [float(i) for i in range(1, 11)] + [0.0]
+    assert list(times) == sorted(times)
+    assert times[0] == (now - timedelta(seconds=99)).timestamp()
+
+    times, values = uaclient.read_history(
+        variable, now - timedelta(seconds=200), now, max_values=4
+    )
+    assert len(values) == 4
+
+
+def test_history_continuation_points(uaclient, server):
+    nodes = [server.nodes.server, server.nodes.objects]
+
+    def result(value, point):
+        dv = ua.DataValue(ua.Variant(value), SourceTimestamp=datetime.now(timezone.utc))
+        result = ua.HistoryReadResult()
+        result.ContinuationPoint = point
+        result.HistoryData = ua.HistoryData(DataValues=[dv])
+        return result
+
+    pages = [
+        [result(1.0, b"a"), result(2.0, None)],
+        [result(3.0, b"b")],
+        [result(4.0, None)],
+    ]
+    requests = []
+
+    async def history_read(params):
+        requests.append(params)
+        if params.ReleaseContinuationPoints:
+            return []
+        return pages.pop(0)
+
+    uaclient.client.aio_obj.uaclient.history_read = history_read
+
+    async def read_all():
+        return [
+            (node.nodeid, [dv.Value.Value for dv in dvs])
+            async for node, dvs in uaclient.history_pages_async(
+                nodes, ua.ReadRawModifiedDetails()
+            )
+        ]
+
+    assert uaclient.loop.run(read_all()) == [
+        (nodes[0].nodeid, [1.0]),
+        (nodes[1].nodeid, [2.0]),
+        (nodes[0].nodeid, [3.0]),
+        (nodes[0].nodeid, [4.0]),
+    ]
+    assert [rv.ContinuationPoint for rv in requests[1].NodesToRead] == [b"a"]
+    assert [rv.ContinuationPoint for rv in requests[2].NodesToRead] == [b"b"]
+
+    # points still held are released when reading stops early
+    pages[:] = [[result(1.0, b"c"), result(2.0, None)]]
+    requests.clear()
+
+    async def read_first():
+        pages_iter = uaclient.history_pages_async(nodes, ua.ReadRawModifiedDetails())
+        await pages_iter.__anext__()
+        await pages_iter.aclose()
+
+    uaclient.loop.run(read_first())
+    assert requests[-1].ReleaseContinuationPoints
+    assert [rv.ContinuationPoint for rv in requests[-1].NodesToRead] == [b"c"]
+
+    # a failing node is skipped, only its continuation point is released
+    failing = result(0.0, b"d")
+    failing.StatusCode = ua.StatusCode(ua.StatusCodes.BadHistoryOperationInvalid)
+    pages[:] = [[failing, result(1.0, b"e")], [result(2.0, None)]]
+    requests.clear()
+    failed = {}
+
+    async def read_failing():
+        return [
+            (node.nodeid, [dv.Value.Value for dv in dvs])
+            async for node, dvs in uaclient.history_pages_async(
+                nodes, ua.ReadRawModifiedDetails(), failed
+            )
+        ]
+
+    assert uaclient.loop.run(read_failing()) == [
+        (nodes[1].nodeid, [1.0]),
+        (nodes[1].nodeid, [2.0]),
+    ]
+    assert failed == {nodes[0].nodeid: failing.StatusCode}
+    assert requests[1].ReleaseContinuationPoints
+    assert [rv.ContinuationPoint for rv in requests[1].NodesToRead] == [b"d"]
+    assert [rv.ContinuationPoint for rv in requests[2].NodesToRead] == [b"e"]
+
+
+def test_raw_history_pages(uaclient, server):
+    nodes = [server.nodes.server, server.nodes.objects, server.nodes.types]
+    uaclient.max_concurrent_requests = 2
+    uaclient.history_page_size = 4
+    requests = []
+
+    async def history_read(params):
+        requests.append(params)
+        results = []
+        for rv in params.NodesToRead:
+            if rv.NodeId == nodes[2].nodeid:
+                raise ua.UaStatusCodeError(ua.StatusCodes.BadHistoryOperationInvalid)
+            dv = ua.DataValue(ua.Variant(rv.ContinuationPoint or b""))
+            result = ua.HistoryReadResult()
+            # two pages per node
+            result.ContinuationPoint = None if rv.ContinuationPoint else b"next"
+            result.HistoryData = ua.HistoryData(DataValues=[dv])
+            results.append(result)
+        return results
+
+    uaclient.client.aio_obj.uaclient.history_read = history_read
+
+    async def read_all(nodes):
+        return [
+            (node.nodeid, dvs[0].Value.Value)
+            async for node, dvs in uaclient.raw_history_pages_async(nodes, None, None)
+        ]
+
+    pages = uaclient.loop.run(read_all(nodes[:2]))
+    assert sorted(pages) == sorted(
+        (node.nodeid, value) for node in nodes[:2] for value in (b"", b"next")
+    )
+    # one group per node, asking for the whole page size
+    assert {rv.NodeId for params in requests for rv in params.NodesToRead} == {
+        node.nodeid for node in nodes[:2]
+    }
+    assert all(len(params.NodesToRead) == 1 for params in requests)
+    assert requests[0].HistoryReadDetails.NumValuesPerNode == 4
+
+    # a failing group stops the others and is raised
+    with pytest.raises(ua.UaStatusCodeError):
+        uaclient.loop.run(read_all(nodes))
+
+
+def test_model_changes(uaclient, server, fire_model_change):
+    idx = server.register_namespace("model_changes")
+    folder = server.nodes.objects.add_folder(idx, "model_changes_folder")
+    old = folder.add_variable(idx, "old", 1.0)
+    assert uaclient.get_children(folder)[0].NodeId == old.nodeid
+    uaclient.get_children(server.nodes.objects)
+    handler = Mock()
+    uaclient.subscribe_model_changes(handler)
+
+    # the parent of the new node is found by browsing
+    new = folder.add_variable(idx, "new", 2.0)
+    fire_model_change((new.nodeid, ua.ModelChangeStructureVerbMask.NodeAdded))
+    deadline = time.time() + 5
+    while not handler.model_changed.called and time.time() < deadline:
+        time.sleep(0.05)
+    change = handler.model_changed.call_args[0][0]
+    assert change.added == {new.nodeid}
+    assert folder.nodeid in change.references
+    assert uaclient.browse_cache.get(folder.nodeid) is None
+    assert uaclient.browse_cache.get(server.nodes.objects.nodeid) is not None
+    assert len(uaclient.get_children(folder)) == 2
+
+    # the parent of a deleted node is known from the cache
+    handler.reset_mock()
+    old.delete()
+    fire_model_change((old.nodeid, ua.ModelChangeStructureVerbMask.NodeDeleted))
+    deadline = time.time() + 5
+    while not handler.model_changed.called and time.time() < deadline:
+        time.sleep(0.05)
+    change = handler.model_changed.call_args[0][0]
+    assert change.references == {folder.nodeid}
+    assert [desc.NodeId for desc in uaclient.get_children(folder)] == [new.nodeid]
+
+
+def test_read_node_view(uaclient, server):
+    server_node = server.nodes.server
+    attrs, refs = uaclient.read_node_view(server_node)
+    values = dict(attrs)
+    assert values[ua.AttributeIds.NodeId].Value.Value == server_node.nodeid
+    assert values[ua.AttributeIds.NodeClass].Value.Value == ua.NodeClass.Object
+    assert ua.AttributeIds.Value not in values  # not readable on objects
+    expected = server_node.get_children_descriptions(refs=ua.ObjectIds.References)
+    assert {ref.NodeId for ref in refs} == {ref.NodeId for ref in expected}
@@ -0,0 +1,83 @@
+from dataclasses import dataclass, field
+from typing import List
+from unittest.mock import Mock, patch
+
+from asyncua import ua
+
+from uaclient.subscription_model import SubscriptionModel
+from uaclient.value_formatter import ValueFormatter
+
+
+@dataclass
+class Point:
+    X: float = 0.0
+    Y: float = 0.0
+
+
+@dataclass
+class Path:
+    Name: str = ""
+    Points: List[Point] = field(default_factory=list)
+
+
+def test_format_scalar():
+    formatter = ValueFormatter()
+    assert formatter.format(ua.Variant(1.5)) == "1.5"
+    assert formatter.format(ua.Variant("text")) == "text"
+    assert formatter.format(ua.Variant(None)) == "None"
+
+
+def test_formatter_cached_per_type():
+    formatter = ValueFormatter()
+    formatter.format(ua.Variant(1.5))
+    formatter.format(ua.Variant(2.5))
+    formatter.format(ua.Variant([1.5, 2.5]))
+    assert set(formatter._formatters) == {
+        (None, ua.VariantType.Double, False),
+        (None, ua.VariantType.Double, True),
+    }
+
+
+def test_format_large_array():
+    formatter = ValueFormatter(max_items=3)
+    text = formatter.format(ua.Variant(list(range(100000)), ua.VariantType.Int32))
+    assert text == "[0, 1, 2, ... (100000 items)]"
+
+
+def test_format_long_text():
+    formatter = ValueFormatter(max_chars=10)
+    assert formatter.format(ua.Variant("x" * 1000)) == "x" * 10 + "..."
+
+
+def test_format_bytes():
+    formatter = ValueFormatter(max_chars=8)
+    text = formatter.format(ua.Variant(b"\x01\x02" * 100, ua.VariantType.ByteString))
+    assert text == "01020102... (200 bytes)"
+
+
+def test_format_struct():
+    formatter = ValueFormatter(max_items=2)
+    path = Path("path", [Point(1.0, 2.0)] * 5)
+    text = formatter.format(ua.Variant(path, ua.VariantType.ExtensionObject))
+    assert text == "Path(Name=path, Points=[Point(...), Point(...), ... (5 items)])"
+
+
+def test_format_structs_in_column(qtbot):
+    # two rows of the same column, nodes of two structure DataTypes
+    point_type, path_type = ua.NodeId(1, 9), ua.NodeId(2, 9)
+    nodes = [Mock(nodeid=ua.NodeId(i, 9)) for i in (10, 11)]
+    model = SubscriptionModel(ValueFormatter(max_items=1))
+    model.add_nodes(nodes, ["point", "path"])
+    model.set_data_types(nodes, [point_type, path_type])
+    with patch.dict(
+        ua.extension_objects_by_datatype, {point_type: Point, path_type: Path}
+    ):
+        for node, value in zip(nodes, [Point(1.0, 2.0), Path("path", [Point()])]):
+            variant = ua.Variant(value, ua.VariantType.ExtensionObject)
+            model.update(node, ua.DataValue(variant))
+        assert model.index(0, 1).data() == "Point(X=1.0, ...)"
+        assert model.index(1, 1).data() == "Path(Name=path, ...)"
+    assert set(model.formatter._formatters) == {
+        (point_type, ua.VariantType.ExtensionObject, False),
+        (path_type, ua.VariantType.ExtensionObject, False),
+    }
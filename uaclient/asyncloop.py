@@ -0,0 +1,108 @@
+import asyncio
+import itertools
+import logging
+import weakref
+
+from PyQt5.QtCore import pyqtSignal, QObject, Qt
+
+from asyncua.sync import ThreadLoop
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncLoop(QObject):
+    """
+    asyncio event loop running in a background thread.
+    Coroutines are scheduled from the GUI thread without blocking it and
+    their results are handed back to the Qt event loop through a queued signal
+    """
+
+    _finished = pyqtSignal(object)
+    _progressed = pyqtSignal(int, object)
+    _released = pyqtSignal(int)
+
+    def __init__(self, timeout=120):
+        QObject.__init__(self)
+        self.tloop = ThreadLoop(timeout)
+        self.tloop.daemon = True
+        self.tloop.start()
+        # kept here rather than in the futures, which may be released in
+        # the loop thread along with the last reference to a widget
+        self._callbacks = {}  # future -> (callback, errback)
+        self._finished.connect(self._dispatch, type=Qt.QueuedConnection)
+        self._progress = {}  # token -> callback of a progress relay
+        self._tokens = itertools.count()
+        self._progressed.connect(self._dispatch_progress, type=Qt.QueuedConnection)
+        self._released.connect(self._release_progress, type=Qt.QueuedConnection)
+
+    @property
+    def loop(self):
+        return self.tloop.loop
+
+    def run(self, coro):
+        """
+        run coroutine in the loop thread and block until it returns
+        """
+        return self.tloop.post(coro)
+
+    def submit(self, coro, callback=None, errback=None):
+        """
+        schedule coroutine in the loop thread and return immediately.
+        callback(result) or errback(exception) is then called in the GUI thread
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        self._callbacks[future] = (callback, errback)
+        future.add_done_callback(self._finished.emit)
+        return future
+
+    def progress(self, callback):
+        """
+        return a function coroutines call from the loop thread to report
+        progress, callback is then called in the GUI thread with the same
+        arguments. The function only holds a token, callback stays here
+        until the loop thread drops the function
+        """
+        token = next(self._tokens)
+        self._progress[token] = callback
+        relay = _ProgressRelay(self._progressed.emit, token)
+        weakref.finalize(relay, self._released.emit, token)
+        return relay
+
+    def _dispatch_progress(self, token, args):
+        callback = self._progress.get(token)
+        if callback is not None:
+            callback(*args)
+
+    def _release_progress(self, token):
+        self._progress.pop(token, None)
+
+    def _dispatch(self, future):
+        callback, errback = self._callbacks.pop(future, (None, None))
+        if future.cancelled():
+            return
+        ex = future.exception()
+        if ex is not None:
+            if errback is None:
+                logger.error("Background task failed: %r", ex)
+            else:
+                errback(ex)
+        elif callback is not None:
+            callback(future.result())
+
+    def stop(self):
+        self.tloop.stop()
+        # results and progress still queued are not handed to the GUI
+        self._callbacks.clear()
+        self._progress.clear()
+
+
+class _ProgressRelay(object):
+    # what the loop thread holds of a progress callback
+
+    def __init__(self, emit, token):
+        self._emit = emit
+        self._token = token
+
+    def __call__(self, *args):
+        self._emit(self._token, args)
@@ -0,0 +1,38 @@
+from functools import partial
+
+from uawidgets import attrs_widget
+
+
+class AttrsWidget(attrs_widget.AttrsWidget):
+    """
+    AttrsWidget from uawidgets showing attributes read beforehand,
+    see UaClient.read_node_view_async
+    """
+
+    def __init__(self, view, uaclient):
+        super().__init__(view)
+        self.uaclient = uaclient
+        self._attrs = None
+        self._future = None
+
+    def show_attrs(self, node, attrs=None):
+        # without attrs, e.g. on reload, they are read in the background
+        # and shown once they arrive
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        if attrs is None and node is not None:
+            self._future = self.uaclient.submit(
+                self.uaclient.read_all_attributes_async(node),
+                callback=partial(self.show_attrs, node),
+                errback=self.error.emit,
+            )
+            return
+        self._attrs = attrs
+        try:
+            super().show_attrs(node)
+        finally:
+            self._attrs = None
+
+    def get_all_attrs(self):
+        return self._attrs or []
@@ -0,0 +1,124 @@
+from collections import OrderedDict
+import threading
+
+from asyncua import ua
+
+
+class BrowseFilter(object):
+    """
+    what a Browse asks for besides the node, part of the cache keys
+    """
+
+    def __init__(
+        self,
+        reference_type=ua.ObjectIds.HierarchicalReferences,
+        direction=ua.BrowseDirection.Forward,
+        include_subtypes=True,
+        node_class_mask=ua.NodeClass.Unspecified,
+    ):
+        self.reference_type = ua.NodeId(reference_type)
+        self.direction = direction
+        self.include_subtypes = include_subtypes
+        self.node_class_mask = node_class_mask
+
+    def _key(self):
+        return (
+            self.reference_type,
+            self.direction,
+            self.include_subtypes,
+            self.node_class_mask,
+        )
+
+    def __eq__(self, other):
+        return isinstance(other, BrowseFilter) and self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def description(self, nodeid):
+        desc = ua.BrowseDescription()
+        desc.NodeId = nodeid
+        desc.BrowseDirection = self.direction
+        desc.ReferenceTypeId = self.reference_type
+        desc.IncludeSubtypes = self.include_subtypes
+        desc.NodeClassMask = self.node_class_mask
+        desc.ResultMask = ua.BrowseResultMask.All
+        return desc
+
+
+CHILDREN = BrowseFilter()
+PARENTS = BrowseFilter(direction=ua.BrowseDirection.Inverse)
+REFERENCES = BrowseFilter(reference_type=ua.ObjectIds.References)
+
+
+class BrowseCache(object):
+    """
+    ReferenceDescriptions of browsed nodes by (NodeId, BrowseFilter).
+    Memory is bounded by the number of references held: past
+    max_references the least recently used nodes are evicted.
+    Safe to use from the GUI and the loop thread
+    """
+
+    def __init__(self, max_references=200000):
+        self.max_references = max_references
+        self._entries = OrderedDict()  # (nodeid, filter) -> descriptions
+        self._size = 0  # references held, empty nodes count as one
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def size(self):
+        return self._size
+
+    def get(self, nodeid, browse_filter=CHILDREN):
+        """
+        cached descriptions or None, a hit makes the node most recently used
+        """
+        key = (nodeid, browse_filter)
+        with self._lock:
+            descs = self._entries.get(key)
+            if descs is not None:
+                self._entries.move_to_end(key)
+            return descs
+
+    def put(self, nodeid, descs, browse_filter=CHILDREN):
+        key = (nodeid, browse_filter)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= _cost(old)
+            self._entries[key] = descs
+            self._size += _cost(descs)
+            while self._size > self.max_references and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= _cost(evicted)
+
+    def invalidate(self, nodeid):
+        """
+        forget the references of nodeid for all filters
+        """
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == nodeid]:
+                self._size -= _cost(self._entries.pop(key))
+
+    def referrers(self, nodeid):
+        """
+        nodeids whose cached references, of any filter, lead to nodeid
+        """
+        with self._lock:
+            return {
+                key[0]
+                for key, descs in self._entries.items()
+                if any(desc.NodeId == nodeid for desc in descs)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+
+def _cost(descs):
+    return max(1, len(descs))
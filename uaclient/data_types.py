@@ -0,0 +1,281 @@
+import asyncio
+import base64
+from datetime import datetime
+from enum import IntFlag
+import hashlib
+from importlib.metadata import version
+import json
+import logging
+import os
+
+from asyncua import ua
+from asyncua.common.structures104 import (
+    clean_name,
+    load_custom_struct_xml_import,
+    load_enum_xml_import,
+)
+from asyncua.common.utils import Buffer
+from asyncua.ua.ua_binary import struct_from_binary, struct_to_binary
+
+from uaclient.browse_cache import PARENTS
+
+
+logger = logging.getLogger(__name__)
+
+
+ALIAS = "alias"
+ENUM = "enum"
+OPTION_SET = "option_set"
+STRUCTURE = "structure"
+
+
+class DataType(object):
+    """
+    custom data type of a server and what is needed to generate its class
+    again: the DataTypeDefinition, with the fields of custom supertypes for
+    structures, or the parent name for basetype aliases
+    """
+
+    def __init__(self, kind, name, nodeid, definition):
+        self.kind = kind
+        self.name = name
+        self.nodeid = nodeid
+        self.definition = definition
+
+    def __str__(self):
+        return f"DataType({self.kind}, {self.name}, {self.nodeid})"
+
+    __repr__ = __str__
+
+    def to_json(self):
+        definition = self.definition
+        if self.kind != ALIAS:
+            definition = [
+                type(definition).__name__,
+                base64.b64encode(struct_to_binary(definition)).decode("ascii"),
+            ]
+        return [self.kind, self.name, self.nodeid.to_string(), definition]
+
+    @classmethod
+    def from_json(cls, data):
+        kind, name, nodeid, definition = data
+        if kind != ALIAS:
+            typename, encoded = definition
+            definition = struct_from_binary(
+                getattr(ua, typename), Buffer(base64.b64decode(encoded))
+            )
+        return cls(kind, name, ua.NodeId.from_string(nodeid), definition)
+
+
+class DataTypeCache(object):
+    """
+    Custom data types of the servers connected to, one JSON file per
+    endpoint in directory. Types are reused as long as the server
+    answers with the same model key, see read_model_key(), along with
+    whether the server has spec <= 1.03 type dictionaries to load
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def path(self, uri):
+        name = hashlib.sha256(uri.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, name + ".json")
+
+    def load(self, uri, key):
+        """
+        return (types, dictionaries) cached for uri, None if there are
+        none for key
+        """
+        try:
+            with open(self.path(uri), encoding="utf-8") as f:
+                data = json.load(f)
+            if data["key"] != key:
+                logger.info("Model of %s changed, reading its data types", uri)
+                return None
+            types = [DataType.from_json(item) for item in data["types"]]
+            return types, data.get("dictionaries", True)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            logger.warning("Ignoring data type cache of %s: %r", uri, ex)
+            return None
+
+    def save(self, uri, key, types, dictionaries=True):
+        data = {
+            "key": key,
+            "types": [datatype.to_json() for datatype in types],
+            "dictionaries": dictionaries,
+        }
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            path = self.path(uri)
+            # replaced at once, a half written file is never read
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(path + ".tmp", path)
+        except OSError as ex:
+            logger.warning("Could not cache data types of %s: %r", uri, ex)
+
+
+async def read_model_key(uaclient, uri):
+    """
+    what identifies the types of a server: endpoint, NamespaceArray, build
+    info and namespace versions, and the asyncua version generating them
+    """
+    nodeids = [
+        ua.ObjectIds.Server_NamespaceArray,
+        ua.ObjectIds.Server_ServerStatus_BuildInfo_ProductUri,
+        ua.ObjectIds.Server_ServerStatus_BuildInfo_SoftwareVersion,
+        ua.ObjectIds.Server_ServerStatus_BuildInfo_BuildNumber,
+        ua.ObjectIds.Server_ServerStatus_BuildInfo_BuildDate,
+    ]
+    dvs = await uaclient.read_attributes_async([ua.NodeId(i) for i in nodeids])
+    namespaces, *build_info = [_jsonable(dv.Value.Value) for dv in dvs]
+    return {
+        "endpoint": uri,
+        "asyncua": version("asyncua"),
+        "namespaces": namespaces,
+        "build_info": build_info,
+        "namespace_versions": await _read_namespace_versions(uaclient),
+    }
+
+
+async def _read_namespace_versions(uaclient):
+    # Server/Namespaces holds one object per namespace with its
+    # NamespaceUri, NamespaceVersion and NamespacePublicationDate
+    names = ["NamespaceUri", "NamespaceVersion", "NamespacePublicationDate"]
+    namespaces = ua.NodeId(ua.ObjectIds.Server_Namespaces)
+    (descs,) = (await uaclient.browse_async([namespaces], cache=False)).values()
+    if isinstance(descs, ua.StatusCode):
+        return []
+    objects = [desc.NodeId for desc in descs if desc.NodeClass == ua.NodeClass.Object]
+    nodeids = []
+    for descs in (await uaclient.browse_async(objects, cache=False)).values():
+        if isinstance(descs, ua.StatusCode):
+            continue
+        props = {desc.BrowseName.Name: desc.NodeId for desc in descs}
+        if all(name in props for name in names):
+            nodeids.extend(props[name] for name in names)
+    dvs = await uaclient.read_attributes_async(nodeids)
+    values = [_jsonable(dv.Value.Value) for dv in dvs]
+    return sorted(map(list, zip(values[0::3], values[1::3], values[2::3])))
+
+
+async def load_data_types(uaclient, progress=None):
+    """
+    generate the custom data types of the server with asyncua
+    load_data_type_definitions(). progress(text) is called as loading
+    goes on. return DataTypes of the generated ones, in the order they
+    were generated, to be cached
+    """
+    if progress is not None:
+        progress("Loading data type definitions")
+    classes = await uaclient.client.aio_obj.load_data_type_definitions()
+    if progress is not None:
+        progress(f"Reading {len(classes)} data type definitions to cache")
+    return await _data_types(uaclient, classes)
+
+
+async def _data_types(uaclient, classes):
+    # DataTypes of {name: class} generated by asyncua, with their
+    # definitions read again since asyncua does not keep them
+    aliases = {name: nodeid for nodeid, name in ua.basetype_by_datatype.items()}
+    types = {}
+    defined = []
+    for name, cls in classes.items():
+        if name in aliases:
+            # an alias is the class of its basetype, e.g. ua.Double
+            types[name] = DataType(ALIAS, name, aliases[name], cls.__name__)
+        elif cls in ua.enums_datatypes:
+            kind = OPTION_SET if issubclass(cls, IntFlag) else ENUM
+            defined.append((kind, name, ua.enums_datatypes[cls]))
+        elif cls in ua.datatype_by_extension_object:
+            defined.append((STRUCTURE, name, ua.datatype_by_extension_object[cls]))
+    nodeids = [nodeid for _, _, nodeid in defined]
+    structures = [nodeid for kind, _, nodeid in defined if kind == STRUCTURE]
+    dvs, parents = await asyncio.gather(
+        uaclient.read_attributes_async(nodeids, ua.AttributeIds.DataTypeDefinition),
+        uaclient.browse_async(structures, PARENTS, cache=False),
+    )
+    definitions = dict(zip(nodeids, dvs))
+    supertypes = {
+        nodeid: descs[0].NodeId
+        for nodeid, descs in parents.items()
+        if not isinstance(descs, ua.StatusCode) and descs
+    }
+
+    def fields(nodeid):
+        # like asyncua, the fields of custom supertypes come first
+        own = list(definitions[nodeid].Value.Value.Fields)
+        parent = supertypes.get(nodeid)
+        if parent in structures and definitions[parent].StatusCode.is_good():
+            return fields(parent) + own
+        return own
+
+    for kind, name, nodeid in defined:
+        dv = definitions[nodeid]
+        if not dv.StatusCode.is_good():
+            logger.warning("Not caching %s: %s", name, dv.StatusCode.name)
+            continue
+        definition = dv.Value.Value
+        if kind == STRUCTURE:
+            definition.Fields = fields(nodeid)
+        types[name] = DataType(kind, name, nodeid, definition)
+    return [types[name] for name in classes if name in types]
+
+
+async def register_data_types(types):
+    """
+    generate the classes of types, DataTypes from load_data_types(), like
+    asyncua does for data types imported from XML, skipping the names the
+    ua module already has. return {name: class} of the generated ones
+    """
+    new = {}
+    for datatype in types:
+        if hasattr(ua, datatype.name):
+            continue
+        try:
+            if datatype.kind == ALIAS:
+                cls = getattr(ua, datatype.definition)
+                ua.register_basetype(datatype.name, datatype.nodeid, cls)
+            else:
+                attrs = ua.DataTypeAttributes(
+                    DisplayName=ua.LocalizedText(datatype.name)
+                )
+                attrs.DataTypeDefinition = datatype.definition  # type: ignore
+                if datatype.kind == STRUCTURE:
+                    cls = await load_custom_struct_xml_import(datatype.nodeid, attrs)
+                else:
+                    cls = await load_enum_xml_import(
+                        datatype.nodeid, attrs, datatype.kind == OPTION_SET
+                    )
+        except Exception as ex:
+            logger.warning("Could not generate %s: %r", datatype, ex)
+            continue
+        new[datatype.name] = cls
+    return new
+
+
+def is_registered(nodeid):
+    """
+    True if the ua module has a class for data type nodeid
+    """
+    if nodeid.NamespaceIndex == 0 and nodeid.Identifier in ua.ObjectIdNames:
+        if hasattr(ua, clean_name(ua.ObjectIdNames[nodeid.Identifier])):
+            return True
+    return (
+        nodeid in ua.extension_objects_by_datatype
+        or nodeid in ua.enums_by_datatype
+        or nodeid in ua.basetype_by_datatype
+    )
+
+
+def _jsonable(value):
+    if isinstance(value, list):
+        return [_jsonable(v) for v in value]
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return (
+        value if value is None or isinstance(value, (bool, int, float)) else str(value)
+    )
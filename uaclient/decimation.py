@@ -0,0 +1,151 @@
+import numpy as np
+
+from uaclient.ring_buffer import RingBuffer
+
+
+def minmax_reduce(positions, mins, maxs, width):
+    """
+    reduce sorted samples to at most width (min, max) pairs,
+    one per pixel column
+    """
+    if len(positions) > width:
+        idx = np.unique(
+            np.linspace(0, len(positions), width, endpoint=False).astype(int)
+        )
+        positions = positions[idx]
+        mins = np.minimum.reduceat(mins, idx)
+        maxs = np.maximum.reduceat(maxs, idx)
+    return positions, mins, maxs
+
+
+class DecimatingBuffer(RingBuffer):
+    """
+    RingBuffer which also keeps the min and max of aligned blocks of
+    samples at a few block sizes, updated as samples arrive.
+    envelope() picks the coarsest level giving at least one block per
+    pixel, so the cost of drawing depends on the screen width and not on
+    the number of samples in view
+    """
+
+    factors = (64, 4096, 262144)
+
+    def _allocate(self, capacity):
+        super()._allocate(capacity)
+        self._total = 0  # samples appended since creation, gives alignment
+        self._levels = []
+        for factor in self.factors:
+            size = capacity // factor + 2
+            # times hold the absolute index of the first sample of the block
+            self._levels.append((RingBuffer(size), RingBuffer(size)))
+        self._partial = [None] * len(self.factors)  # (min, max) of open blocks
+
+    def append(self, timestamp, value):
+        super().append(timestamp, value)
+        index = self._total
+        self._total += 1
+        for level, factor in enumerate(self.factors):
+            partial = self._partial[level]
+            if partial is None or index % factor == 0:
+                low = high = value
+            else:
+                low, high = min(partial[0], value), max(partial[1], value)
+            if (index + 1) % factor:
+                self._partial[level] = (low, high)
+            else:
+                mins, maxs = self._levels[level]
+                start = index + 1 - factor
+                mins.append(start, low)
+                maxs.append(start, high)
+                self._partial[level] = None
+
+    def extend(self, timestamps, values):
+        super().extend(timestamps, values)
+        self._total += len(values)
+        self._rebuild_levels()
+
+    def resize(self, capacity):
+        if capacity == self.capacity:
+            return
+        total = self._total
+        super().resize(capacity)  # counts the kept samples from 0
+        self._total = total
+        self._rebuild_levels()
+
+    def clear(self):
+        super().clear()
+        self._total = 0
+        self._rebuild_levels()
+
+    def _rebuild_levels(self):
+        values = self.values()
+        first = self._total - len(values)  # absolute index of values[0]
+        for level, factor in enumerate(self.factors):
+            mins, maxs = self._levels[level]
+            mins.clear()
+            maxs.clear()
+            self._partial[level] = None
+            start = -(-first // factor) * factor
+            full = (self._total // factor) * factor
+            split = max(full - first, 0)
+            if full > start:
+                blocks = np.arange(start, full, factor)
+                idx = blocks - first
+                mins.extend(blocks, np.minimum.reduceat(values[:split], idx))
+                maxs.extend(blocks, np.maximum.reduceat(values[:split], idx))
+            if full < self._total:
+                tail = values[split:]
+                self._partial[level] = (tail.min(), tail.max())
+
+    def envelope(self, start, end, width):
+        """
+        min/max envelope of the samples between positions start and end,
+        at most about width points.
+        return (positions, values) where positions are indexes in values()
+        """
+        start, end = max(0, start), min(len(self), end)
+        if end <= start:
+            return np.zeros(0), np.zeros(0)
+        width = max(1, width)
+        level = len(self.factors) - 1
+        while level >= 0 and self.factors[level] * width > end - start:
+            level -= 1
+        if level < 0:
+            positions = np.arange(start, end)
+            values = self.values()[start:end]
+            if end - start <= width:
+                return positions, values
+            pieces = [(positions, values, values)]
+        else:
+            offset = self._total - len(self)
+            pieces = self._pieces(level, start + offset, end + offset)
+            pieces = [(pos - offset, low, high) for pos, low, high in pieces]
+        positions, mins, maxs = minmax_reduce(
+            *(np.concatenate(column) for column in zip(*pieces)), width
+        )
+        # a vertical segment per pixel column
+        return np.repeat(positions, 2), np.column_stack((mins, maxs)).ravel()
+
+    def _pieces(self, level, start, end):
+        # (positions, mins, maxs) covering absolute indexes [start, end)
+        if end <= start:
+            return []
+        if level < 0:
+            first = self._total - len(self)
+            lo, hi = start - first, end - first
+            values = self.values()[lo:hi]
+            return [(np.arange(start, end), values, values)]
+        factor = self.factors[level]
+        block_start = -(-start // factor) * factor
+        block_end = (end // factor) * factor
+        if block_end <= block_start:
+            return self._pieces(level - 1, start, end)
+        mins, maxs = self._levels[level]
+        stored = mins.times()
+        lo = np.searchsorted(stored, block_start)
+        hi = np.searchsorted(stored, block_end)
+        block_end = block_start + (hi - lo) * factor  # complete blocks only
+        return (
+            self._pieces(level - 1, start, block_start)
+            + [(stored[lo:hi], mins.values()[lo:hi], maxs.values()[lo:hi])]
+            + self._pieces(level - 1, block_end, end)
+        )
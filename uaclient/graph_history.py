@@ -0,0 +1,166 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from functools import partial
+
+import numpy as np
+
+from asyncua import ua
+
+from uaclient.decimation import DecimatingBuffer
+
+
+logger = logging.getLogger(__name__)
+
+
+# aggregates read for long ranges, in the order of comboBoxAggregate.
+# Minimum and Maximum together are drawn as an envelope, no aggregate
+# means raw values decimated by the client
+AGGREGATES = [
+    (ua.ObjectIds.AggregateFunction_Minimum, ua.ObjectIds.AggregateFunction_Maximum),
+    (ua.ObjectIds.AggregateFunction_Minimum,),
+    (ua.ObjectIds.AggregateFunction_Maximum,),
+    (ua.ObjectIds.AggregateFunction_Average,),
+    (ua.ObjectIds.AggregateFunction_Interpolative,),
+    (),
+]
+
+
+class ChannelHistory(object):
+    """
+    History of one graph channel for the time range being looked at.
+    Only the range needed by the view is read from the server, it is
+    replaced by a new read when the view moves outside of it or zooms
+    in past the resolution read.
+    Ranges holding more values than pixels are read as server side
+    aggregates, one value per pixel, when the server supports them
+    """
+
+    raw_per_pixel = 4  # raw values per pixel read before using aggregates
+
+    def __init__(self, uaclient, node, max_values=100000):
+        self.uaclient = uaclient
+        self.node = node
+        self.max_values = max_values
+        self.aggregates = AGGREGATES[0]
+        self.processed = True  # server answers ReadProcessed for this node
+        self.density = 0  # raw values per second, known once they did not fit
+        self.start = None  # time range covered by buffer, POSIX seconds
+        self.end = None
+        self.interval = 0  # seconds per value read, 0 for raw values
+        self.buffer = DecimatingBuffer(1)
+        self.fetching = False
+        self.supported = True
+
+    def set_aggregates(self, aggregates):
+        if aggregates != self.aggregates:
+            self.aggregates = aggregates
+            self.start = self.end = None  # read again with new aggregates
+
+    def needs(self, start, end, width):
+        if not self.supported or self.fetching:
+            return False
+        if self.start is None or start < self.start or end > self.end:
+            return True
+        # zoomed in past the resolution read
+        return self.interval > 2 * (end - start) / width
+
+    def fetch(self, start, end, width, callback):
+        self.fetching = True
+        self.uaclient.submit(
+            self._read(start, end, width),
+            callback=partial(self._fetched, start, end, callback),
+            errback=self._failed,
+        )
+
+    async def _read(self, start, end, width):
+        width = max(1, int(width))
+        probe = self.raw_per_pixel * width
+        # ranges known to hold too many raw values skip the probe
+        if self.density * (end - start) < probe or not self._processed():
+            times, values = await self.uaclient.read_history_async(
+                self.node, _datetime(start), _datetime(end), probe
+            )
+            if len(values) < probe:  # all raw values fit on screen
+                return np.frombuffer(times), np.frombuffer(values), 0
+            span = np.frombuffer(times)[-1] - start
+            self.density = probe / span if span > 0 else float("inf")
+        if self._processed():
+            interval = (end - start) / width
+            try:
+                results = await asyncio.gather(
+                    *(
+                        self.uaclient.read_processed_history_async(
+                            self.node,
+                            _datetime(start),
+                            _datetime(end),
+                            interval,
+                            aggregate,
+                        )
+                        for aggregate in self.aggregates
+                    )
+                )
+            except ua.UaStatusCodeError as ex:
+                logger.info(
+                    "Aggregates of %s not available, decimating raw values: %r",
+                    self.node,
+                    ex,
+                )
+                self.processed = False
+            else:
+                return (*_combine(results), interval)
+        times, values = await self.uaclient.read_history_async(
+            self.node, _datetime(start), _datetime(end), self.max_values
+        )
+        if len(values) >= self.max_values:
+            logger.info("History of %s truncated to %s values", self.node, len(values))
+        return np.frombuffer(times), np.frombuffer(values), 0
+
+    def _processed(self):
+        return bool(self.aggregates) and self.processed
+
+    def _fetched(self, start, end, callback, result):
+        self.fetching = False
+        times, values, interval = result
+        self.start, self.end = start, end
+        self.interval = interval
+        self.buffer = DecimatingBuffer(max(1, len(values)))
+        self.buffer.extend(times, values)
+        callback()
+
+    def _failed(self, ex):
+        self.fetching = False
+        self.supported = False
+        logger.warning("Reading history of %s failed: %r", self.node, ex)
+
+    def envelope(self, start, end, width):
+        """
+        min/max envelope of the history between start and end times.
+        return (timestamps, values)
+        """
+        times = self.buffer.times()
+        # keep one sample before start so the line reaches the border
+        first = int(np.searchsorted(times, start)) - 1
+        last = int(np.searchsorted(times, end))
+        positions, values = self.buffer.envelope(first, last, width)
+        return times[positions.astype(int)], values
+
+
+def _combine(results):
+    # one aggregate is drawn as is, Minimum and Maximum as a vertical
+    # segment per interval
+    if len(results) == 1:
+        times, values = results[0]
+        return np.frombuffer(times), np.frombuffer(values)
+    (min_times, mins), (max_times, maxs) = results
+    times, min_idx, max_idx = np.intersect1d(
+        np.frombuffer(min_times), np.frombuffer(max_times), return_indices=True
+    )
+    values = np.column_stack(
+        (np.frombuffer(mins)[min_idx], np.frombuffer(maxs)[max_idx])
+    )
+    return np.repeat(times, 2), values.ravel()
+
+
+def _datetime(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
@@ -1,7 +1,9 @@
 #! /usr/bin/env python3
 
 import logging
-from PyQt5.QtCore import QTimer, Qt
+import time
+from functools import partial
+from PyQt5.QtCore import pyqtSignal, QObject, QSettings, QTimer, Qt
 from PyQt5.QtWidgets import QLabel
 
 from asyncua import ua
@@ -13,6 +15,8 @@ use_graph = True
 try:
     import pyqtgraph as pg
     import numpy as np
+    from uaclient.decimation import DecimatingBuffer
+    from uaclient.graph_history import AGGREGATES, ChannelHistory
 except ImportError:
     print("pyqtgraph or numpy are not installed, use of graph feature disabled")
     use_graph = False
@@ -25,6 +29,13 @@ if use_graph:
 logger = logging.getLogger(__name__)
 
 
+class GraphDataHandler(QObject):
+    data_change_fired = pyqtSignal(object, object)
+
+    def datachange_notification(self, node, val, data):
+        self.data_change_fired.emit(node, data.monitored_item.Value)
+
+
 class GraphUI(object):
 
     # use tango color schema (public domain)
@@ -37,10 +48,27 @@ class GraphUI(object):
         "#edd400ff",
     ]
     acceptedDatatypes = ["Decimal128", "Double", "Float", "Integer", "UInteger"]
+    # indexes of comboBoxAcquisition
+    POLLING = 0
+    SUBSCRIPTION = 1
+    # indexes of comboBoxTimestamps
+    SOURCE_TIME = 0
+    SERVER_TIME = 1
+    CLIENT_TIME = 2
+    redraw_intervall = 200  # ms between redraws when fed by a subscription
+    history_delay = 300  # ms without zooming or panning before reading history
+    history_max_values = 100000  # per channel and read
+    channel_attributes = [
+        ua.AttributeIds.DataType,
+        ua.AttributeIds.Value,
+        ua.AttributeIds.DisplayName,
+        ua.AttributeIds.UserAccessLevel,
+    ]
 
     def __init__(self, window, uaclient):
         self.window = window
         self.uaclient = uaclient
+        self.settings = QSettings()
 
         # exit if the modules are not present
         if not use_graph:
@@ -49,12 +77,30 @@ class GraphUI(object):
             )
             return
         self._node_list = []  # holds the nodes to poll
-        self._channels = []  # holds the actual data
+        self._channels = []  # DecimatingBuffer of (POSIX timestamp, value) per node
+        self._histories = []  # ChannelHistory per node, older than _channels
         self._curves = []  # holds the curve objects
-        self.pw = pg.PlotWidget(name="Plot1")
+        self._dirty = set()  # channels with samples not drawn yet
+        self._subscribed = False
+        self._registered = {}  # NodeId -> registered Node used for polling
+        self._polling = False  # a Read is in progress
+        self._adding = set()  # NodeIds of channels being added
+        self.timestamps = None
+        self._handler = GraphDataHandler(window)
+        self._handler.data_change_fired.connect(
+            self._add_sample, type=Qt.QueuedConnection
+        )
+        self.pw = pg.PlotWidget(name="Plot1", axisItems={"bottom": pg.DateAxisItem()})
         self.pw.showGrid(x=True, y=True, alpha=0.3)
         self.legend = self.pw.addLegend()
         self.window.ui.graphLayout.addWidget(self.pw)
+        # curves only hold the envelope of the visible range
+        self.pw.getViewBox().sigXRangeChanged.connect(self._view_changed)
+        # GraphUI is no QObject, the timers belong to the window
+        self._history_timer = QTimer(window)
+        self._history_timer.setSingleShot(True)
+        self._history_timer.setInterval(self.history_delay)
+        self._history_timer.timeout.connect(self._fetch_history)
 
         self.window.ui.actionAddToGraph.triggered.connect(self._add_node_to_channel)
         self.window.ui.actionRemoveFromGraph.triggered.connect(
@@ -65,70 +111,174 @@ class GraphUI(object):
         self.window.ui.treeView.addAction(self.window.ui.actionAddToGraph)
         self.window.ui.treeView.addAction(self.window.ui.actionRemoveFromGraph)
 
+        # polls or redraws depending on the acquisition mode
+        self.timer = QTimer(window)
+        self.timer.timeout.connect(self._tick)
+
         # connect Apply button
         self.window.ui.buttonApply.clicked.connect(self.restartTimer)
         self.restartTimer()
 
     def restartTimer(self):
-        # stop current timer, if it exists
-        if hasattr(self, "timer") and self.timer.isActive():
-            self.timer.stop()
+        self.timer.stop()
 
         # define the number of polls displayed in graph
         self.N = self.window.ui.spinBoxNumberOfPoints.value()
-        self.ts = np.arange(self.N)
         # define the poll intervall
         self.intervall = self.window.ui.spinBoxIntervall.value() * 1000
+        self.mode = self.window.ui.comboBoxAcquisition.currentIndex()
+        timestamps = self.window.ui.comboBoxTimestamps.currentIndex()
+        if self.timestamps is not None and timestamps != self.timestamps:
+            # samples from different clocks cannot share a time axis
+            for channel in self._channels:
+                channel.clear()
+        self.timestamps = timestamps
+        self.aggregates = AGGREGATES[self.window.ui.comboBoxAggregate.currentIndex()]
+        for history in self._histories:
+            history.set_aggregates(self.aggregates)
+        self.register_nodes = self.settings.value(
+            "graph_register_nodes", False, type=bool
+        )
 
-        # overwrite current channel buffers with zeros of current length and add to curves again
+        # resize channel buffers, keeping the most recent samples
         for i, channel in enumerate(self._channels):
-            self._channels[i] = np.zeros(self.N)
-            self._curves[i].setData(self._channels[i])
+            channel.resize(self.N)
+            self._draw(i)
 
-        # starting new timer
-        self.timer = QTimer()
-        self.timer.setInterval(self.intervall)
-        self.timer.timeout.connect(self.pushtoGraph)
+        # monitored items are recreated with the new sampling intervall
+        self._unsubscribe(self._node_list)
+        self._unregister(self._node_list)
+        if self.mode == self.SUBSCRIPTION:
+            self._subscribe(self._node_list)
+        else:
+            self._register(self._node_list)
+
+        if self.mode == self.SUBSCRIPTION:
+            self.timer.setInterval(round(min(self.intervall, self.redraw_intervall)))
+        else:
+            self.timer.setInterval(round(self.intervall))
         self.timer.start()
 
+    def _tick(self):
+        if self.mode == self.SUBSCRIPTION:
+            self._redraw()
+        else:
+            self.pushtoGraph()
+
+    def _subscribe(self, nodes):
+        if not nodes or not self.uaclient.connected:
+            return
+        self._subscribed = True
+        self.uaclient.submit(
+            self.uaclient.subscribe_graph_list_async(
+                list(nodes), self._handler, self.intervall
+            ),
+            callback=self._subscribed_nodes,
+            errback=self.show_error,
+        )
+
+    def _subscribed_nodes(self, handles):
+        for handle in handles:
+            if isinstance(handle, ua.StatusCode):
+                logger.warning("Could not subscribe graph channel: %s", handle.name)
+
+    def _unsubscribe(self, nodes):
+        if not self._subscribed or not nodes or not self.uaclient.connected:
+            return
+        self.uaclient.submit(
+            self.uaclient.unsubscribe_graph_list_async(list(nodes)),
+            errback=self.show_error,
+        )
+
+    def _register(self, nodes):
+        if not self.register_nodes or not nodes or not self.uaclient.connected:
+            return
+        nodes = list(nodes)
+        self.uaclient.submit(
+            self.uaclient.register_nodes_async(nodes),
+            callback=partial(self._nodes_registered, nodes),
+            errback=self.show_error,
+        )
+
+    def _nodes_registered(self, nodes, registered):
+        for node, reg in zip(nodes, registered):
+            self._registered[node.nodeid] = reg
+        # channels removed while registering
+        self._unregister([node for node in nodes if node not in self._node_list])
+
+    def _unregister(self, nodes):
+        registered = [
+            self._registered.pop(node.nodeid)
+            for node in nodes
+            if node.nodeid in self._registered
+        ]
+        if not registered or not self.uaclient.connected:
+            return
+        self.uaclient.submit(
+            self.uaclient.unregister_nodes_async(registered),
+            errback=self.show_error,
+        )
+
     @trycatchslot
     def _add_node_to_channel(self, node=None):
         if not isinstance(node, SyncNode):
             node = self.window.get_current_node()
             if node is None:
                 return
-        if node not in self._node_list:
-            dtype = node.read_attribute(ua.AttributeIds.DataType)
-
-            dtypeStr = ua.ObjectIdNames[dtype.Value.Value.Identifier]
-
-            if dtypeStr in self.acceptedDatatypes and not isinstance(
-                node.get_value(), list
-            ):
-                self._node_list.append(node)
-                displayName = node.read_display_name().Text
-                colorIndex = len(self._node_list) % len(self.colorCycle)
-                self._curves.append(
-                    self.pw.plot(
-                        pen=pg.mkPen(
-                            color=self.colorCycle[colorIndex],
-                            width=3,
-                            style=Qt.SolidLine,
-                        ),
-                        name=displayName,
-                    )
-                )
-                # set initial data to zero
-                self._channels.append(np.zeros(self.N))  # init data sequence with zeros
-                # add the new channel data to the new curve
-                self._curves[-1].setData(self._channels[-1])
-                logger.info("Variable %s added to graph", displayName)
+        if node in self._node_list or node.nodeid in self._adding:
+            return
+        # read in the background, the GUI does not wait for the server
+        self._adding.add(node.nodeid)
+        self.uaclient.submit(
+            self.uaclient.read_node_attributes_async(node, self.channel_attributes),
+            callback=partial(self._add_channel, node),
+            errback=partial(self._add_failed, node),
+        )
 
-            else:
-                logger.info(
-                    "Variable cannot be added to graph because it is of type %s or an array",
-                    dtypeStr,
+    def _add_failed(self, node, ex):
+        self._adding.discard(node.nodeid)
+        self.show_error(ex)
+
+    def _add_channel(self, node, dvs):
+        self._adding.discard(node.nodeid)
+        if node in self._node_list:
+            return
+        dtype, value, displayName, access = [dv.Value.Value for dv in dvs]
+        displayName = displayName.Text if displayName else node.nodeid.to_string()
+        dtypeStr = ua.ObjectIdNames.get(getattr(dtype, "Identifier", None), str(dtype))
+
+        if dtypeStr in self.acceptedDatatypes and not isinstance(value, list):
+            self._node_list.append(node)
+            colorIndex = len(self._node_list) % len(self.colorCycle)
+            self._curves.append(
+                self.pw.plot(
+                    pen=pg.mkPen(
+                        color=self.colorCycle[colorIndex],
+                        width=3,
+                        style=Qt.SolidLine,
+                    ),
+                    name=displayName,
                 )
+            )
+            self._channels.append(DecimatingBuffer(self.N))
+            history = ChannelHistory(self.uaclient, node, self.history_max_values)
+            # most variables are not historized, do not ask for them
+            history.supported = (
+                ua.AccessLevel.HistoryRead in ua.AccessLevel.parse_bitfield(access or 0)
+            )
+            history.set_aggregates(self.aggregates)
+            self._histories.append(history)
+            logger.info("Variable %s added to graph", displayName)
+            if self.mode == self.SUBSCRIPTION:
+                self._subscribe([node])
+            else:
+                self._register([node])
+
+        else:
+            logger.info(
+                "Variable cannot be added to graph because it is of type %s or an array",
+                dtypeStr,
+            )
 
     @trycatchslot
     def _remove_node_from_channel(self, node=None):
@@ -138,24 +288,137 @@ class GraphUI(object):
                 return
         if node in self._node_list:
             idx = self._node_list.index(node)
+            self._unsubscribe([node])
             self._node_list.pop(idx)
-            displayName = node.read_display_name().Text
-            self.legend.removeItem(displayName)
+            self._unregister([node])
+            self.legend.removeItem(self._curves[idx])
             self.pw.removeItem(self._curves[idx])
             self._curves.pop(idx)
             self._channels.pop(idx)
+            self._histories.pop(idx)
+            self._dirty = {i - (i > idx) for i in self._dirty if i != idx}
 
     def pushtoGraph(self):
-        # ringbuffer: shift and replace last
-        for i, node in enumerate(self._node_list):
-            self._channels[i] = np.roll(
-                self._channels[i], -1
-            )  # shift elements to the left by one
-            self._channels[i][-1] = float(node.get_value())
-            self._curves[i].setData(self.ts, self._channels[i])
+        # one Read for all channels, a tick is skipped while the previous
+        # Read is still running
+        if self._polling or not self._node_list or not self.uaclient.connected:
+            return
+        nodes = list(self._node_list)
+        self._polling = True
+        self.uaclient.submit(
+            self.uaclient.read_values_async(
+                [self._registered.get(node.nodeid, node) for node in nodes]
+            ),
+            callback=partial(self._polled, nodes),
+            errback=self._poll_failed,
+        )
+
+    def _polled(self, nodes, datavalues):
+        self._polling = False
+        for node, datavalue in zip(nodes, datavalues):
+            self._add_sample(node, datavalue)
+        self._redraw()
+
+    def _poll_failed(self, ex):
+        self._polling = False
+        self.show_error(ex)
+
+    def _add_sample(self, node, datavalue):
+        if node not in self._node_list:  # notification arriving after removal
+            return
+        if not datavalue.StatusCode.is_good() or datavalue.Value.Value is None:
+            return
+        i = self._node_list.index(node)
+        timestamp = self._timestamp(datavalue)
+        self._channels[i].append(timestamp, float(datavalue.Value.Value))
+        self._dirty.add(i)
+
+    def _timestamp(self, datavalue):
+        # chosen timestamp, the other one or the reception time when missing
+        if self.timestamps == self.SOURCE_TIME:
+            candidates = (datavalue.SourceTimestamp, datavalue.ServerTimestamp)
+        elif self.timestamps == self.SERVER_TIME:
+            candidates = (datavalue.ServerTimestamp, datavalue.SourceTimestamp)
+        else:
+            candidates = ()
+        for timestamp in candidates:
+            if timestamp:
+                return timestamp.timestamp()
+        return time.time()
+
+    def _redraw(self):
+        for i in self._dirty:
+            self._draw(i)
+        self._dirty = set()
+
+    def _draw(self, i):
+        channel = self._channels[i]
+        times = channel.times()
+        viewbox = self.pw.getViewBox()
+        width = int(viewbox.width()) or 1000
+        if viewbox.autoRangeEnabled()[0]:
+            xmin, xmax = -np.inf, np.inf
+            start, end = 0, len(channel)
+        else:
+            # keep one sample on each side so lines reach the borders
+            xmin, xmax = viewbox.viewRange()[0]
+            start = int(np.searchsorted(times, xmin)) - 1
+            end = int(np.searchsorted(times, xmax, side="right")) + 1
+        positions, values = channel.envelope(start, end, width)
+        xdata = times[positions.astype(int)]
+        # history read from the server up to the first live sample
+        live_start = times[0] if len(times) else np.inf
+        htimes, hvalues = self._histories[i].envelope(
+            xmin, min(xmax, live_start), width
+        )
+        if len(htimes):
+            xdata = np.concatenate((htimes, xdata))
+            values = np.concatenate((hvalues, values))
+        self._curves[i].setData(xdata, values)
+
+    def _view_changed(self, *args):
+        # zooming or panning by hand shows more detail of the new range,
+        # the range following the data needs no redraw
+        if not self.pw.getViewBox().autoRangeEnabled()[0]:
+            for i in range(len(self._channels)):
+                self._draw(i)
+            self._history_timer.start()
+
+    def _fetch_history(self):
+        if not self.uaclient.connected:
+            return
+        viewbox = self.pw.getViewBox()
+        width = int(viewbox.width()) or 1000
+        xmin, xmax = viewbox.viewRange()[0]
+        for channel, history in zip(self._channels, self._histories):
+            live_start = channel.times()[0] if len(channel) else time.time()
+            end = min(xmax, live_start)
+            # pixels showing history
+            pixels = width * (end - xmin) / (xmax - xmin)
+            if end <= xmin or not history.needs(xmin, end, pixels):
+                continue
+            # read a margin around the view, so small pans need no read
+            span = end - xmin
+            start, end = xmin - span / 2, min(end + span / 2, live_start)
+            history.fetch(
+                start,
+                end,
+                pixels * (end - start) / span,
+                partial(self._history_fetched, history.node),
+            )
+
+    def _history_fetched(self, node):
+        if node in self._node_list:
+            self._draw(self._node_list.index(node))
 
     def clear(self):
-        pass
+        # the subscription and registered nodes went with the session,
+        # the channels are kept
+        if not use_graph:
+            return
+        self._subscribed = False
+        self._registered = {}
+        self._polling = False
 
     def show_error(self, *args):
         self.window.show_error(*args)
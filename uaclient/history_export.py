@@ -0,0 +1,234 @@
+import argparse
+import asyncio
+import csv
+from datetime import datetime, timedelta, timezone
+import logging
+import os
+import sys
+
+from PyQt5.QtCore import QCoreApplication
+
+from uaclient.uaclient import UaClient
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = ["node", "source_timestamp", "server_timestamp", "status", "value"]
+FORMATS = ["csv", "parquet"]
+
+
+class CsvHistoryWriter(object):
+    """
+    one row per value, values written as text
+    """
+
+    def __init__(self, path):
+        self._file = open(path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(COLUMNS)
+
+    def write(self, nodeid, datavalues):
+        self._writer.writerows(
+            (
+                nodeid,
+                _isoformat(dv.SourceTimestamp),
+                _isoformat(dv.ServerTimestamp),
+                dv.StatusCode.name,
+                _text(dv.Value.Value),
+            )
+            for dv in datavalues
+        )
+
+    def close(self):
+        self._file.close()
+
+
+class ParquetHistoryWriter(object):
+    """
+    one row per value and one row group per page read, values written
+    as float64, null for values which are not numbers
+    """
+
+    def __init__(self, path):
+        if pyarrow is None:
+            raise RuntimeError(
+                "Parquet export needs pyarrow, install it with: pip install pyarrow"
+            )
+        timestamp = pyarrow.timestamp("us", tz="UTC")
+        self._schema = pyarrow.schema(
+            [
+                ("node", pyarrow.string()),
+                ("source_timestamp", timestamp),
+                ("server_timestamp", timestamp),
+                ("status", pyarrow.string()),
+                ("value", pyarrow.float64()),
+            ]
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, nodeid, datavalues):
+        columns = {
+            "node": [nodeid] * len(datavalues),
+            "source_timestamp": [dv.SourceTimestamp for dv in datavalues],
+            "server_timestamp": [dv.ServerTimestamp for dv in datavalues],
+            "status": [dv.StatusCode.name for dv in datavalues],
+            "value": [_number(dv.Value.Value) for dv in datavalues],
+        }
+        self._writer.write_table(pyarrow.table(columns, schema=self._schema))
+
+    def close(self):
+        self._writer.close()
+
+
+def guess_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    return "parquet" if ext in (".parquet", ".pq") else "csv"
+
+
+def open_writer(path, fmt=None):
+    fmt = fmt or guess_format(path)
+    if fmt == "csv":
+        return CsvHistoryWriter(path)
+    if fmt == "parquet":
+        return ParquetHistoryWriter(path)
+    raise ValueError(f"Unknown export format {fmt}, expected one of {FORMATS}")
+
+
+async def export_history_async(
+    uaclient, nodes, start, end, path, fmt=None, progress=None, failed=None
+):
+    """
+    write the raw history of nodes between start and end datetimes to
+    path as CSV or Parquet, guessed from the extension if fmt is None.
+    Pages are written as they arrive, from a worker thread so reading
+    goes on meanwhile. progress(rows) is called in the loop thread
+    after each page. The nodes whose history could not be read are
+    skipped, their StatusCode stored by NodeId in failed if given.
+    return the number of rows written
+    """
+    loop = asyncio.get_event_loop()
+    writer = open_writer(path, fmt)
+    rows = 0
+    write = None
+    pages = uaclient.raw_history_pages_async(nodes, start, end, failed)
+    try:
+        async for node, datavalues in pages:
+            if not datavalues:
+                continue
+            nodeid = node.nodeid.to_string()
+            write = loop.run_in_executor(None, writer.write, nodeid, datavalues)
+            await asyncio.shield(write)
+            rows += len(datavalues)
+            if progress is not None:
+                progress(rows)
+    finally:
+        if write is not None:
+            # cancelling does not stop the worker thread, close after it
+            await asyncio.wait([write])
+        await pages.aclose()
+        writer.close()
+    return rows
+
+
+def format_failed(failed):
+    """
+    one line per node of the failed dict of export_history_async()
+    """
+    return [f"{nodeid.to_string()}: {status.name}" for nodeid, status in failed.items()]
+
+
+def _isoformat(timestamp):
+    return timestamp.isoformat() if timestamp is not None else ""
+
+
+def _text(value):
+    return "" if value is None else str(value)
+
+
+def _number(value):
+    if isinstance(value, (bool, int, float)):
+        return float(value)
+    return None
+
+
+def _parse_time(text):
+    timestamp = datetime.fromisoformat(text)
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.astimezone()  # local time
+    return timestamp
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Export the raw history of OPC UA nodes to CSV or Parquet"
+    )
+    parser.add_argument("url", help="server url, e.g. opc.tcp://localhost:4840")
+    parser.add_argument("nodes", nargs="+", metavar="nodeid", help="e.g. ns=2;i=2")
+    parser.add_argument("-o", "--output", required=True, help="file to write")
+    parser.add_argument(
+        "-f", "--format", choices=FORMATS, help="default from output extension"
+    )
+    parser.add_argument(
+        "--start", type=_parse_time, help="ISO 8601 time, default one day before end"
+    )
+    parser.add_argument("--end", type=_parse_time, help="ISO 8601 time, default now")
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    end = args.end or datetime.now(timezone.utc)
+    start = args.start or end - timedelta(days=1)
+    # same settings as the GUI, so the security chosen there for url is used
+    QCoreApplication.setOrganizationName("FreeOpcUa")
+    QCoreApplication.setApplicationName("OpcUaClient")
+    uaclient = UaClient()
+    uaclient.load_security_settings(args.url)
+
+    failed = {}
+
+    async def export():
+        # values are written as text or numbers, custom types are not needed
+        await uaclient.connect_async(args.url, data_types=False)
+        try:
+            return await export_history_async(
+                uaclient,
+                args.nodes,
+                start,
+                end,
+                args.output,
+                args.format,
+                failed=failed,
+            )
+        finally:
+            await uaclient.disconnect_async()
+
+    # not loop.run(), exports may take longer than its timeout
+    future = asyncio.run_coroutine_threadsafe(export(), uaclient.loop.loop)
+    try:
+        rows = future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        return 1
+    except Exception as ex:
+        print(f"Export failed: {ex!r}", file=sys.stderr)
+        return 1
+    finally:
+        uaclient.loop.stop()
+    print(f"{rows} values written to {args.output}")
+    if failed:
+        print(f"History of {len(failed)} nodes could not be read:", file=sys.stderr)
+        for line in format_failed(failed):
+            print(f"  {line}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
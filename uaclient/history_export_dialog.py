@@ -0,0 +1,115 @@
+import logging
+from datetime import timezone
+
+from PyQt5.QtCore import QDateTime, QSettings, Qt, pyqtSignal
+from PyQt5.QtWidgets import QDialog, QFileDialog, QProgressDialog
+
+from uaclient.history_export import export_history_async
+from uaclient.historyexport_ui import Ui_HistoryExportDialog
+
+
+logger = logging.getLogger(__name__)
+
+
+class HistoryExportDialog(QDialog):
+    """
+    ask for a time range and a file, then export the history of nodes
+    in the background showing the number of values written. exported is
+    emitted once done with the number of values written and {NodeId:
+    StatusCode} of the nodes whose history could not be read
+    """
+
+    exported = pyqtSignal(int, dict)
+
+    def __init__(self, parent):
+        QDialog.__init__(self)
+        self.ui = Ui_HistoryExportDialog()
+        self.ui.setupUi(self)
+
+        self.uaclient = parent.uaclient
+        self.parent = parent
+        self.settings = QSettings()
+        self._future = None
+        self._progress_dialog = None
+        self.failed = {}
+
+        now = QDateTime.currentDateTime()
+        self.ui.startDateTimeEdit.setDateTime(now.addDays(-1))
+        self.ui.endDateTimeEdit.setDateTime(now)
+        self.ui.pathLineEdit.setText(self.settings.value("history_export_path", ""))
+        self.ui.pathButton.clicked.connect(self.get_path)
+
+    @property
+    def start(self):
+        return _datetime(self.ui.startDateTimeEdit.dateTime())
+
+    @property
+    def end(self):
+        return _datetime(self.ui.endDateTimeEdit.dateTime())
+
+    @property
+    def path(self):
+        return self.ui.pathLineEdit.text()
+
+    @path.setter
+    def path(self, value):
+        self.ui.pathLineEdit.setText(value)
+
+    def get_path(self):
+        path, ok = QFileDialog.getSaveFileName(
+            self,
+            "Export history to",
+            self.path,
+            "CSV (*.csv);;Parquet (*.parquet)",
+        )
+        if ok:
+            self.path = path
+
+    def export(self, nodes):
+        """
+        start exporting the history of nodes, return immediately
+        """
+        self.settings.setValue("history_export_path", self.path)
+        self._progress_dialog = QProgressDialog(
+            f"Exporting history of {len(nodes)} nodes", "Cancel", 0, 0, self.parent
+        )
+        self._progress_dialog.setWindowModality(Qt.WindowModal)
+        self._progress_dialog.canceled.connect(self.cancel)
+        self._progress_dialog.show()
+        self.failed = {}
+        self._future = self.uaclient.submit(
+            export_history_async(
+                self.uaclient,
+                nodes,
+                self.start,
+                self.end,
+                self.path,
+                progress=self.uaclient.progress(self._show_progress),
+                failed=self.failed,
+            ),
+            callback=self._exported,
+            errback=self._failed,
+        )
+
+    def cancel(self):
+        if self._future is not None and self._future.cancel():
+            logger.info("Export of history to %s canceled", self.path)
+
+    def _show_progress(self, rows):
+        if self._progress_dialog is not None:
+            self._progress_dialog.setLabelText(f"{rows} values written")
+
+    def _exported(self, rows):
+        self._progress_dialog.reset()
+        logger.info("%s values of history exported to %s", rows, self.path)
+        if self.failed:
+            logger.warning("History of %s nodes could not be read", len(self.failed))
+        self.exported.emit(rows, self.failed)
+
+    def _failed(self, ex):
+        self._progress_dialog.reset()
+        self.parent.show_error(ex)
+
+
+def _datetime(qdatetime):
+    return qdatetime.toPyDateTime().astimezone(timezone.utc)
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'uaclient/historyexport_ui.ui'
+#
+# Created by: PyQt5 UI code generator 5.15.11
+#
+# WARNING: Any manual changes made to this file will be lost when pyuic5 is
+# run again.  Do not edit this file unless you know what you are doing.
+
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+
+class Ui_HistoryExportDialog(object):
+    def setupUi(self, HistoryExportDialog):
+        HistoryExportDialog.setObjectName("HistoryExportDialog")
+        HistoryExportDialog.resize(504, 164)
+        self.gridLayout = QtWidgets.QGridLayout(HistoryExportDialog)
+        self.gridLayout.setObjectName("gridLayout")
+        self.label = QtWidgets.QLabel(HistoryExportDialog)
+        self.label.setObjectName("label")
+        self.gridLayout.addWidget(self.label, 0, 0, 1, 1)
+        self.startDateTimeEdit = QtWidgets.QDateTimeEdit(HistoryExportDialog)
+        self.startDateTimeEdit.setCalendarPopup(True)
+        self.startDateTimeEdit.setObjectName("startDateTimeEdit")
+        self.gridLayout.addWidget(self.startDateTimeEdit, 0, 1, 1, 2)
+        self.label_2 = QtWidgets.QLabel(HistoryExportDialog)
+        self.label_2.setObjectName("label_2")
+        self.gridLayout.addWidget(self.label_2, 1, 0, 1, 1)
+        self.endDateTimeEdit = QtWidgets.QDateTimeEdit(HistoryExportDialog)
+        self.endDateTimeEdit.setCalendarPopup(True)
+        self.endDateTimeEdit.setObjectName("endDateTimeEdit")
+        self.gridLayout.addWidget(self.endDateTimeEdit, 1, 1, 1, 2)
+        self.label_3 = QtWidgets.QLabel(HistoryExportDialog)
+        self.label_3.setObjectName("label_3")
+        self.gridLayout.addWidget(self.label_3, 2, 0, 1, 1)
+        self.pathLineEdit = QtWidgets.QLineEdit(HistoryExportDialog)
+        self.pathLineEdit.setObjectName("pathLineEdit")
+        self.gridLayout.addWidget(self.pathLineEdit, 2, 1, 1, 1)
+        self.pathButton = QtWidgets.QPushButton(HistoryExportDialog)
+        self.pathButton.setObjectName("pathButton")
+        self.gridLayout.addWidget(self.pathButton, 2, 2, 1, 1)
+        spacerItem = QtWidgets.QSpacerItem(
+            20, 40, QtWidgets.QSizePolicy.Minimum, QtWidgets.QSizePolicy.Expanding
+        )
+        self.gridLayout.addItem(spacerItem, 3, 0, 1, 3)
+        self.buttonBox = QtWidgets.QDialogButtonBox(HistoryExportDialog)
+        self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
+        self.buttonBox.setStandardButtons(
+            QtWidgets.QDialogButtonBox.Cancel | QtWidgets.QDialogButtonBox.Ok
+        )
+        self.buttonBox.setObjectName("buttonBox")
+        self.gridLayout.addWidget(self.buttonBox, 4, 0, 1, 3)
+
+        self.retranslateUi(HistoryExportDialog)
+        self.buttonBox.accepted.connect(HistoryExportDialog.accept)  # type: ignore
+        self.buttonBox.rejected.connect(HistoryExportDialog.reject)  # type: ignore
+        QtCore.QMetaObject.connectSlotsByName(HistoryExportDialog)
+
+    def retranslateUi(self, HistoryExportDialog):
+        _translate = QtCore.QCoreApplication.translate
+        HistoryExportDialog.setWindowTitle(
+            _translate("HistoryExportDialog", "Export History")
+        )
+        self.label.setText(_translate("HistoryExportDialog", "Start"))
+        self.startDateTimeEdit.setDisplayFormat(
+            _translate("HistoryExportDialog", "yyyy-MM-dd HH:mm:ss")
+        )
+        self.label_2.setText(_translate("HistoryExportDialog", "End"))
+        self.endDateTimeEdit.setDisplayFormat(
+            _translate("HistoryExportDialog", "yyyy-MM-dd HH:mm:ss")
+        )
+        self.label_3.setText(_translate("HistoryExportDialog", "File"))
+        self.pathButton.setText(_translate("HistoryExportDialog", "Select file"))
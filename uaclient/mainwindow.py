@@ -1,9 +1,12 @@
 #! /usr/bin/env python3
 
+import concurrent.futures
 import sys
 
-from datetime import datetime
+from functools import partial
 import logging
+import threading
+import time
 
 from PyQt5.QtCore import (
     pyqtSignal,
@@ -24,22 +27,31 @@ from PyQt5.QtWidgets import (
     QApplication,
     QMenu,
     QDialog,
+    QFileDialog,
+    QProgressDialog,
+    QStyledItemDelegate,
 )
 
 from asyncua import ua
 from asyncua.sync import SyncNode
 
+from uaclient.attrs_widget import AttrsWidget
+from uaclient.refs_widget import RefsWidget
 from uaclient.uaclient import UaClient
+from uaclient.tree_widget import TreeWidget
+from uaclient.subscription_model import SubscriptionModel
 from uaclient.mainwindow_ui import Ui_MainWindow
+from uaclient.model_change import ModelChange
 from uaclient.connection_dialog import ConnectionDialog
 from uaclient.application_certificate_dialog import ApplicationCertificateDialog
+from uaclient.history_export import format_failed
+from uaclient.history_export_dialog import HistoryExportDialog
 from uaclient.graphwidget import GraphUI
+from uaclient.snapshot import default_directory, snapshot_async
+from uaclient.snapshot_widget import SnapshotWidget
 
 # must be here for resources even if not used
 from uawidgets import resources  # noqa: F401
-from uawidgets.attrs_widget import AttrsWidget
-from uawidgets.tree_widget import TreeWidget
-from uawidgets.refs_widget import RefsWidget
 from uawidgets.utils import trycatchslot
 from uawidgets.logger import QtHandler
 from uawidgets.call_method_dialog import CallMethodDialog
@@ -49,16 +61,80 @@ logger = logging.getLogger(__name__)
 
 
 class DataChangeHandler(QObject):
-    data_change_fired = pyqtSignal(object, str, str)
+    data_change_fired = pyqtSignal(object, object)
 
     def datachange_notification(self, node, val, data):
-        if data.monitored_item.Value.SourceTimestamp:
-            dato = data.monitored_item.Value.SourceTimestamp.isoformat()
-        elif data.monitored_item.Value.ServerTimestamp:
-            dato = data.monitored_item.Value.ServerTimestamp.isoformat()
-        else:
-            dato = datetime.now().isoformat()
-        self.data_change_fired.emit(node, str(val), dato)
+        # formatting is left to the model, only for the cells being displayed
+        self.data_change_fired.emit(node, data.monitored_item.Value)
+
+
+class DataChangeCoalescer(QObject):
+    """
+    Keep only the latest value per node and hand them to callback at most
+    rate times per second, whatever the notification rate is.
+    dropped counts the intermediate values that were never displayed,
+    dropped_changed is emitted with it after the flushes that changed it
+    """
+
+    _wake = pyqtSignal()
+    dropped_changed = pyqtSignal(int)
+
+    def __init__(self, callback, rate=30, parent=None):
+        QObject.__init__(self, parent)
+        self._callback = callback
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.dropped = 0
+        self._reported = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self.flush)
+        self.set_rate(rate)
+        self._wake.connect(self._start_timer, type=Qt.QueuedConnection)
+
+    def set_rate(self, rate):
+        """
+        flush at most rate times per second, from 1 to 1000. Values which
+        are not numbers, e.g. a broken setting, keep the default rate
+        """
+        try:
+            interval = int(1000 / min(max(float(rate), 1), 1000))
+        except (TypeError, ValueError):  # int() refuses NaN too
+            logger.warning("Invalid data change refresh rate %r, using 30", rate)
+            interval = 1000 // 30
+        self._timer.setInterval(interval)
+
+    def push(self, node, *data):
+        # called from the asyncua thread
+        with self._lock:
+            if node.nodeid in self._pending:
+                self.dropped += 1
+            wake = not self._pending
+            self._pending[node.nodeid] = (node, data)
+        if wake:
+            self._wake.emit()
+
+    def _start_timer(self):
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            dropped = self.dropped
+        for node, data in pending.values():
+            self._callback(node, *data)
+        if dropped != self._reported:
+            self._reported = dropped
+            self.dropped_changed.emit(dropped)
+
+    def clear(self):
+        with self._lock:
+            self._pending = {}
+            self.dropped = 0
+        if self._reported:
+            self._reported = 0
+            self.dropped_changed.emit(0)
 
 
 class EventHandler(QObject):
@@ -68,17 +144,26 @@ class EventHandler(QObject):
         self.event_fired.emit(event)
 
 
+class ModelChangeHandler(QObject):
+    model_change_fired = pyqtSignal(object)
+
+    def model_changed(self, change):
+        self.model_change_fired.emit(change)
+
+
 class EventUI(object):
 
     def __init__(self, window, uaclient):
         self.window = window
         self.uaclient = uaclient
-        self._handler = EventHandler()
+        self._handler = EventHandler(window)
         self._subscribed_nodes = []  # FIXME: not really needed
-        self.model = QStandardItemModel()
+        self.model = QStandardItemModel(window)
         self.window.ui.evView.setModel(self.model)
-        self.window.ui.actionSubscribeEvent.triggered.connect(self._subscribe)
-        self.window.ui.actionUnsubscribeEvents.triggered.connect(self._unsubscribe)
+        self.window.ui.actionSubscribeEvent.triggered.connect(self._subscribe_selected)
+        self.window.ui.actionUnsubscribeEvents.triggered.connect(
+            self._unsubscribe_selected
+        )
         # context menu
         self.window.addAction(self.window.ui.actionSubscribeEvent)
         self.window.addAction(self.window.ui.actionUnsubscribeEvents)
@@ -98,8 +183,7 @@ class EventUI(object):
         self.window.show_error(*args)
 
     def dropMimeData(self, mdata, action, row, column, parent):
-        node = self.uaclient.client.get_node(mdata.text())
-        self._subscribe(node)
+        self._subscribe_nodes(nodes_from_mimedata(self.uaclient, mdata))
         return True
 
     def clear(self):
@@ -113,26 +197,69 @@ class EventUI(object):
             node = self.window.get_current_node()
             if node is None:
                 return
-        if node in self._subscribed_nodes:
-            logger.info("already subscribed to event for node: %s", node)
+        self._subscribe_nodes([node])
+
+    @trycatchslot
+    def _subscribe_selected(self):
+        self._subscribe_nodes(self.window.get_selected_nodes())
+
+    def _subscribe_nodes(self, nodes):
+        subscribed = set(self._subscribed_nodes)
+        new_nodes = []
+        for node in nodes:
+            if node in subscribed:
+                logger.info("already subscribed to event for node: %s", node)
+                continue
+            subscribed.add(node)
+            new_nodes.append(node)
+        if not new_nodes:
             return
-        logger.info("Subscribing to events for %s", node)
+        logger.info("Subscribing to events for %s nodes", len(new_nodes))
         self.window.ui.evDockWidget.raise_()
-        try:
-            self.uaclient.subscribe_events(node, self._handler)
-        except Exception as ex:
-            self.window.show_error(ex)
-            raise
-        else:
-            self._subscribed_nodes.append(node)
+        self._subscribed_nodes.extend(new_nodes)
+        self.uaclient.submit(
+            self.uaclient.subscribe_events_list_async(new_nodes, self._handler),
+            callback=partial(self._subscribed, new_nodes),
+            errback=partial(self._subscribe_failed, new_nodes),
+        )
+
+    def _subscribed(self, nodes, handles):
+        failed = [
+            (node, handle)
+            for node, handle in zip(nodes, handles)
+            if isinstance(handle, ua.StatusCode)
+        ]
+        if failed:
+            self._subscribe_failed(
+                [node for node, _ in failed], ua.UaStatusCodeError(failed[0][1].value)
+            )
+
+    def _subscribe_failed(self, nodes, ex):
+        logger.warning("Subscribing to events for %s nodes failed: %r", len(nodes), ex)
+        failed = set(nodes)
+        self._subscribed_nodes = [n for n in self._subscribed_nodes if n not in failed]
+        self.window.show_error(ex)
 
     @trycatchslot
     def _unsubscribe(self):
         node = self.window.get_current_node()
         if node is None:
             return
-        self._subscribed_nodes.remove(node)
-        self.uaclient.unsubscribe_events(node)
+        self._unsubscribe_nodes([node])
+
+    @trycatchslot
+    def _unsubscribe_selected(self):
+        self._unsubscribe_nodes(self.window.get_selected_nodes())
+
+    def _unsubscribe_nodes(self, nodes):
+        nodes = set(nodes).intersection(self._subscribed_nodes)
+        if not nodes:
+            return
+        self._subscribed_nodes = [n for n in self._subscribed_nodes if n not in nodes]
+        self.uaclient.submit(
+            self.uaclient.unsubscribe_events_list_async(list(nodes)),
+            errback=self.show_error,
+        )
 
     @trycatchslot
     def _update_event_model(self, event):
@@ -144,23 +271,40 @@ class DataChangeUI(object):
     def __init__(self, window, uaclient):
         self.window = window
         self.uaclient = uaclient
-        self._subhandler = DataChangeHandler()
+        self._subhandler = DataChangeHandler(window)
         self._subscribed_nodes = []
-        self.model = QStandardItemModel()
+        self.model = SubscriptionModel(parent=window)
         self.window.ui.subView.setModel(self.model)
         self.window.ui.subView.horizontalHeader().setSectionResizeMode(1)
 
-        self.window.ui.actionSubscribeDataChange.triggered.connect(self._subscribe)
-        self.window.ui.actionUnsubscribeDataChange.triggered.connect(self._unsubscribe)
+        self.window.ui.actionSubscribeDataChange.triggered.connect(
+            self._subscribe_selected
+        )
+        self.window.ui.actionUnsubscribeDataChange.triggered.connect(
+            self._unsubscribe_selected
+        )
 
         # populate contextual menu
         self.window.addAction(self.window.ui.actionSubscribeDataChange)
         self.window.addAction(self.window.ui.actionUnsubscribeDataChange)
 
-        # handle subscriptions
+        # handle subscriptions, notifications are coalesced in the asyncua
+        # thread and flushed to the model at the refresh rate
+        self._coalescer = DataChangeCoalescer(
+            self.model.update,
+            QSettings().value("datachange_refresh_rate", 30),
+            window,
+        )
         self._subhandler.data_change_fired.connect(
-            self._update_subscription_model, type=Qt.QueuedConnection
+            self._coalescer.push, type=Qt.DirectConnection
         )
+        # the values never displayed are counted in the dock title
+        self._title = self.window.ui.subDockWidget.windowTitle()
+        self.window.ui.subDockWidget.setToolTip(
+            "Values replaced by a newer one before being displayed are skipped, "
+            "see the datachange_refresh_rate setting"
+        )
+        self._coalescer.dropped_changed.connect(self._show_dropped)
 
         # accept drops
         self.model.canDropMimeData = self.canDropMimeData
@@ -170,69 +314,141 @@ class DataChangeUI(object):
         return True
 
     def dropMimeData(self, mdata, action, row, column, parent):
-        node = self.uaclient.client.get_node(mdata.text())
-        self._subscribe(node)
+        self._subscribe_nodes(nodes_from_mimedata(self.uaclient, mdata))
         return True
 
     def clear(self):
         self._subscribed_nodes = []
+        self._coalescer.clear()
         self.model.clear()
 
     def show_error(self, *args):
         self.window.show_error(*args)
 
+    def _show_dropped(self, dropped):
+        title = f"{self._title} ({dropped} skipped)" if dropped else self._title
+        self.window.ui.subDockWidget.setWindowTitle(title)
+
     @trycatchslot
     def _subscribe(self, node=None):
         if not isinstance(node, SyncNode):
             node = self.window.get_current_node()
             if node is None:
                 return
-        if node in self._subscribed_nodes:
-            logger.warning("allready subscribed to node: %s ", node)
+        self._subscribe_nodes([node])
+
+    @trycatchslot
+    def _subscribe_selected(self):
+        self._subscribe_nodes(self.window.get_selected_nodes())
+
+    def _subscribe_nodes(self, nodes):
+        new_nodes = {}
+        for node in nodes:
+            if node in self.model or node.nodeid in new_nodes:
+                logger.warning("allready subscribed to node: %s ", node)
+                continue
+            new_nodes[node.nodeid] = node
+        if not new_nodes:
             return
-        self.model.setHorizontalHeaderLabels(["DisplayName", "Value", "Timestamp"])
-        text = str(node.read_display_name().Text)
-        row = [QStandardItem(text), QStandardItem("No Data yet"), QStandardItem("")]
-        row[0].setData(node)
-        self.model.appendRow(row)
-        self._subscribed_nodes.append(node)
+        nodes = list(new_nodes.values())
+        # rows show the NodeId until display names have been read
+        self.model.add_nodes(nodes, [node.nodeid.to_string() for node in nodes])
+        self._subscribed_nodes.extend(nodes)
         self.window.ui.subDockWidget.raise_()
-        try:
-            self.uaclient.subscribe_datachange(node, self._subhandler)
-        except Exception as ex:
-            self.window.show_error(ex)
-            idx = self.model.indexFromItem(row[0])
-            self.model.takeRow(idx.row())
-            raise
+        self.uaclient.submit(
+            self.uaclient.get_display_names_async(nodes),
+            callback=partial(self.model.set_names, nodes),
+        )
+        self.uaclient.submit(
+            self.uaclient.read_attributes_async(nodes, ua.AttributeIds.DataType),
+            callback=partial(self._set_data_types, nodes),
+        )
+        self.uaclient.submit(
+            self.uaclient.subscribe_datachange_list_async(nodes, self._subhandler),
+            callback=partial(self._subscribed, nodes),
+            errback=partial(self._subscribe_failed, nodes),
+        )
+
+    def _set_data_types(self, nodes, dvs):
+        self.model.set_data_types(
+            nodes, [dv.Value.Value if dv.StatusCode.is_good() else None for dv in dvs]
+        )
+
+    def _subscribed(self, nodes, handles):
+        failed = [
+            (node, handle)
+            for node, handle in zip(nodes, handles)
+            if isinstance(handle, ua.StatusCode)
+        ]
+        if failed:
+            self._subscribe_failed(
+                [node for node, _ in failed], ua.UaStatusCodeError(failed[0][1].value)
+            )
+
+    def _subscribe_failed(self, nodes, ex):
+        logger.warning("Subscribing to %s nodes failed: %r", len(nodes), ex)
+        self.window.show_error(ex)
+        self._remove_nodes(nodes)
+
+    def _remove_nodes(self, nodes):
+        nodes = set(nodes)
+        self._subscribed_nodes = [n for n in self._subscribed_nodes if n not in nodes]
+        self.model.remove_nodes(nodes)
 
     @trycatchslot
     def _unsubscribe(self):
         node = self.window.get_current_node()
         if node is None:
             return
-        self.uaclient.unsubscribe_datachange(node)
-        self._subscribed_nodes.remove(node)
-        i = 0
-        while self.model.item(i):
-            item = self.model.item(i)
-            if item.data() == node:
-                self.model.removeRow(i)
-            i += 1
-
-    def _update_subscription_model(self, node, value, timestamp):
-        i = 0
-        while self.model.item(i):
-            item = self.model.item(i)
-            if item.data() == node:
-                it = self.model.item(i, 1)
-                it.setText(value)
-                it_ts = self.model.item(i, 2)
-                it_ts.setText(timestamp)
-            i += 1
+        self._unsubscribe_nodes([node])
+
+    @trycatchslot
+    def _unsubscribe_selected(self):
+        self._unsubscribe_nodes(self.window.get_selected_nodes())
+
+    def _unsubscribe_nodes(self, nodes):
+        nodes = [node for node in nodes if node in self.model]
+        if not nodes:
+            return
+        self._remove_nodes(nodes)
+        self.uaclient.submit(
+            self.uaclient.unsubscribe_datachange_list_async(nodes),
+            errback=self.show_error,
+        )
+
+
+def nodes_from_mimedata(uaclient, mdata):
+    """
+    nodes dragged from the tree, one NodeId per line
+    """
+    return [
+        uaclient.client.get_node(nodeid.strip())
+        for nodeid in mdata.text().splitlines()
+        if nodeid.strip()
+    ]
+
+
+class AddressDelegate(QStyledItemDelegate):
+    """
+    show the probed status of addresses next to them in the combo box list.
+    Statuses are kept here, changing items would reset the edited address
+    """
+
+    def __init__(self, parent):
+        super().__init__(parent)
+        self.status = {}  # address -> text
+
+    def initStyleOption(self, option, index):
+        super().initStyleOption(option, index)
+        status = self.status.get(option.text)
+        if status:
+            option.text = f"{option.text}    ({status})"
 
 
 class Window(QMainWindow):
 
+    connected = pyqtSignal(str)
+
     def __init__(self):
         QMainWindow.__init__(self)
         self.ui = Ui_MainWindow()
@@ -263,7 +479,7 @@ class Window(QMainWindow):
                 "opc.tcp://localhost:53530/OPCUA/SimulationServer/",
             ],
         )
-        print("ADR", self._address_list)
+        logger.debug("Address list: %s", self._address_list)
         self._address_list_max_count = int(
             self.settings.value("address_list_max_count", 10)
         )
@@ -274,33 +490,69 @@ class Window(QMainWindow):
 
         self.uaclient = UaClient()
 
-        self.tree_ui = TreeWidget(self.ui.treeView)
+        self.tree_ui = TreeWidget(self.ui.treeView, self.uaclient)
         self.tree_ui.error.connect(self.show_error)
         self.setup_context_menu_tree()
         self.ui.treeView.selectionModel().currentChanged.connect(
             self._update_actions_state
         )
 
-        self.refs_ui = RefsWidget(self.ui.refView)
+        self.refs_ui = RefsWidget(self.ui.refView, self.uaclient)
         self.refs_ui.error.connect(self.show_error)
-        self.attrs_ui = AttrsWidget(self.ui.attrView)
+        self.attrs_ui = AttrsWidget(self.ui.attrView, self.uaclient)
         self.attrs_ui.error.connect(self.show_error)
         self.datachange_ui = DataChangeUI(self, self.uaclient)
         self.event_ui = EventUI(self, self.uaclient)
         self.graph_ui = GraphUI(self, self.uaclient)
 
+        # secure channels are opened in the background once an address
+        # stays selected or hovered for a moment
+        self._prewarm_uri = None
+        self._prewarm_future = None
+        self._prewarm_timer = QTimer(self)
+        self._prewarm_timer.setSingleShot(True)
+        self._prewarm_timer.setInterval(300)
+        self._prewarm_timer.timeout.connect(self._prewarm)
+        self.ui.actionPrewarm.setChecked(
+            self.settings.value("prewarm_connections", "false") == "true"
+        )
+        self.ui.actionPrewarm.triggered.connect(self.prewarm_connections)
+        self.ui.addrComboBox.textHighlighted.connect(self._schedule_prewarm)
         self.ui.addrComboBox.currentTextChanged.connect(self._uri_changed)
         self._uri_changed(
             self.ui.addrComboBox.currentText()
         )  # force update for current value at startup
 
-        self.ui.treeView.selectionModel().selectionChanged.connect(self.show_refs)
+        # attributes and references of the current node are read together,
+        # once the selection stays on it for a moment
+        self._node_view_future = None
+        self._selection_timer = QTimer(self)
+        self._selection_timer.setSingleShot(True)
+        self._selection_timer.setInterval(50)
+        self._selection_timer.timeout.connect(self.show_node_view)
+        self.ui.treeView.selectionModel().selectionChanged.connect(
+            self._selection_changed
+        )
         self.ui.actionCopyPath.triggered.connect(self.tree_ui.copy_path)
         self.ui.actionCopyNodeId.triggered.connect(self.tree_ui.copy_nodeid)
         self.ui.actionCall.triggered.connect(self.call_method)
-
-        self.ui.treeView.selectionModel().selectionChanged.connect(self.show_attrs)
-        self.ui.attrRefreshButton.clicked.connect(self.show_attrs)
+        self.ui.actionExportHistory.triggered.connect(self.export_history)
+        self._history_export = None  # dialog of the running export
+
+        # snapshots of address spaces are crawled in the background and
+        # browsed offline in their own windows
+        self._connected_uri = None
+        self._closing = []  # futures of sessions being closed
+        self._snapshot_future = None
+        self._snapshot_dialog = None
+        # model changes seen since connecting or crawling, the nodes to
+        # browse again when refreshing the snapshot
+        self._snapshot_change = ModelChange()
+        self._crawled_change = ModelChange()
+        self.ui.actionCrawlSnapshot.triggered.connect(self.crawl_snapshot)
+        self.ui.actionOpenSnapshot.triggered.connect(self.open_snapshot)
+
+        self.ui.attrRefreshButton.clicked.connect(self.show_node_view)
 
         self.resize(
             int(self.settings.value("main_window_width", 800)),
@@ -323,8 +575,85 @@ class Window(QMainWindow):
         )
         self.ui.actionDark_Mode.triggered.connect(self.dark_mode)
 
+        self.uaclient.lazy_data_types = (
+            self.settings.value("lazy_data_types", "false") == "true"
+        )
+        self.ui.actionLazyDataTypes.setChecked(self.uaclient.lazy_data_types)
+        self.ui.actionLazyDataTypes.triggered.connect(self.lazy_data_types)
+        self._data_types_future = None
+        self._data_types_dialog = None
+        self._connect_started = 0.0
+
+        # the tree and the views of the current node follow the changes
+        # the server reports, a burst of them is applied at once
+        self._model_change_handler = ModelChangeHandler(self)
+        self._model_change_handler.model_change_fired.connect(self._queue_model_change)
+        self._model_change = None
+        self._model_change_timer = QTimer(self)
+        self._model_change_timer.setSingleShot(True)
+        self._model_change_timer.setInterval(200)
+        self._model_change_timer.timeout.connect(self._apply_model_change)
+
+        # servers of the address list are asked for their endpoints in the
+        # background, the combo box shows which ones answer and how fast
+        self.ui.addrComboBox.setItemDelegate(AddressDelegate(self.ui.addrComboBox))
+        self._probe_future = None
+        self._probe_timer = QTimer(self)
+        self._probe_timer.timeout.connect(self.probe_addresses)
+        interval = int(self.settings.value("address_probe_interval", 60))
+        if interval > 0:
+            self._probe_timer.start(interval * 1000)
+            self.probe_addresses()
+
     def _uri_changed(self, uri):
         self.uaclient.load_security_settings(uri)
+        self._schedule_prewarm(uri)
+
+    def _schedule_prewarm(self, uri):
+        if self.ui.actionPrewarm.isChecked():
+            self._prewarm_uri = uri.strip()
+            self._prewarm_timer.start()
+
+    def _prewarm(self):
+        uri = self._prewarm_uri
+        if self._prewarm_future is not None:
+            self._prewarm_future.cancel()
+        self._prewarm_future = self.uaclient.submit(
+            self.uaclient.prewarm_async(uri, self.uaclient.saved_security(uri)),
+            errback=partial(self._prewarm_failed, uri),
+        )
+
+    def _prewarm_failed(self, uri, ex):
+        logger.info("Prewarming %s failed: %r", uri, ex)
+
+    def probe_addresses(self):
+        """
+        check the servers of the address list without blocking
+        """
+        if self._probe_future is not None and not self._probe_future.done():
+            return
+        uris = [
+            self.ui.addrComboBox.itemText(i)
+            for i in range(self.ui.addrComboBox.count())
+        ]
+        self._probe_future = self.uaclient.submit(
+            self.uaclient.probe_endpoints_async(
+                uris, self.uaclient.progress(self._show_probe)
+            ),
+            errback=self._probe_failed,
+        )
+
+    def _show_probe(self, uri, seconds, ex):
+        if ex is None:
+            status = f"{seconds * 1000:.0f} ms"
+        else:
+            status = "unreachable"
+            logger.info("%s is unreachable: %r", uri, ex)
+        self.ui.addrComboBox.itemDelegate().status[uri] = status
+        self.ui.addrComboBox.view().viewport().update()
+
+    def _probe_failed(self, ex):
+        logger.warning("Probing addresses failed: %r", ex)
 
     def show_connection_dialog(self):
         dia = ConnectionDialog(self, self.ui.addrComboBox.currentText())
@@ -349,25 +678,59 @@ class Window(QMainWindow):
             self.uaclient.application_private_key_path = dia.private_key_path
         self.uaclient.save_application_certificate_settings()
 
-    @trycatchslot
-    def show_refs(self, selection):
+    def _selection_changed(self, selection):
         if isinstance(selection, QItemSelection):
             if not selection.indexes():  # no selection
                 return
+        self._selection_timer.start()
 
+    @trycatchslot
+    def show_node_view(self):
+        """
+        show attributes and references of the current node, read in the
+        background. A request for a node no longer current is cancelled
+        """
+        self._selection_timer.stop()
+        if self._node_view_future is not None:
+            self._node_view_future.cancel()
+            self._node_view_future = None
         node = self.get_current_node()
         if node:
-            self.refs_ui.show_refs(node)
+            self._node_view_future = self.uaclient.submit(
+                self.uaclient.read_node_view_async(node),
+                callback=partial(self._show_node_view, node),
+                errback=partial(self._node_view_failed, node),
+            )
+
+    def _show_node_view(self, node, view):
+        self._node_view_future = None
+        if node != self.get_current_node():
+            return
+        attrs, refs = view
+        self.attrs_ui.show_attrs(node, attrs)
+        self.refs_ui.show_refs(node, refs)
+        for attr, dv in attrs:
+            if attr == ua.AttributeIds.NodeClass:
+                self._set_call_enabled(node, dv.Value.Value)
+        if not self.uaclient.data_types_loaded:
+            self.uaclient.submit(
+                self.uaclient.load_node_data_types_async([node]),
+                callback=partial(self._node_data_types_loaded, node),
+                errback=partial(self._node_data_types_failed, node),
+            )
+
+    def _node_view_failed(self, node, ex):
+        self._node_view_future = None
+        if node == self.get_current_node():
+            self.show_error(ex)
 
-    @trycatchslot
-    def show_attrs(self, selection):
-        if isinstance(selection, QItemSelection):
-            if not selection.indexes():  # no selection
-                return
+    def _node_data_types_loaded(self, node, new):
+        # show the value again, decoded with the new types
+        if new and node == self.get_current_node():
+            self.show_node_view()
 
-        node = self.get_current_node()
-        if node:
-            self.attrs_ui.show_attrs(node)
+    def _node_data_types_failed(self, node, ex):
+        logger.warning("Could not read data type of %s: %r", node, ex)
 
     def show_error(self, msg):
         logger.warning("showing error: %s")
@@ -381,6 +744,9 @@ class Window(QMainWindow):
     def get_current_node(self, idx=None):
         return self.tree_ui.get_current_node(idx)
 
+    def get_selected_nodes(self):
+        return self.tree_ui.get_selected_nodes()
+
     def get_uaclient(self):
         return self.uaclient
 
@@ -388,16 +754,116 @@ class Window(QMainWindow):
     def connect(self):
         uri = self.ui.addrComboBox.currentText()
         uri = uri.strip()
-        try:
-            self.uaclient.connect(uri)
-        except Exception as ex:
-            self.show_error(ex)
-            raise
+        self.ui.connectButton.setEnabled(False)
+        self._connect_started = time.perf_counter()
+        # a prewarm of uri is taken over by connecting, others are dropped
+        self._prewarm_timer.stop()
+        if self._prewarm_future is not None and self._prewarm_uri != uri:
+            self._prewarm_future.cancel()
+        # the tree down to the saved node is browsed while connecting,
+        # data types are loaded once the tree is shown
+        path = self._saved_path(uri)
+        browse = path or [ua.NodeId(ua.ObjectIds.RootFolder)]
+        self.uaclient.submit(
+            self.uaclient.connect_async(uri, data_types=False, browse=browse),
+            callback=lambda children: self._connected(uri, path, children),
+            errback=self._connect_failed,
+        )
+
+    def _connect_failed(self, ex):
+        logger.warning("Connecting failed: %r", ex)
+        self.ui.connectButton.setEnabled(True)
+        self.show_error(ex)
 
+    def _connected(self, uri, path, children):
+        self.ui.connectButton.setEnabled(True)
+        self._connected_uri = uri
+        self.uaclient.save_security_settings(uri)
         self._update_address_list(uri)
-        self.tree_ui.set_root_node(self.uaclient.client.nodes.root)
+        self.tree_ui.set_root_node(
+            self.uaclient.client.nodes.root, children, self.uaclient.root_description
+        )
         self.ui.treeView.setFocus()
-        self.load_current_node()
+        self.load_current_node(path)
+        logger.info(
+            "Tree of %s shown %.0f ms after connect",
+            uri,
+            (time.perf_counter() - self._connect_started) * 1000,
+        )
+        self._load_data_types(uri)
+        self.uaclient.submit(
+            self.uaclient.subscribe_model_changes_async(self._model_change_handler),
+            errback=partial(self._model_changes_failed, uri),
+        )
+        self.connected.emit(uri)
+
+    def _model_changes_failed(self, uri, ex):
+        logger.info("Model changes of %s are not followed: %r", uri, ex)
+
+    def _queue_model_change(self, change):
+        self._snapshot_change.update(change)
+        if self._model_change is None:
+            self._model_change = change
+        else:
+            self._model_change.update(change)
+        self._model_change_timer.start()
+
+    @trycatchslot
+    def _apply_model_change(self):
+        change, self._model_change = self._model_change, None
+        if change is None or not self.uaclient.connected:
+            return
+        self.tree_ui.model_changed(change)
+        node = self.get_current_node()
+        if node and change.affects(node.nodeid) and node.nodeid not in change.deleted:
+            self.show_node_view()
+
+    def _load_data_types(self, uri):
+        """
+        load data types in the background, the tree is usable meanwhile.
+        Cancelling leaves the missing types to be read when needed
+        """
+        progress = None
+        if not self.uaclient.lazy_data_types:
+            self._data_types_dialog = QProgressDialog(
+                "Loading data types", "Load When Needed", 0, 0, self
+            )
+            self._data_types_dialog.setMinimumDuration(1000)
+            self._data_types_dialog.canceled.connect(self._cancel_data_types)
+            progress = self.uaclient.progress(self._show_data_types_progress)
+        self._data_types_future = self.uaclient.submit(
+            self.uaclient.load_data_types_async(uri, progress),
+            callback=self._data_types_loaded,
+            errback=self._data_types_failed,
+        )
+
+    def _cancel_data_types(self):
+        self._close_data_types_dialog()
+        if self._data_types_future is not None and self._data_types_future.cancel():
+            logger.info("Loading data types canceled, they are read when needed")
+
+    def _show_data_types_progress(self, text):
+        if self._data_types_dialog is not None:
+            self._data_types_dialog.setLabelText(text)
+
+    def _data_types_loaded(self, _):
+        self._close_data_types_dialog()
+        logger.info(
+            "Data types loaded %.0f ms after connect",
+            (time.perf_counter() - self._connect_started) * 1000,
+        )
+
+    def _data_types_failed(self, ex):
+        self._close_data_types_dialog()
+        logger.warning("Loading data types failed: %r", ex)
+        self.show_error(ex)
+
+    def _close_data_types_dialog(self):
+        dialog, self._data_types_dialog = self._data_types_dialog, None
+        if dialog is not None:
+            dialog.canceled.disconnect(self._cancel_data_types)
+            dialog.reset()
+            dialog.deleteLater()
 
     def _update_address_list(self, uri):
         if uri == self._address_list[0]:
@@ -409,18 +875,37 @@ class Window(QMainWindow):
             self._address_list.pop(-1)
 
     def disconnect(self):
-        try:
-            self.uaclient.disconnect()
-        except Exception as ex:
-            self.show_error(ex)
-            raise
-        finally:
-            self.save_current_node()
-            self.tree_ui.clear()
-            self.refs_ui.clear()
-            self.attrs_ui.clear()
-            self.datachange_ui.clear()
-            self.event_ui.clear()
+        self._cancel_data_types()
+        self._cancel_snapshot()
+        self._connected_uri = None
+        self._snapshot_change = ModelChange()
+        self._model_change_timer.stop()
+        self._model_change = None
+        self._selection_timer.stop()
+        if self._node_view_future is not None:
+            self._node_view_future.cancel()
+            self._node_view_future = None
+        # the session is closed in the background, a slow or dead server
+        # does not hold the window
+        future = self.uaclient.submit(
+            self.uaclient.disconnect_async(), errback=self.show_error
+        )
+        self._closing = [f for f in self._closing if not f.done()] + [future]
+        self.save_current_node()
+        self.tree_ui.clear()
+        self.refs_ui.clear()
+        self.attrs_ui.clear()
+        self.datachange_ui.clear()
+        self.event_ui.clear()
+        self.graph_ui.clear()
+        return future
+
+    def wait_disconnected(self, timeout=None):
+        """
+        block until the sessions being closed are, e.g. before the process
+        and its loop thread end
+        """
+        concurrent.futures.wait(self._closing, timeout)
 
     def closeEvent(self, event):
         self.tree_ui.save_state()
@@ -442,8 +927,32 @@ class Window(QMainWindow):
             uri = self.ui.addrComboBox.currentText()
             mysettings[uri] = current_node.nodeid.to_string()
             self.settings.setValue("current_node", mysettings)
-
-    def load_current_node(self):
+            paths = self.settings.value("current_path", None)
+            if paths is None:
+                paths = {}
+            path = self.tree_ui.get_current_node_path()
+            paths[uri] = [nodeid.to_string() for nodeid in path]
+            self.settings.setValue("current_path", paths)
+
+    def _saved_path(self, uri):
+        """
+        nodeids of the tree path to the saved current node of uri,
+        empty if it is unknown or does not lead to the saved node
+        """
+        nodes = self.settings.value("current_node", None) or {}
+        paths = self.settings.value("current_path", None) or {}
+        path = paths.get(uri)
+        if not path or path[-1] != nodes.get(uri):
+            return []
+        return [ua.NodeId.from_string(nodeid) for nodeid in path]
+
+    def load_current_node(self, path=()):
+        """
+        select the saved current node, along path if known
+        """
+        if path:
+            self.tree_ui.expand_to_path(path)
+            return
         mysettings = self.settings.value("current_node", None)
         if mysettings is None:
             return
@@ -463,6 +972,10 @@ class Window(QMainWindow):
         self.addAction(self.ui.actionCopyNodeId)
         self._contextMenu.addSeparator()
         self._contextMenu.addAction(self.ui.actionCall)
+        self._contextMenu.addAction(self.ui.actionExportHistory)
+        self._contextMenu.addSeparator()
+        self._contextMenu.addAction(self.tree_ui.actionExpandAll)
+        self._contextMenu.addAction(self.tree_ui.actionReload)
         self._contextMenu.addSeparator()
 
     def addAction(self, action):
@@ -470,11 +983,13 @@ class Window(QMainWindow):
 
     @trycatchslot
     def _update_actions_state(self, current, previous):
-        node = self.get_current_node(current)
-        self.ui.actionCall.setEnabled(False)
-        if node:
-            if node.read_node_class() == ua.NodeClass.Method:
-                self.ui.actionCall.setEnabled(True)
+        # the NodeClass is known from browsing, else from show_node_view
+        node_class = self.tree_ui.get_node_class(current)
+        self.ui.actionCall.setEnabled(node_class == ua.NodeClass.Method)
+
+    def _set_call_enabled(self, node, node_class):
+        if node == self.get_current_node():
+            self.ui.actionCall.setEnabled(node_class == ua.NodeClass.Method)
 
     def _show_context_menu_tree(self, position):
         node = self.tree_ui.get_current_node()
@@ -486,6 +1001,115 @@ class Window(QMainWindow):
         dia = CallMethodDialog(self, self.uaclient.client, node)
         dia.show()
 
+    @trycatchslot
+    def export_history(self):
+        nodes = self.tree_ui.get_selected_nodes()
+        if not nodes:
+            return
+        dia = HistoryExportDialog(self)
+        if dia.exec_() == QDialog.Accepted and dia.path:
+            # kept until the next export, it receives the progress
+            self._history_export = dia
+            dia.exported.connect(self._history_exported)
+            dia.export(nodes)
+
+    def _history_exported(self, rows, failed):
+        if not failed:
+            return
+        lines = format_failed(failed)
+        if len(lines) > 20:
+            lines = lines[:20] + [f"... and {len(lines) - 20} more"]
+        QMessageBox.warning(
+            self,
+            "History export",
+            f"{rows} values written. The history of {len(failed)} nodes could "
+            "not be read:\n" + "\n".join(lines),
+        )
+
+    def _snapshot_directory(self):
+        return self.settings.value("snapshot_directory", default_directory())
+
+    @trycatchslot
+    def crawl_snapshot(self):
+        """
+        store the address space of the server in its snapshot, refreshing
+        the snapshot if one was made before, then show it
+        """
+        if self._connected_uri is None or self._snapshot_future is not None:
+            return
+        self._snapshot_dialog = QProgressDialog(
+            f"Crawling {self._connected_uri}", "Cancel", 0, 0, self
+        )
+        self._snapshot_dialog.setMinimumDuration(1000)
+        self._snapshot_dialog.canceled.connect(self._cancel_snapshot)
+        # kept until the crawl succeeds, another crawl would need it again
+        self._crawled_change = self._snapshot_change
+        self._snapshot_change = ModelChange()
+        self._snapshot_future = self.uaclient.submit(
+            snapshot_async(
+                self.uaclient,
+                self._connected_uri,
+                self._snapshot_directory(),
+                change=self._crawled_change,
+                progress=self.uaclient.progress(self._show_snapshot_progress),
+            ),
+            callback=self._snapshot_stored,
+            errback=self._snapshot_failed,
+        )
+
+    def _cancel_snapshot(self):
+        future, self._snapshot_future = self._snapshot_future, None
+        self._close_snapshot_dialog()
+        if future is not None and future.cancel():
+            logger.info("Crawling snapshot canceled, crawling again resumes it")
+            self._snapshot_change.update(self._crawled_change)
+
+    def _show_snapshot_progress(self, nodes):
+        if self._snapshot_dialog is not None:
+            self._snapshot_dialog.setLabelText(f"{nodes} nodes stored")
+
+    def _snapshot_stored(self, path):
+        self._snapshot_future = None
+        self._close_snapshot_dialog()
+        self.show_snapshot(path)
+
+    def _snapshot_failed(self, ex):
+        self._snapshot_future = None
+        self._snapshot_change.update(self._crawled_change)
+        self._close_snapshot_dialog()
+        logger.warning("Crawling snapshot failed: %r", ex)
+        self.show_error(ex)
+
+    def _close_snapshot_dialog(self):
+        dialog, self._snapshot_dialog = self._snapshot_dialog, None
+        if dialog is not None:
+            dialog.canceled.disconnect(self._cancel_snapshot)
+            dialog.reset()
+            dialog.deleteLater()
+
+    @trycatchslot
+    def open_snapshot(self):
+        path, ok = QFileDialog.getOpenFileName(
+            self, "Open snapshot", self._snapshot_directory(), "Snapshots (*.sqlite)"
+        )
+        if ok and path:
+            self.show_snapshot(path)
+
+    def show_snapshot(self, path):
+        widget = SnapshotWidget(path, self)
+        widget.show()
+        return widget
+
+    def lazy_data_types(self):
+        lazy = self.ui.actionLazyDataTypes.isChecked()
+        self.uaclient.lazy_data_types = lazy
+        self.settings.setValue("lazy_data_types", lazy)
+
+    def prewarm_connections(self):
+        prewarm = self.ui.actionPrewarm.isChecked()
+        self.settings.setValue("prewarm_connections", prewarm)
+        self._schedule_prewarm(self.ui.addrComboBox.currentText())
+
     def dark_mode(self):
         self.settings.setValue("dark_mode", self.ui.actionDark_Mode.isChecked())
 
@@ -512,7 +1136,9 @@ def main():
         app.setStyleSheet(stream.readAll())
 
     client.show()
-    sys.exit(app.exec_())
+    code = app.exec_()
+    client.wait_disconnected(5)
+    sys.exit(code)
 
 
 if __name__ == "__main__":
@@ -301,19 +301,41 @@ class Ui_MainWindow(object):
         self.horizontalLayout.addWidget(self.labelNumberOfPoints)
         self.spinBoxNumberOfPoints = QtWidgets.QSpinBox(self.dockWidgetContents_6)
         self.spinBoxNumberOfPoints.setMinimum(10)
-        self.spinBoxNumberOfPoints.setMaximum(100)
+        self.spinBoxNumberOfPoints.setMaximum(10000000)
         self.spinBoxNumberOfPoints.setProperty("value", 30)
         self.spinBoxNumberOfPoints.setObjectName("spinBoxNumberOfPoints")
         self.horizontalLayout.addWidget(self.spinBoxNumberOfPoints)
         self.labelIntervall = QtWidgets.QLabel(self.dockWidgetContents_6)
         self.labelIntervall.setObjectName("labelIntervall")
         self.horizontalLayout.addWidget(self.labelIntervall)
-        self.spinBoxIntervall = QtWidgets.QSpinBox(self.dockWidgetContents_6)
-        self.spinBoxIntervall.setMinimum(1)
-        self.spinBoxIntervall.setMaximum(3600)
-        self.spinBoxIntervall.setProperty("value", 5)
+        self.spinBoxIntervall = QtWidgets.QDoubleSpinBox(self.dockWidgetContents_6)
+        self.spinBoxIntervall.setDecimals(2)
+        self.spinBoxIntervall.setMinimum(0.05)
+        self.spinBoxIntervall.setMaximum(3600.0)
+        self.spinBoxIntervall.setSingleStep(0.1)
+        self.spinBoxIntervall.setProperty("value", 5.0)
         self.spinBoxIntervall.setObjectName("spinBoxIntervall")
         self.horizontalLayout.addWidget(self.spinBoxIntervall)
+        self.comboBoxAcquisition = QtWidgets.QComboBox(self.dockWidgetContents_6)
+        self.comboBoxAcquisition.setObjectName("comboBoxAcquisition")
+        self.comboBoxAcquisition.addItem("")
+        self.comboBoxAcquisition.addItem("")
+        self.horizontalLayout.addWidget(self.comboBoxAcquisition)
+        self.comboBoxTimestamps = QtWidgets.QComboBox(self.dockWidgetContents_6)
+        self.comboBoxTimestamps.setObjectName("comboBoxTimestamps")
+        self.comboBoxTimestamps.addItem("")
+        self.comboBoxTimestamps.addItem("")
+        self.comboBoxTimestamps.addItem("")
+        self.horizontalLayout.addWidget(self.comboBoxTimestamps)
+        self.comboBoxAggregate = QtWidgets.QComboBox(self.dockWidgetContents_6)
+        self.comboBoxAggregate.setObjectName("comboBoxAggregate")
+        self.comboBoxAggregate.addItem("")
+        self.comboBoxAggregate.addItem("")
+        self.comboBoxAggregate.addItem("")
+        self.comboBoxAggregate.addItem("")
+        self.comboBoxAggregate.addItem("")
+        self.comboBoxAggregate.addItem("")
+        self.horizontalLayout.addWidget(self.comboBoxAggregate)
         self.buttonApply = QtWidgets.QPushButton(self.dockWidgetContents_6)
         self.buttonApply.setObjectName("buttonApply")
         self.horizontalLayout.addWidget(self.buttonApply)
@@ -350,6 +372,18 @@ class Ui_MainWindow(object):
         self.actionClient_Application_Certificate.setObjectName(
             "actionClient_Application_Certificate"
         )
+        self.actionLazyDataTypes = QtWidgets.QAction(MainWindow)
+        self.actionLazyDataTypes.setCheckable(True)
+        self.actionLazyDataTypes.setObjectName("actionLazyDataTypes")
+        self.actionPrewarm = QtWidgets.QAction(MainWindow)
+        self.actionPrewarm.setCheckable(True)
+        self.actionPrewarm.setObjectName("actionPrewarm")
+        self.actionExportHistory = QtWidgets.QAction(MainWindow)
+        self.actionExportHistory.setObjectName("actionExportHistory")
+        self.actionCrawlSnapshot = QtWidgets.QAction(MainWindow)
+        self.actionCrawlSnapshot.setObjectName("actionCrawlSnapshot")
+        self.actionOpenSnapshot = QtWidgets.QAction(MainWindow)
+        self.actionOpenSnapshot.setObjectName("actionOpenSnapshot")
         self.actionFocusTree = QtWidgets.QAction(MainWindow)
         self.actionFocusTree.setObjectName("actionFocusTree")
         self.menuOPC_UA_Client.addAction(self.actionConnect)
@@ -360,9 +394,14 @@ class Ui_MainWindow(object):
         self.menuOPC_UA_Client.addAction(self.actionUnsubscribeDataChange)
         self.menuOPC_UA_Client.addAction(self.actionSubscribeEvent)
         self.menuOPC_UA_Client.addAction(self.actionUnsubscribeEvents)
+        self.menuOPC_UA_Client.addAction(self.actionExportHistory)
+        self.menuOPC_UA_Client.addAction(self.actionCrawlSnapshot)
+        self.menuOPC_UA_Client.addAction(self.actionOpenSnapshot)
         self.menuOPC_UA_Client.addAction(self.actionFocusTree)
         self.menuSettings.addAction(self.actionDark_Mode)
         self.menuSettings.addAction(self.actionClient_Application_Certificate)
+        self.menuSettings.addAction(self.actionLazyDataTypes)
+        self.menuSettings.addAction(self.actionPrewarm)
         self.menuBar.addAction(self.menuOPC_UA_Client.menuAction())
         self.menuBar.addAction(self.menuSettings.menuAction())
 
@@ -379,7 +418,10 @@ class Ui_MainWindow(object):
         MainWindow.setTabOrder(self.refView, self.evView)
         MainWindow.setTabOrder(self.evView, self.spinBoxNumberOfPoints)
         MainWindow.setTabOrder(self.spinBoxNumberOfPoints, self.spinBoxIntervall)
-        MainWindow.setTabOrder(self.spinBoxIntervall, self.buttonApply)
+        MainWindow.setTabOrder(self.spinBoxIntervall, self.comboBoxAcquisition)
+        MainWindow.setTabOrder(self.comboBoxAcquisition, self.comboBoxTimestamps)
+        MainWindow.setTabOrder(self.comboBoxTimestamps, self.comboBoxAggregate)
+        MainWindow.setTabOrder(self.comboBoxAggregate, self.buttonApply)
         MainWindow.setTabOrder(self.buttonApply, self.logTextEdit)
 
     def retranslateUi(self, MainWindow):
@@ -398,6 +440,34 @@ class Ui_MainWindow(object):
         self.graphDockWidget.setWindowTitle(_translate("MainWindow", "&Graph"))
         self.labelNumberOfPoints.setText(_translate("MainWindow", "Number of Points"))
         self.labelIntervall.setText(_translate("MainWindow", "Intervall [s]"))
+        self.comboBoxAcquisition.setToolTip(
+            _translate(
+                "MainWindow",
+                "Poll values at the interval or receive them from a subscription sampling at the interval",
+            )
+        )
+        self.comboBoxAcquisition.setItemText(0, _translate("MainWindow", "Polling"))
+        self.comboBoxAcquisition.setItemText(
+            1, _translate("MainWindow", "Subscription")
+        )
+        self.comboBoxTimestamps.setToolTip(
+            _translate("MainWindow", "Timestamp placing the samples on the time axis")
+        )
+        self.comboBoxTimestamps.setItemText(0, _translate("MainWindow", "Source time"))
+        self.comboBoxTimestamps.setItemText(1, _translate("MainWindow", "Server time"))
+        self.comboBoxTimestamps.setItemText(2, _translate("MainWindow", "Client time"))
+        self.comboBoxAggregate.setToolTip(
+            _translate(
+                "MainWindow",
+                "Aggregate read from the server when history holds more values than pixels",
+            )
+        )
+        self.comboBoxAggregate.setItemText(0, _translate("MainWindow", "Min/Max"))
+        self.comboBoxAggregate.setItemText(1, _translate("MainWindow", "Minimum"))
+        self.comboBoxAggregate.setItemText(2, _translate("MainWindow", "Maximum"))
+        self.comboBoxAggregate.setItemText(3, _translate("MainWindow", "Average"))
+        self.comboBoxAggregate.setItemText(4, _translate("MainWindow", "Interpolative"))
+        self.comboBoxAggregate.setItemText(5, _translate("MainWindow", "Raw"))
         self.buttonApply.setText(_translate("MainWindow", "Apply"))
         self.actionConnect.setText(_translate("MainWindow", "&Connect"))
         self.actionDisconnect.setText(_translate("MainWindow", "&Disconnect"))
@@ -457,5 +527,38 @@ class Ui_MainWindow(object):
         self.actionClient_Application_Certificate.setText(
             _translate("MainWindow", "Client Application Certificate")
         )
+        self.actionLazyDataTypes.setText(
+            _translate("MainWindow", "Load Data Types When Needed")
+        )
+        self.actionLazyDataTypes.setStatusTip(
+            _translate(
+                "MainWindow",
+                "Read custom data types on first use instead of when connecting",
+            )
+        )
+        self.actionPrewarm.setText(_translate("MainWindow", "Prewarm Connections"))
+        self.actionPrewarm.setStatusTip(
+            _translate(
+                "MainWindow",
+                "Open a secure channel to the selected or hovered address before connecting",
+            )
+        )
+        self.actionExportHistory.setText(_translate("MainWindow", "&Export History..."))
+        self.actionExportHistory.setToolTip(
+            _translate(
+                "MainWindow", "Export the history of the selected nodes to a file"
+            )
+        )
+        self.actionCrawlSnapshot.setText(_translate("MainWindow", "Crawl &Snapshot"))
+        self.actionCrawlSnapshot.setToolTip(
+            _translate(
+                "MainWindow",
+                "Store the address space of the server in a local snapshot, or refresh it",
+            )
+        )
+        self.actionOpenSnapshot.setText(_translate("MainWindow", "&Open Snapshot..."))
+        self.actionOpenSnapshot.setToolTip(
+            _translate("MainWindow", "Browse and search a snapshot offline")
+        )
         self.actionFocusTree.setText(_translate("MainWindow", "FocusTree"))
         self.actionFocusTree.setShortcut(_translate("MainWindow", "Alt+T"))
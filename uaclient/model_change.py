@@ -0,0 +1,66 @@
+from asyncua import ua
+
+
+class ModelChange(object):
+    """
+    nodes affected by GeneralModelChangeEvents and SemanticChangeEvents
+    of a server, see UaClient.subscribe_model_changes_async
+    """
+
+    def __init__(self):
+        self.references = set()  # nodeids whose references changed
+        self.added = set()
+        self.deleted = set()
+        self.attributes = set()  # nodeids whose attributes changed meaning
+        self.everything = False  # the server did not tell what changed
+
+    def __bool__(self):
+        return self.everything or any(
+            (self.references, self.added, self.deleted, self.attributes)
+        )
+
+    @classmethod
+    def from_event(cls, event):
+        change = cls()
+        changes = getattr(event, "Changes", None) or []
+        if not isinstance(changes, list):
+            changes = [changes]
+        if not changes:
+            # a BaseModelChangeEvent, or a server not listing the changes
+            change.everything = True
+        for item in changes:
+            if isinstance(item, ua.SemanticChangeStructureDataType):
+                change.attributes.add(item.Affected)
+                continue
+            verb = item.Verb
+            if verb & ua.ModelChangeStructureVerbMask.NodeAdded:
+                change.added.add(item.Affected)
+            if verb & ua.ModelChangeStructureVerbMask.NodeDeleted:
+                change.deleted.add(item.Affected)
+            if verb & (
+                ua.ModelChangeStructureVerbMask.ReferenceAdded
+                | ua.ModelChangeStructureVerbMask.ReferenceDeleted
+            ):
+                change.references.add(item.Affected)
+            if verb & ua.ModelChangeStructureVerbMask.DataTypeChanged:
+                change.attributes.add(item.Affected)
+        return change
+
+    def update(self, other):
+        """
+        merge other into self, to handle a burst of events at once
+        """
+        self.references |= other.references
+        self.added |= other.added
+        self.deleted |= other.deleted
+        self.attributes |= other.attributes
+        self.everything = self.everything or other.everything
+
+    def affects(self, nodeid):
+        """
+        True if what is shown of nodeid, attributes or references, is stale
+        """
+        return self.everything or any(
+            nodeid in nodeids
+            for nodeids in (self.references, self.deleted, self.attributes)
+        )
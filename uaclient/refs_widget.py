@@ -0,0 +1,47 @@
+from functools import partial
+
+from uawidgets import refs_widget
+from uawidgets.utils import trycatchslot
+
+
+class RefsWidget(refs_widget.RefsWidget):
+    """
+    RefsWidget from uawidgets showing references browsed beforehand,
+    see UaClient.read_node_view_async
+    """
+
+    def __init__(self, view, uaclient):
+        super().__init__(view)
+        self.uaclient = uaclient
+        self._refs = None
+        self._future = None
+
+    def show_refs(self, node, refs=None):
+        # without refs, e.g. on reload, they are browsed in the background
+        # and shown once they arrive
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+        if refs is None and node is not None:
+            self._future = self.uaclient.submit(
+                self.uaclient.get_references_async(node),
+                callback=partial(self.show_refs, node),
+                errback=self.error.emit,
+            )
+            return
+        self._refs = refs
+        try:
+            super().show_refs(node)
+        finally:
+            self._refs = None
+
+    def _show_refs(self, node):
+        for ref in self._refs or []:
+            self._add_ref_row(ref)
+
+    @trycatchslot
+    def reload(self):
+        # references were added or removed here, or the user asks again
+        if self.node is not None:
+            self.uaclient.browse_cache.invalidate(self.node.nodeid)
+        super().reload()
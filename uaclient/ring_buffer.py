@@ -0,0 +1,72 @@
+import numpy as np
+
+
+class RingBuffer(object):
+    """
+    Fixed capacity buffer of (timestamp, value) samples.
+    Every sample is written twice, capacity apart, so the samples in
+    order are always one contiguous slice: appending is O(1) and reading
+    returns views without copying
+    """
+
+    def __init__(self, capacity):
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        if capacity < 1:
+            raise ValueError(f"capacity must be at least 1, got {capacity}")
+        self.capacity = capacity
+        self._times = np.zeros(2 * capacity)
+        self._values = np.zeros(2 * capacity)
+        self._start = 0  # index of the oldest sample
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, timestamp, value):
+        end = self._start + self._size
+        if self._size == self.capacity:
+            self._start = (self._start + 1) % self.capacity
+        else:
+            self._size += 1
+        pos = end % self.capacity
+        self._times[pos] = self._times[pos + self.capacity] = timestamp
+        self._values[pos] = self._values[pos + self.capacity] = value
+
+    def extend(self, timestamps, values):
+        first = max(0, len(values) - self.capacity)
+        timestamps = np.asarray(timestamps, dtype=float)[first:]
+        values = np.asarray(values, dtype=float)[first:]
+        count = len(values)
+        if not count:
+            return
+        end = self._start + self._size
+        overflow = max(0, self._size + count - self.capacity)
+        self._size = min(self.capacity, self._size + count)
+        self._start = (self._start + overflow) % self.capacity
+        pos = (end + np.arange(count)) % self.capacity
+        self._times[pos] = self._times[pos + self.capacity] = timestamps
+        self._values[pos] = self._values[pos + self.capacity] = values
+
+    def times(self):
+        start, end = self._start, self._start + self._size
+        return self._times[start:end]
+
+    def values(self):
+        start, end = self._start, self._start + self._size
+        return self._values[start:end]
+
+    def resize(self, capacity):
+        """
+        change capacity keeping the most recent samples
+        """
+        if capacity == self.capacity:
+            return
+        times, values = self.times(), self.values()
+        self._allocate(capacity)
+        self.extend(times, values)
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
@@ -0,0 +1,52 @@
+import logging
+
+from asyncua import ua
+
+
+logger = logging.getLogger(__name__)
+
+
+class ServerCapabilities(object):
+    """
+    Limits advertised by the server under Server/ServerCapabilities,
+    read once per connection. 0 means the server sets no limit
+    """
+
+    _nodeids = {
+        "max_nodes_per_read": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRead,
+        "max_nodes_per_write": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerWrite,
+        "max_nodes_per_browse": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerBrowse,
+        "max_nodes_per_register_nodes": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerRegisterNodes,
+        "max_monitored_items_per_call": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxMonitoredItemsPerCall,
+        "max_nodes_per_history_read_data": ua.ObjectIds.Server_ServerCapabilities_OperationLimits_MaxNodesPerHistoryReadData,
+        "max_browse_continuation_points": ua.ObjectIds.Server_ServerCapabilities_MaxBrowseContinuationPoints,
+        "max_history_continuation_points": ua.ObjectIds.Server_ServerCapabilities_MaxHistoryContinuationPoints,
+    }
+
+    def __init__(self):
+        for name in self._nodeids:
+            setattr(self, name, 0)
+
+    def __str__(self):
+        limits = ", ".join(f"{name}={getattr(self, name)}" for name in self._nodeids)
+        return f"ServerCapabilities({limits})"
+
+    __repr__ = __str__
+
+    @classmethod
+    async def read(cls, client):
+        """
+        read all limits with one Read, missing ones are left at 0
+        """
+        caps = cls()
+        nodes = [client.get_node(nodeid) for nodeid in cls._nodeids.values()]
+        try:
+            dvs = await client.read_attributes(nodes)
+        except ua.UaError as ex:
+            logger.warning("Could not read server capabilities: %r", ex)
+            return caps
+        for name, dv in zip(cls._nodeids, dvs):
+            if dv.StatusCode.is_good() and dv.Value.Value:
+                setattr(caps, name, int(dv.Value.Value))
+        logger.info("Server limits: %s", caps)
+        return caps
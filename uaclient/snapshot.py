@@ -0,0 +1,652 @@
+import argparse
+import asyncio
+from datetime import datetime, timezone
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+import threading
+from urllib.parse import urlparse
+
+from PyQt5.QtCore import QCoreApplication, QStandardPaths
+from asyncua import ua
+
+from uaclient.browse_cache import PARENTS
+from uaclient.data_types import read_model_key
+from uaclient.uaclient import UaClient
+
+
+logger = logging.getLogger(__name__)
+
+
+ROOT = ua.NodeId(ua.ObjectIds.RootFolder).to_string()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS nodes (
+    nodeid TEXT PRIMARY KEY,
+    node_class INTEGER,
+    browse_name TEXT,
+    display_name TEXT,
+    type_definition TEXT,
+    description TEXT,
+    data_type TEXT,
+    browsed INTEGER NOT NULL DEFAULT 0,
+    attributes_read INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS refs (
+    source TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    reference_type TEXT,
+    is_forward INTEGER,
+    PRIMARY KEY (source, position)
+);
+CREATE INDEX IF NOT EXISTS refs_target ON refs (target);
+"""
+
+# nodeids per query, below the SQLite limit of host parameters
+_CHUNK = 500
+
+
+class Snapshot(object):
+    """
+    nodes, hierarchical references and key attributes of the address
+    space of a server in a SQLite file, filled by crawl_async() and read
+    without connection. Safe to use from the GUI and the loop thread
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._db:
+            # readers see the last committed level while a crawl writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def __len__(self):
+        return self._query_one("SELECT COUNT(*) FROM nodes")[0]
+
+    def read_meta(self, key):
+        row = self._query_one("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(row[0]) if row else None
+
+    def write_meta(self, key, value):
+        with self._lock, self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta VALUES (?, ?)", (key, json.dumps(value))
+            )
+
+    def put_nodes(self, rows):
+        """
+        add or update nodes from (nodeid, NodeClass, BrowseName, DisplayName)
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "INSERT INTO nodes (nodeid, node_class, browse_name, display_name)"
+                " VALUES (?, ?, ?, ?) ON CONFLICT (nodeid) DO UPDATE SET"
+                " node_class = excluded.node_class,"
+                " browse_name = excluded.browse_name,"
+                " display_name = excluded.display_name",
+                [
+                    (nodeid, int(node_class), bname.to_string(), dname.Text)
+                    for nodeid, node_class, bname, dname in rows
+                ],
+            )
+
+    def put_children(self, children):
+        """
+        store {nodeid: descriptions} of browsed nodes, replacing the
+        references stored for them before. Attributes of the nodes whose
+        references or names changed are to be read again, see
+        attributes_missing(). return the browsed nodes which changed
+        """
+        changed = []
+        with self._lock, self._db:
+            for nodeid, descs in children.items():
+                refs = [
+                    (
+                        desc.NodeId.to_string(),
+                        desc.ReferenceTypeId.to_string(),
+                        int(desc.IsForward),
+                    )
+                    for desc in descs
+                ]
+                old = self._db.execute(
+                    "SELECT target, reference_type, is_forward FROM refs"
+                    " WHERE source = ?",
+                    (nodeid,),
+                ).fetchall()
+                browsed = self._db.execute(
+                    "SELECT browsed FROM nodes WHERE nodeid = ?", (nodeid,)
+                ).fetchone()
+                # servers do not keep the order of references
+                if browsed and browsed[0] and sorted(old) != sorted(refs):
+                    changed.append(nodeid)
+                self._db.execute("DELETE FROM refs WHERE source = ?", (nodeid,))
+                self._db.executemany(
+                    "INSERT INTO refs VALUES (?, ?, ?, ?, ?)",
+                    [(nodeid, position) + ref for position, ref in enumerate(refs)],
+                )
+                # a renamed node is read again. NodeClass and TypeDefinition
+                # are not compared, some servers report them differently
+                # depending on the reference the node is reached through
+                self._db.executemany(
+                    "INSERT INTO nodes (nodeid, node_class, browse_name,"
+                    " display_name, type_definition) VALUES (?, ?, ?, ?, ?)"
+                    " ON CONFLICT (nodeid) DO UPDATE SET"
+                    " node_class = excluded.node_class,"
+                    " browse_name = excluded.browse_name,"
+                    " display_name = excluded.display_name,"
+                    " type_definition = excluded.type_definition,"
+                    " attributes_read = attributes_read"
+                    " AND browse_name IS excluded.browse_name"
+                    " AND display_name IS excluded.display_name",
+                    [
+                        (
+                            desc.NodeId.to_string(),
+                            int(desc.NodeClass),
+                            desc.BrowseName.to_string(),
+                            desc.DisplayName.Text,
+                            _nodeid_text(desc.TypeDefinition),
+                        )
+                        for desc in descs
+                    ],
+                )
+                self._db.execute(
+                    "UPDATE nodes SET browsed = 1, attributes_read = attributes_read"
+                    " AND ? WHERE nodeid = ?",
+                    (nodeid not in changed, nodeid),
+                )
+        return changed
+
+    def mark_stale(self, browse, read):
+        """
+        have the next crawl browse again the nodes in browse, and read again
+        the attributes of the nodes in read. Their stored children are still
+        shown meanwhile
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE nodes SET browsed = 2 WHERE browsed = 1 AND nodeid = ?",
+                [(nodeid,) for nodeid in browse],
+            )
+            self._db.executemany(
+                "UPDATE nodes SET attributes_read = 0 WHERE nodeid = ?",
+                [(nodeid,) for nodeid in read],
+            )
+
+    def referrers(self, nodeids):
+        """
+        nodeids of the stored nodes referencing one of nodeids
+        """
+        rows = self._query_in("SELECT DISTINCT source FROM refs", nodeids, "target")
+        return {source for (source,) in rows}
+
+    def namespace_nodes(self, indexes):
+        """
+        nodeids of the stored nodes in the namespaces at indexes
+        """
+        nodeids = []
+        for index in indexes:
+            if index:
+                sql = "SELECT nodeid FROM nodes WHERE nodeid LIKE ?"
+                rows = self._query(sql, (f"ns={index};%",))
+            else:
+                rows = self._query(
+                    "SELECT nodeid FROM nodes WHERE nodeid NOT LIKE 'ns=%'"
+                )
+            nodeids.extend(nodeid for (nodeid,) in rows)
+        return nodeids
+
+    def put_attributes(self, rows):
+        """
+        store (nodeid, Description, DataType) of nodes, text or None
+        """
+        with self._lock, self._db:
+            self._db.executemany(
+                "UPDATE nodes SET description = ?, data_type = ?,"
+                " attributes_read = 1 WHERE nodeid = ?",
+                [
+                    (description, data_type, nodeid)
+                    for nodeid, description, data_type in rows
+                ],
+            )
+
+    def browsed(self, nodeids):
+        """
+        {nodeid: nodeids of its children} of the nodes in nodeids already browsed
+        """
+        browsed = self._query_in("SELECT nodeid FROM nodes WHERE browsed = 1", nodeids)
+        children = {nodeid: [] for (nodeid,) in browsed}
+        rows = self._query_in(
+            "SELECT source, position, target FROM refs", list(children), "source"
+        )
+        for source, _, target in sorted(rows):
+            children[source].append(target)
+        return children
+
+    def attributes_missing(self, nodeids):
+        """
+        (nodeid, NodeClass) of the nodes in nodeids whose attributes were not read
+        """
+        return self._query_in(
+            "SELECT nodeid, node_class FROM nodes WHERE attributes_read = 0", nodeids
+        )
+
+    def children(self, nodeid):
+        """
+        ReferenceDescriptions of the children of nodeid in browsing
+        order, None if it was not browsed
+        """
+        if not self._query_one(
+            "SELECT 1 FROM nodes WHERE nodeid = ? AND browsed > 0", (nodeid,)
+        ):
+            return None
+        rows = self._query(
+            "SELECT r.target, r.reference_type, r.is_forward, n.node_class,"
+            " n.browse_name, n.display_name, n.type_definition"
+            " FROM refs r JOIN nodes n ON n.nodeid = r.target"
+            " WHERE r.source = ? ORDER BY r.position",
+            (nodeid,),
+        )
+        return [_description(*row) for row in rows]
+
+    def description(self, nodeid):
+        """
+        ReferenceDescription of nodeid, as shown in a tree, None if unknown
+        """
+        row = self._query_one(
+            "SELECT nodeid, NULL, 1, node_class, browse_name, display_name,"
+            " type_definition FROM nodes WHERE nodeid = ?",
+            (nodeid,),
+        )
+        return _description(*row) if row else None
+
+    def node(self, nodeid):
+        """
+        {attribute name: value as text} stored for nodeid, None if unknown
+        """
+        row = self._query_one(
+            "SELECT nodeid, node_class, browse_name, display_name, description,"
+            " data_type, type_definition FROM nodes WHERE nodeid = ?",
+            (nodeid,),
+        )
+        if row is None:
+            return None
+        names = ["NodeId", "NodeClass", "BrowseName", "DisplayName"]
+        names += ["Description", "DataType", "TypeDefinition"]
+        attrs = dict(zip(names, row))
+        if attrs["NodeClass"] is not None:
+            attrs["NodeClass"] = ua.NodeClass(attrs["NodeClass"]).name
+        return {name: value for name, value in attrs.items() if value is not None}
+
+    def parent(self, nodeid):
+        row = self._query_one(
+            "SELECT source FROM refs WHERE target = ? ORDER BY rowid LIMIT 1",
+            (nodeid,),
+        )
+        return row[0] if row else None
+
+    def get_path(self, nodeid):
+        """
+        nodeids from the root node to nodeid, through the first parent found
+        """
+        path = [nodeid]
+        while path[0] != ROOT:
+            parent = self.parent(path[0])
+            if parent is None or parent in path:
+                return None
+            path.insert(0, parent)
+        return path
+
+    def search(self, text, limit=200):
+        """
+        (nodeid, DisplayName, BrowseName, NodeClass) of up to limit nodes
+        whose names contain text, case insensitive, or whose NodeId is text.
+        Names starting with text come first
+        """
+        pattern = (
+            "%"
+            + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+            + "%"
+        )
+        return [
+            (nodeid, dname, bname, ua.NodeClass(node_class))
+            for nodeid, dname, bname, node_class in self._query(
+                "SELECT nodeid, display_name, browse_name, node_class FROM nodes"
+                " WHERE nodeid = ? OR display_name LIKE ? ESCAPE '\\'"
+                " OR browse_name LIKE ? ESCAPE '\\'"
+                " ORDER BY nodeid != ?, display_name NOT LIKE ? ESCAPE '\\',"
+                " display_name LIMIT ?",
+                (text, pattern, pattern, text, pattern[1:], limit),
+            )
+        ]
+
+    def prune(self, keep=(ROOT,)):
+        """
+        remove the nodes no stored reference leads to anymore, but keep.
+        return the number of nodes removed
+        """
+        removed = 0
+        with self._lock, self._db:
+            self._db.execute("CREATE TEMP TABLE IF NOT EXISTS keep (nodeid TEXT)")
+            self._db.execute("DELETE FROM keep")
+            self._db.executemany("INSERT INTO keep VALUES (?)", [(n,) for n in keep])
+            while True:
+                # orphans of removed nodes are removed next round
+                count = self._db.execute(
+                    "DELETE FROM nodes WHERE nodeid NOT IN (SELECT target FROM refs)"
+                    " AND nodeid NOT IN (SELECT nodeid FROM keep)"
+                ).rowcount
+                self._db.execute(
+                    "DELETE FROM refs WHERE source NOT IN (SELECT nodeid FROM nodes)"
+                )
+                if not count:
+                    return removed
+                removed += count
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchall()
+
+    def _query_one(self, sql, params=()):
+        with self._lock:
+            return self._db.execute(sql, params).fetchone()
+
+    def _query_in(self, sql, nodeids, column="nodeid"):
+        # sql filtered on column being one of nodeids
+        joiner = " AND " if " WHERE " in sql else " WHERE "
+        rows = []
+        for start in range(0, len(nodeids), _CHUNK):
+            end = start + _CHUNK
+            chunk = nodeids[start:end]
+            marks = ", ".join("?" * len(chunk))
+            rows.extend(self._query(f"{sql}{joiner}{column} IN ({marks})", chunk))
+        return rows
+
+
+def _nodeid_text(nodeid):
+    if nodeid is None or nodeid.is_null():
+        return None
+    return nodeid.to_string()
+
+
+def _description(target, reference_type, is_forward, node_class, bname, dname, typedef):
+    desc = ua.ReferenceDescription()
+    desc.NodeId = ua.NodeId.from_string(target)
+    if reference_type:
+        desc.ReferenceTypeId = ua.NodeId.from_string(reference_type)
+    desc.IsForward = bool(is_forward)
+    desc.NodeClass = ua.NodeClass(node_class)
+    desc.BrowseName = ua.QualifiedName.from_string(bname)
+    desc.DisplayName = ua.LocalizedText(dname)
+    if typedef:
+        desc.TypeDefinition = ua.NodeId.from_string(typedef)
+    return desc
+
+
+def default_directory():
+    return os.path.join(
+        QStandardPaths.writableLocation(QStandardPaths.AppDataLocation), "snapshots"
+    )
+
+
+def snapshot_path(uri, directory):
+    """
+    file of the snapshot of the server at uri, one per endpoint. Whether
+    it is up to date is told by the model key stored in it
+    """
+    digest = hashlib.sha256(uri.encode("utf-8"))
+    host = re.sub(r"[^\w.-]+", "_", urlparse(uri).netloc or uri)
+    return os.path.join(directory, f"{host}-{digest.hexdigest()[:16]}.sqlite")
+
+
+async def crawl_async(uaclient, snapshot, nodeids=None, refresh=False, progress=None):
+    """
+    store the nodes below nodeids, the root node by default, in snapshot,
+    one Browse per chunk of a level of the tree and one Read per chunk of
+    the nodes new to the snapshot. Nodes already browsed are only browsed
+    again with refresh, so an interrupted crawl resumes where it stopped;
+    refreshing removes the nodes no longer found. progress(nodes) is called
+    in the loop thread after each level. return the number of nodes crawled
+    """
+    loop = asyncio.get_event_loop()
+    nodeids = [
+        nodeid.to_string() for nodeid in nodeids or [ua.NodeId.from_string(ROOT)]
+    ]
+    await _store_roots(uaclient, snapshot, nodeids)
+    seen = set()
+    level = nodeids
+    while level:
+        level = [nodeid for nodeid in dict.fromkeys(level) if nodeid not in seen]
+        seen.update(level)
+        children = {}
+        if not refresh:
+            children = await loop.run_in_executor(None, snapshot.browsed, level)
+        missing = [nodeid for nodeid in level if nodeid not in children]
+        browsed = await uaclient.browse_async(
+            [ua.NodeId.from_string(nodeid) for nodeid in missing], cache=False
+        )
+        results = {}
+        for nodeid, descs in browsed.items():
+            if isinstance(descs, ua.StatusCode):
+                logger.info("Could not browse %s: %s", nodeid, descs.name)
+                continue
+            results[nodeid.to_string()] = descs
+            children[nodeid.to_string()] = [desc.NodeId.to_string() for desc in descs]
+        changed = await loop.run_in_executor(None, snapshot.put_children, results)
+        level = [child for nodeid in level for child in children.get(nodeid, [])]
+        # nodes which changed were read with the level above, read them again
+        await _store_attributes(uaclient, snapshot, changed + level)
+        if progress is not None:
+            progress(len(seen))
+    if refresh:
+        removed = await loop.run_in_executor(None, snapshot.prune)
+        logger.info("%s nodes removed from snapshot %s", removed, snapshot.path)
+    return len(seen)
+
+
+async def _store_roots(uaclient, snapshot, nodeids):
+    attrs = [
+        ua.AttributeIds.NodeClass,
+        ua.AttributeIds.BrowseName,
+        ua.AttributeIds.DisplayName,
+    ]
+    nodes = [ua.NodeId.from_string(nodeid) for nodeid in nodeids]
+    dvs = await asyncio.gather(
+        *(uaclient.read_attributes_async(nodes, attr) for attr in attrs)
+    )
+    rows = []
+    for nodeid, values in zip(nodeids, zip(*dvs)):
+        for dv in values:
+            dv.StatusCode.check()
+        rows.append([nodeid] + [dv.Value.Value for dv in values])
+    await asyncio.get_event_loop().run_in_executor(None, snapshot.put_nodes, rows)
+    await _store_attributes(uaclient, snapshot, nodeids)
+
+
+async def _store_attributes(uaclient, snapshot, nodeids):
+    # Description of all nodes, DataType of variables, for the nodes new
+    # to the snapshot only
+    loop = asyncio.get_event_loop()
+    missing = await loop.run_in_executor(None, snapshot.attributes_missing, nodeids)
+    if not missing:
+        return
+    variables = [
+        nodeid
+        for nodeid, node_class in missing
+        if node_class in (ua.NodeClass.Variable, ua.NodeClass.VariableType)
+    ]
+    descriptions, data_types = await asyncio.gather(
+        uaclient.read_attributes_async(
+            [ua.NodeId.from_string(nodeid) for nodeid, _ in missing],
+            ua.AttributeIds.Description,
+        ),
+        uaclient.read_attributes_async(
+            [ua.NodeId.from_string(nodeid) for nodeid in variables],
+            ua.AttributeIds.DataType,
+        ),
+    )
+    data_types = dict(zip(variables, data_types))
+    rows = []
+    for (nodeid, _), description in zip(missing, descriptions):
+        text = None
+        if description.StatusCode.is_good() and description.Value.Value is not None:
+            text = description.Value.Value.Text
+        data_type = data_types.get(nodeid)
+        if data_type is not None and data_type.StatusCode.is_good():
+            data_type = data_type.Value.Value.to_string()
+        else:
+            data_type = None
+        rows.append((nodeid, text, data_type))
+    await loop.run_in_executor(None, snapshot.put_attributes, rows)
+
+
+async def _mark_changes(uaclient, snapshot, stored, key, change):
+    """
+    mark stale in snapshot the nodes of the namespaces whose version
+    differs between the model keys stored and key, and the nodes flagged
+    by change, a ModelChange or None. Their parents are browsed again too,
+    to find the nodes added and to forget the ones deleted
+    """
+    loop = asyncio.get_event_loop()
+    old = {uri: versions for uri, *versions in stored["namespace_versions"]}
+    new = {uri: versions for uri, *versions in key["namespace_versions"]}
+    indexes = [
+        index
+        for index, uri in enumerate(key["namespaces"])
+        if old.get(uri) != new.get(uri)
+    ]
+    nodes = set(await loop.run_in_executor(None, snapshot.namespace_nodes, indexes))
+    browse, read = set(nodes), set(nodes)
+    if change is not None:
+        browse.update(nodeid.to_string() for nodeid in change.references)
+        read.update(nodeid.to_string() for nodeid in change.attributes)
+        nodes.update(nodeid.to_string() for nodeid in change.added | change.deleted)
+        if change.added:
+            parents = await uaclient.browse_async(
+                list(change.added), PARENTS, cache=False
+            )
+            for descs in parents.values():
+                if not isinstance(descs, ua.StatusCode):
+                    browse.update(desc.NodeId.to_string() for desc in descs)
+    browse |= await loop.run_in_executor(None, snapshot.referrers, list(nodes))
+    logger.info(
+        "%s nodes to browse again, %s to read again in snapshot %s",
+        len(browse),
+        len(read),
+        snapshot.path,
+    )
+    await loop.run_in_executor(None, snapshot.mark_stale, browse, read)
+
+
+def _open_snapshot(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return Snapshot(path)
+
+
+def _store_meta(snapshot, uri, key):
+    snapshot.write_meta("url", uri)
+    snapshot.write_meta("model", key)
+    snapshot.write_meta("crawled", datetime.now(timezone.utc).isoformat())
+
+
+async def snapshot_async(uaclient, uri, directory, change=None, progress=None):
+    """
+    crawl the server at uri, connected to by uaclient, into its snapshot
+    in directory. A partial snapshot is resumed. A complete one is
+    refreshed incrementally: only the nodes flagged by change, the
+    ModelChange seen since the last crawl if any, and the nodes of the
+    namespaces whose version changed are browsed again. Everything is
+    browsed again if the NamespaceArray or the build info of the server
+    changed. return the path of the snapshot
+    """
+    loop = asyncio.get_event_loop()
+    path = snapshot_path(uri, directory)
+    key = await read_model_key(uaclient, uri)
+    key.pop("asyncua")
+    snapshot = await loop.run_in_executor(None, _open_snapshot, path)
+    try:
+        complete = await loop.run_in_executor(None, snapshot.read_meta, "crawled")
+        stored = await loop.run_in_executor(None, snapshot.read_meta, "model")
+        refresh = bool(complete) and (
+            stored is None
+            or any(stored[name] != key[name] for name in ("namespaces", "build_info"))
+            or (change is not None and change.everything)
+        )
+        if complete and not refresh:
+            await _mark_changes(uaclient, snapshot, stored, key, change)
+        logger.info(
+            "%s snapshot of %s in %s",
+            "Refreshing" if complete else "Crawling",
+            uri,
+            path,
+        )
+        count = await crawl_async(
+            uaclient, snapshot, refresh=refresh, progress=progress
+        )
+        if complete and not refresh:
+            # the nodes deleted are the ones no reference leads to anymore
+            removed = await loop.run_in_executor(None, snapshot.prune)
+            logger.info("%s nodes removed from snapshot %s", removed, path)
+        await loop.run_in_executor(None, _store_meta, snapshot, uri, key)
+        logger.info("%s nodes of %s stored in %s", count, uri, path)
+    finally:
+        await loop.run_in_executor(None, snapshot.close)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Store the address space of an OPC UA server in a SQLite "
+        "snapshot, or refresh the snapshot stored before"
+    )
+    parser.add_argument("url", help="server url, e.g. opc.tcp://localhost:4840")
+    parser.add_argument(
+        "-d", "--directory", help="where snapshots are kept, default as the GUI"
+    )
+    parser.add_argument("-v", "--verbose", action="store_true")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    # same settings as the GUI, so the security chosen there for url is used
+    QCoreApplication.setOrganizationName("FreeOpcUa")
+    QCoreApplication.setApplicationName("OpcUaClient")
+    uaclient = UaClient()
+    uaclient.load_security_settings(args.url)
+    directory = args.directory or default_directory()
+
+    async def crawl():
+        await uaclient.connect_async(args.url, data_types=False)
+        try:
+            return await snapshot_async(uaclient, args.url, directory)
+        finally:
+            await uaclient.disconnect_async()
+
+    # not loop.run(), crawls may take longer than its timeout
+    future = asyncio.run_coroutine_threadsafe(crawl(), uaclient.loop.loop)
+    try:
+        path = future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        return 1
+    except Exception as ex:
+        print(f"Snapshot failed: {ex!r}", file=sys.stderr)
+        return 1
+    finally:
+        uaclient.loop.stop()
+    print(f"Snapshot of {args.url} written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (
+    QLineEdit,
+    QListWidget,
+    QListWidgetItem,
+    QSplitter,
+    QTreeView,
+    QTreeWidget,
+    QTreeWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from uawidgets import tree_widget
+
+from uaclient.snapshot import ROOT, Snapshot
+
+
+class SnapshotModel(tree_widget.TreeViewModel):
+    """
+    tree of a Snapshot, children are read from the file when expanded.
+    Items hold the NodeId as text
+    """
+
+    def __init__(self, snapshot):
+        super().__init__()
+        self.snapshot = snapshot
+        self._fetched = set()
+        self.setHorizontalHeaderLabels(["DisplayName", "BrowseName", "NodeId"])
+
+    def clear(self):
+        super().clear()
+        self._fetched = set()
+
+    def set_root(self, nodeid=ROOT):
+        desc = self.snapshot.description(nodeid)
+        if desc is not None:
+            self.add_item(desc, node=nodeid)
+
+    def canFetchMore(self, idx):
+        item = self.itemFromIndex(idx)
+        if not item:
+            return False
+        nodeid = item.data(Qt.UserRole)
+        if nodeid in self._fetched:
+            return False
+        self._fetched.add(nodeid)
+        return True
+
+    def _fetchMore(self, parent):
+        added = set()
+        for desc in self.snapshot.children(parent.data(Qt.UserRole)) or []:
+            nodeid = desc.NodeId.to_string()
+            if nodeid not in added:
+                self.add_item(desc, parent, node=nodeid)
+                added.add(nodeid)
+
+
+class SnapshotWidget(QWidget):
+    """
+    browse and search the Snapshot in path, without connection to its server
+    """
+
+    def __init__(self, path, parent=None):
+        super().__init__(parent, Qt.Window)
+        self.setAttribute(Qt.WA_DeleteOnClose)
+        self.snapshot = Snapshot(path)
+        url = self.snapshot.read_meta("url") or path
+        crawled = self.snapshot.read_meta("crawled") or "partial"
+        self.setWindowTitle(f"Snapshot of {url} ({crawled})")
+
+        self.searchLineEdit = QLineEdit(self)
+        self.searchLineEdit.setPlaceholderText("Search names or NodeId")
+        self.searchLineEdit.setClearButtonEnabled(True)
+        self.searchLineEdit.textChanged.connect(self.search)
+        self.resultsView = QListWidget(self)
+        self.resultsView.currentItemChanged.connect(self._result_selected)
+        self.resultsView.hide()
+        self.model = SnapshotModel(self.snapshot)
+        self.treeView = QTreeView(self)
+        self.treeView.setModel(self.model)
+        self.treeView.setUniformRowHeights(True)
+        self.treeView.selectionModel().currentChanged.connect(self._show_attrs)
+        self.attrView = QTreeWidget(self)
+        self.attrView.setHeaderLabels(["Attribute", "Value"])
+        self.attrView.setRootIsDecorated(False)
+
+        browse = QSplitter(Qt.Vertical)
+        browse.addWidget(self.resultsView)
+        browse.addWidget(self.treeView)
+        splitter = QSplitter(Qt.Horizontal)
+        splitter.addWidget(browse)
+        splitter.addWidget(self.attrView)
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.searchLineEdit)
+        layout.addWidget(splitter)
+        self.resize(900, 600)
+
+        self.model.set_root()
+        self.treeView.expand(self.model.index(0, 0))
+
+    def search(self, text):
+        """
+        list the nodes matching text, selecting one shows it in the tree
+        """
+        self.resultsView.clear()
+        text = text.strip()
+        if len(text) < 2:
+            self.resultsView.hide()
+            return
+        for nodeid, dname, bname, node_class in self.snapshot.search(text):
+            item = QListWidgetItem(f"{dname}    {nodeid}")
+            item.setData(Qt.UserRole, nodeid)
+            item.setToolTip(f"{bname} ({node_class.name})")
+            self.resultsView.addItem(item)
+        self.resultsView.show()
+
+    def _result_selected(self, item):
+        if item is not None:
+            self.show_node(item.data(Qt.UserRole))
+
+    def show_node(self, nodeid):
+        """
+        expand the tree down to nodeid and make it current
+        """
+        path = self.snapshot.get_path(nodeid)
+        if not path:
+            return False
+        idx = self.model.index(0, 0)
+        for child in path[1:]:
+            if self.model.canFetchMore(idx):
+                self.model.fetchMore(idx)
+            self.treeView.expand(idx)
+            matches = [
+                self.model.index(row, 0, idx)
+                for row in range(self.model.rowCount(idx))
+                if self.model.index(row, 0, idx).data(Qt.UserRole) == child
+            ]
+            if not matches:
+                return False
+            idx = matches[0]
+        self.treeView.setCurrentIndex(idx)
+        self.treeView.scrollTo(idx)
+        return True
+
+    def get_current_nodeid(self):
+        idx = self.treeView.currentIndex()
+        return idx.sibling(idx.row(), 0).data(Qt.UserRole)
+
+    def _show_attrs(self, current):
+        self.attrView.clear()
+        nodeid = current.sibling(current.row(), 0).data(Qt.UserRole)
+        attrs = self.snapshot.node(nodeid) if nodeid else None
+        for name, value in (attrs or {}).items():
+            self.attrView.addTopLevelItem(QTreeWidgetItem([name, str(value)]))
+        self.attrView.resizeColumnToContents(0)
+
+    def closeEvent(self, event):
+        self.snapshot.close()
+        event.accept()
@@ -0,0 +1,205 @@
+from array import array
+import time
+from datetime import datetime, timezone
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+from asyncua import ua
+
+from uaclient.value_formatter import ValueFormatter
+
+
+_NO_DATA = object()
+
+
+class SubscriptionModel(QAbstractTableModel):
+    """
+    Table of subscribed nodes stored as one compact array per column.
+    Values are kept as received and only turned into text when the view
+    asks for a visible cell
+    """
+
+    headers = ["DisplayName", "Value", "Timestamp"]
+
+    def __init__(self, formatter=None, parent=None):
+        QAbstractTableModel.__init__(self, parent)
+        self.formatter = formatter if formatter is not None else ValueFormatter()
+        self._reset()
+
+    def _reset(self):
+        self._rows = {}  # NodeId -> row, so updates do not scan the model
+        self._nodes = []
+        self._names = []
+        self._values = []  # Variant as received
+        self._data_types = []  # DataType NodeId of the node, None until read
+        self._texts = []  # formatted value, None until a view asks for it
+        self._timestamps = array("d")  # POSIX seconds, NaN until first value
+        self._statuses = array("L")
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._nodes)
+
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self.headers)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.headers[section]
+        return None
+
+    def flags(self, idx):
+        if not idx.isValid():
+            return Qt.ItemIsDropEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def mimeTypes(self):
+        return ["text/plain"]
+
+    def supportedDropActions(self):
+        return Qt.CopyAction | Qt.MoveAction
+
+    def data(self, idx, role=Qt.DisplayRole):
+        if not idx.isValid():
+            return None
+        row, column = idx.row(), idx.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return self._names[row]
+            if column == 1:
+                return self._value_text(row)
+            if column == 2:
+                ts = self._timestamps[row]
+                if ts != ts:  # NaN
+                    return ""
+                return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+        elif role == Qt.ToolTipRole and column == 1:
+            if self._values[row] is not _NO_DATA:
+                return ua.StatusCode(self._statuses[row]).name
+        elif role == Qt.UserRole and column == 0:
+            return self._nodes[row]
+        return None
+
+    def _value_text(self, row):
+        text = self._texts[row]
+        if text is None:
+            value = self._values[row]
+            if value is _NO_DATA:
+                return "No Data yet"
+            text = self._texts[row] = self.formatter.format(
+                value, self._data_types[row]
+            )
+        return text
+
+    def __contains__(self, node):
+        return node.nodeid in self._rows
+
+    def node(self, row):
+        return self._nodes[row]
+
+    def row_of(self, node):
+        return self._rows.get(node.nodeid)
+
+    def _columns(self):
+        return (
+            self._nodes,
+            self._names,
+            self._values,
+            self._data_types,
+            self._texts,
+            self._timestamps,
+            self._statuses,
+        )
+
+    def add_node(self, node, name):
+        self.add_nodes([node], [name])
+
+    def add_nodes(self, nodes, names):
+        first = len(self._nodes)
+        self.beginInsertRows(QModelIndex(), first, first + len(nodes) - 1)
+        for row, node in enumerate(nodes, start=first):
+            self._rows[node.nodeid] = row
+        self._nodes.extend(nodes)
+        self._names.extend(names)
+        self._values.extend([_NO_DATA] * len(nodes))
+        self._data_types.extend([None] * len(nodes))
+        self._texts.extend([None] * len(nodes))
+        self._timestamps.extend([float("nan")] * len(nodes))
+        self._statuses.extend([0] * len(nodes))
+        self.endInsertRows()
+
+    def remove_node(self, node):
+        self.remove_nodes([node])
+
+    def remove_nodes(self, nodes):
+        rows = sorted(
+            {self._rows[node.nodeid] for node in nodes if node.nodeid in self._rows}
+        )
+        if not rows:
+            return
+        # remove runs of consecutive rows, from the bottom up
+        while rows:
+            last = first = rows.pop()
+            while rows and rows[-1] == first - 1:
+                first = rows.pop()
+            end = last + 1
+            self.beginRemoveRows(QModelIndex(), first, last)
+            for column in self._columns():
+                del column[first:end]
+            self.endRemoveRows()
+        self._rows = {node.nodeid: row for row, node in enumerate(self._nodes)}
+
+    def set_name(self, node, name):
+        self.set_names([node], [name])
+
+    def set_names(self, nodes, names):
+        rows = []
+        for node, name in zip(nodes, names):
+            row = self._rows.get(node.nodeid)
+            if row is not None:
+                self._names[row] = name
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), 0), self.index(max(rows), 0), [Qt.DisplayRole]
+            )
+
+    def set_data_types(self, nodes, data_types):
+        """
+        DataType NodeIds of nodes, their values are formatted for it
+        """
+        rows = []
+        for node, data_type in zip(nodes, data_types):
+            row = self._rows.get(node.nodeid)
+            if row is not None:
+                self._data_types[row] = data_type
+                self._texts[row] = None
+                rows.append(row)
+        if rows:
+            self.dataChanged.emit(
+                self.index(min(rows), 1), self.index(max(rows), 1), [Qt.DisplayRole]
+            )
+
+    def update(self, node, datavalue):
+        row = self._rows.get(node.nodeid)
+        if row is None:  # notification arriving after unsubscribe
+            return
+        if datavalue.SourceTimestamp:
+            timestamp = datavalue.SourceTimestamp.timestamp()
+        elif datavalue.ServerTimestamp:
+            timestamp = datavalue.ServerTimestamp.timestamp()
+        else:
+            timestamp = time.time()
+        self._values[row] = datavalue.Value
+        self._texts[row] = None
+        self._timestamps[row] = timestamp
+        self._statuses[row] = datavalue.StatusCode.value
+        self.dataChanged.emit(self.index(row, 1), self.index(row, 2), [Qt.DisplayRole])
+
+    def clear(self):
+        self.beginResetModel()
+        self._reset()
+        self.endResetModel()
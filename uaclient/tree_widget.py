@@ -0,0 +1,640 @@
+import logging
+from functools import partial
+
+from PyQt5.QtCore import (
+    pyqtSignal,
+    QMimeData,
+    QModelIndex,
+    QObject,
+    QPersistentModelIndex,
+    Qt,
+    QSettings,
+    QTimer,
+)
+from PyQt5.QtGui import QStandardItem
+from PyQt5.QtWidgets import QAbstractItemView, QAction, QApplication
+
+from asyncua import ua
+
+from uawidgets import tree_widget
+
+
+logger = logging.getLogger(__name__)
+
+# NodeClass of the item, from the ReferenceDescription it was made of
+NodeClassRole = Qt.ItemDataRole.UserRole + 1
+# set on the row standing for the pages of children not fetched yet
+MorePagesRole = Qt.ItemDataRole.UserRole + 2
+# held in place of a continuation point given back to the server, the
+# next page is browsed again from the first child
+REBROWSE = object()
+
+
+class TreeWidget(tree_widget.TreeWidget):
+    """
+    TreeWidget from uawidgets browsing the address space in the background
+    """
+
+    def __init__(self, view, uaclient):
+        QObject.__init__(self, view)
+        self.view = view
+        self.uaclient = uaclient
+        self.model = TreeViewModel(uaclient)
+        self.model.clear()
+        self.model.error.connect(self.error)
+        self.model.children_fetched.connect(self._continue_expand)
+        self.view.setModel(self.model)
+
+        self.model.setHorizontalHeaderLabels(["DisplayName", "BrowseName", "NodeId"])
+        self.view.header().setSectionResizeMode(0)
+        self.view.header().setStretchLastSection(True)
+        self.view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.view.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.settings = QSettings()
+        state = self.settings.value("tree_widget_state", None)
+        if state is not None:
+            self.view.header().restoreState(state)
+
+        self.actionReload = QAction("Reload", self)
+        self.actionReload.triggered.connect(self.reload_current)
+        self.actionExpandAll = QAction("Expand All", self)
+        self.actionExpandAll.triggered.connect(self.expand_all_current)
+        self.expand_all_limit = 2000  # nodes shown by one Expand All
+
+        self._expand_path = []  # nodeids still to expand by expand_to_node
+        self._expand_parent = QPersistentModelIndex()
+        self._expanding = False
+
+        # large folders are browsed a page at a time, the next page once
+        # their "Load more..." row is scrolled into view or activated
+        self.model.page_size = int(self.settings.value("tree_page_size", 1000))
+        self._page_timer = QTimer(self)
+        self._page_timer.setSingleShot(True)
+        self._page_timer.setInterval(50)
+        self._page_timer.timeout.connect(self._fetch_visible_pages)
+        self.view.verticalScrollBar().valueChanged.connect(self._page_timer.start)
+        self.view.expanded.connect(self._page_timer.start)
+        self.model.children_fetched.connect(self._page_timer.start)
+        self.view.activated.connect(self._fetch_page_of_row)
+
+    def clear(self):
+        self._expand_path = []
+        self.model.clear()
+
+    def set_root_node(self, node, children=None, desc=None):
+        """
+        show node as root of the tree, children are {nodeid: descriptions}
+        browsed beforehand, see TreeViewModel.prefetch, desc the
+        ReferenceDescription of node if read beforehand
+        """
+        self.model.clear()
+        self.model.prefetch(children or {})
+        self.model.set_root_node(node, desc)
+        self.view.expandToDepth(0)
+
+    def expand_to_node(self, node):
+        """
+        Expand tree until given node and select it.
+        Returns immediately, levels not browsed yet are expanded as
+        soon as their children arrive
+        """
+        if isinstance(node, str):
+            idxlist = self.model.match(
+                self.model.index(0, 0),
+                Qt.DisplayRole,
+                node,
+                1,
+                Qt.MatchExactly | Qt.MatchRecursive,
+            )
+            if not idxlist:
+                raise ValueError(f"Node {node} not found in tree")
+            node = self.model.data(idxlist[0], Qt.UserRole)
+        self.uaclient.submit(
+            self.uaclient.get_path_async(node),
+            callback=lambda path: self.expand_to_path([node.nodeid for node in path]),
+            errback=self.error.emit,
+        )
+
+    def expand_to_path(self, nodeids):
+        """
+        expand tree along nodeids, starting from the root node, and select
+        the last one. Like expand_to_node without reading the path first
+        """
+        self._expand_path = list(nodeids)
+        self._expand_parent = QPersistentModelIndex()
+        self._continue_expand()
+
+    def expand_all_current(self):
+        """
+        expand the subtree of the current node level by level, each level
+        browsed with one bulk Browse, until expand_all_limit nodes are shown
+        """
+        idx = self.view.currentIndex()
+        idx = idx.sibling(idx.row(), 0)
+        if idx.isValid():
+            self._expand_all([QPersistentModelIndex(idx)], self.expand_all_limit)
+
+    def _expand_all(self, level, budget):
+        nodes = [
+            pidx.data(Qt.UserRole)
+            for pidx in level
+            if pidx.isValid()
+            and pidx.data(Qt.UserRole) is not None
+            and pidx.data(Qt.UserRole) not in self.model._fetched
+        ]
+        self.uaclient.submit(
+            self.uaclient.get_children_list_async(nodes),
+            callback=partial(self._expand_level, level, budget),
+            errback=self.error.emit,
+        )
+
+    def _expand_level(self, level, budget, children):
+        self.model.prefetch(children)
+        next_level = []
+        for pidx in level:
+            if not pidx.isValid():  # model was cleared meanwhile
+                continue
+            idx = QModelIndex(pidx)
+            if self.model.canFetchMore(idx):
+                self.model.fetchMore(idx)
+            self.view.expand(idx)
+            rows = self.model.rowCount(idx)
+            next_level.extend(
+                QPersistentModelIndex(self.model.index(row, 0, idx))
+                for row in range(rows)
+            )
+            budget -= rows
+        if next_level and budget > 0:
+            self._expand_all(next_level, budget)
+
+    def model_changed(self, change):
+        """
+        bring the tree in line with a ModelChange: rows of deleted nodes are
+        removed, browsed nodes whose references changed are browsed again
+        keeping the rows, and what is expanded below them, that still exist
+        """
+        deleted = []
+        stale = []
+        paged = []
+        for item in self._items():
+            node = item.data(Qt.UserRole)
+            if node.nodeid in change.deleted and item.parent() is not None:
+                deleted.append(QPersistentModelIndex(item.index()))
+            elif change.everything or node.nodeid in change.references:
+                self.model._prefetched.pop(node.nodeid, None)
+                if node not in self.model._fetched or node in self.model._fetching:
+                    continue
+                if self.model.is_paged(node):
+                    # browsing all children again is what paging avoids
+                    paged.append(QPersistentModelIndex(item.index()))
+                else:
+                    stale.append(QPersistentModelIndex(item.index()))
+        for pidx in deleted:
+            if pidx.isValid():
+                self.model.forget_subtree(self.model.itemFromIndex(QModelIndex(pidx)))
+                self.model.removeRow(pidx.row(), pidx.parent())
+        for pidx in paged:
+            if pidx.isValid():
+                self._reload_paged(QModelIndex(pidx))
+        if stale:
+            self.uaclient.submit(
+                self.uaclient.get_children_list_async(
+                    [pidx.data(Qt.UserRole) for pidx in stale]
+                ),
+                callback=partial(self._update_stale, stale),
+                errback=self.error.emit,
+            )
+
+    def reload(self, item=None):
+        # uawidgets forgets the children only, not the nodes below them
+        if item is None:
+            item = self.model.item(0, 0)
+        self.model.forget_subtree(item)
+        super().reload(item)
+
+    def _reload_paged(self, idx):
+        # start again from the first page
+        self.reload(self.model.itemFromIndex(idx))
+        if self.view.isExpanded(idx) and self.model.canFetchMore(idx):
+            self.model.fetchMore(idx)
+
+    def _fetch_visible_pages(self):
+        viewport = self.view.viewport().rect()
+        idx = self.view.indexAt(viewport.topLeft())
+        while idx.isValid() and self.view.visualRect(idx).top() <= viewport.bottom():
+            if idx.data(MorePagesRole):
+                self.model.fetch_next_page(idx.parent())
+            idx = self.view.indexBelow(idx)
+
+    def _fetch_page_of_row(self, idx):
+        if idx.sibling(idx.row(), 0).data(MorePagesRole):
+            self.model.fetch_next_page(idx.parent())
+
+    def get_current_node(self, idx=None):
+        if idx is None:
+            idx = self.view.currentIndex()
+        if idx.sibling(idx.row(), 0).data(MorePagesRole):
+            return None
+        return super().get_current_node(idx)
+
+    def _update_stale(self, stale, children):
+        for pidx in stale:
+            if pidx.isValid():
+                descs = children.get(pidx.data(Qt.UserRole).nodeid)
+                if descs is not None:
+                    self.model.update_children(pidx, descs)
+
+    def _items(self, parent=None):
+        # first column items of the tree, depth first
+        if parent is None:
+            parent = self.model.invisibleRootItem()
+        for row in range(parent.rowCount()):
+            item = parent.child(row, 0)
+            if item is not None and item.data(Qt.UserRole) is not None:
+                yield item
+                yield from self._items(item)
+
+    def get_current_node_path(self):
+        """
+        nodeids from the root node to the current node, as shown in the tree
+        """
+        idx = self.view.currentIndex()
+        idx = idx.sibling(idx.row(), 0)
+        path = []
+        while idx.isValid():
+            path.insert(0, idx.data(Qt.UserRole).nodeid)
+            idx = idx.parent()
+        return path
+
+    def copy_path(self):
+        # the BrowseNames are read in the background, then copied
+        idx = self.view.currentIndex()
+        idx = idx.sibling(idx.row(), 0)
+        nodes = []
+        while idx.isValid() and idx.data(Qt.UserRole):
+            nodes.insert(0, idx.data(Qt.UserRole))
+            idx = idx.parent()
+        if nodes:
+            self.uaclient.submit(
+                self.uaclient.read_attributes_async(nodes, ua.AttributeIds.BrowseName),
+                callback=self._copy_browse_names,
+                errback=self.error.emit,
+            )
+
+    def _copy_browse_names(self, dvs):
+        for dv in dvs:
+            if not dv.StatusCode.is_good():
+                self.error.emit(ua.UaStatusCodeError(dv.StatusCode.value))
+                return
+        path = [dv.Value.Value.to_string() for dv in dvs]
+        QApplication.clipboard().setText(",".join(path))
+
+    def _continue_expand(self, *args):
+        if self._expanding:
+            return  # prefetched children arrived within the loop below
+        self._expanding = True
+        try:
+            while self._expand_path:
+                parent = QModelIndex(self._expand_parent)
+                if parent.isValid() and self.model.is_fetching(parent):
+                    return  # resumed by children_fetched
+                idx = self._find_child(parent, self._expand_path[0])
+                if idx is None:
+                    if parent.isValid() and self.model.canFetchMore(parent):
+                        self.model.fetchMore(parent)
+                        continue
+                    if parent.isValid() and self.model.has_more_pages(parent):
+                        self.model.fetch_next_page(parent)
+                        continue
+                    logger.info(
+                        "While expanding tree, could not find node %s in tree view, this might be OK",
+                        self._expand_path[0],
+                    )
+                    self._expand_path = []
+                    return
+                self._expand_path.pop(0)
+                self.view.setExpanded(idx, True)
+                self.view.setCurrentIndex(idx)
+                self.view.activated.emit(idx)
+                self._expand_parent = QPersistentModelIndex(idx)
+        finally:
+            self._expanding = False
+
+    def get_node_class(self, idx=None):
+        """
+        NodeClass of the current node, or of the node at idx, as browsed
+        """
+        if idx is None:
+            idx = self.view.currentIndex()
+        idx = idx.sibling(idx.row(), 0)
+        return idx.data(NodeClassRole) if idx.isValid() else None
+
+    def get_selected_nodes(self):
+        """
+        nodes of all selected rows, the current node if nothing is selected
+        """
+        nodes = [
+            idx.data(Qt.UserRole)
+            for idx in self.view.selectionModel().selectedRows(0)
+            if idx.data(Qt.UserRole) is not None
+        ]
+        if not nodes:
+            node = self.get_current_node()
+            if node is not None:
+                nodes.append(node)
+        return nodes
+
+    def _find_child(self, parent, nodeid):
+        for row in range(self.model.rowCount(parent)):
+            idx = self.model.index(row, 0, parent)
+            node = idx.data(Qt.UserRole)
+            if node is not None and node.nodeid == nodeid:
+                return idx
+        return None
+
+
+class TreeViewModel(tree_widget.TreeViewModel):
+    """
+    fetchMore returns immediately, children are browsed by the
+    asyncio loop of UaClient and added when they arrive.
+    Children read beforehand with prefetch() are added at once.
+    Children of nodes with more than page_size of them are added a page at
+    a time, in the order of the server, behind a "Load more..." row.
+    At most max_held_pages continuation points are held, older ones are
+    released and their nodes browsed again when more rows are needed
+    """
+
+    children_fetched = pyqtSignal(QModelIndex)
+
+    def __init__(self, uaclient):
+        super().__init__()
+        self.uaclient = uaclient
+        self.page_size = 1000  # children added at a time, 0 for all at once
+        self._fetched = set()  # a list in uawidgets, slow on large trees
+        self._fetching = set()  # nodes currently browsed
+        self._prefetched = {}  # nodeid -> children descriptions
+        self.max_held_pages = 8  # and half of the server's continuation points
+        self._pages = {}  # paged node -> continuation point, None once complete
+
+    def clear(self):
+        self._release_pages(list(self._pages))
+        super().clear()
+        self._fetched = set()
+        self._fetching = set()
+        self._prefetched = {}
+
+    def set_root_node(self, node, desc=None):
+        # uawidgets reads the description in the GUI thread
+        if desc is None:
+            super().set_root_node(node)
+        else:
+            self.add_item(desc, node=node)
+
+    def prefetch(self, children):
+        """
+        keep {nodeid: descriptions} from UaClient.get_children_list_async()
+        for the first fetchMore of these nodes
+        """
+        self._prefetched.update(children)
+
+    def canFetchMore(self, idx):
+        item = self.itemFromIndex(idx)
+        if not item:
+            return False
+        node = item.data(Qt.UserRole)
+        if node is None or node in self._fetched:
+            return False
+        self._fetched.add(node)
+        return True
+
+    def reset_cache(self, node):
+        # reloading a node asks the server again
+        self._fetched.discard(node)
+        self._prefetched.pop(node.nodeid, None)
+        self._release_pages([node])
+        self.uaclient.browse_cache.invalidate(node.nodeid)
+
+    def is_paged(self, node):
+        return node in self._pages
+
+    def has_more_pages(self, idx):
+        item = self.itemFromIndex(idx)
+        return item is not None and self._pages.get(item.data(Qt.UserRole)) is not None
+
+    def fetch_next_page(self, idx):
+        """
+        add the next page of children of the paged node at idx
+        """
+        item = self.itemFromIndex(idx)
+        if item is None:
+            return
+        node = item.data(Qt.UserRole)
+        point = self._pages.get(node)
+        if point is None or node in self._fetching:
+            return
+        self._pages[node] = None  # in use, the reply brings the next one
+        self._fetching.add(node)
+        pidx = QPersistentModelIndex(self.indexFromItem(item))
+        if point is REBROWSE:
+            # in the order of the server like the rows shown, which are
+            # skipped by NodeId since the server may have reordered them
+            shown = item.rowCount() - 1
+            self.uaclient.submit(
+                self.uaclient.browse_page_async(
+                    node, shown + self.page_size, cache=False
+                ),
+                callback=partial(self._add_page, pidx, node),
+                errback=partial(self._page_failed, pidx, node),
+            )
+            return
+        self.uaclient.submit(
+            self.uaclient.browse_next_page_async(point),
+            callback=partial(self._add_page, pidx, node),
+            errback=partial(self._page_failed, pidx, node),
+        )
+
+    def forget_subtree(self, item):
+        """
+        forget the children fetched for item and the nodes shown below it
+        and release their continuation points, before their rows are removed
+        """
+        nodes = []
+        items = [item]
+        while items:
+            item = items.pop()
+            node = item.data(Qt.UserRole)
+            if node is not None:
+                nodes.append(node)
+                items.extend(item.child(row, 0) for row in range(item.rowCount()))
+        self._fetched.difference_update(nodes)
+        self._release_pages(nodes)
+
+    def _release_pages(self, nodes):
+        points = [self._pages.pop(node) for node in nodes if node in self._pages]
+        self._release_points(points)
+
+    def _release_points(self, points):
+        points = [point for point in points if isinstance(point, bytes)]
+        if points:
+            self.uaclient.submit(
+                self.uaclient.release_continuation_points_async(points)
+            )
+
+    def _release_oldest_pages(self):
+        limit = self.max_held_pages
+        points = self.uaclient.capabilities.max_browse_continuation_points
+        if points:
+            limit = min(limit, max(1, points // 2))
+        held = [node for node, point in self._pages.items() if isinstance(point, bytes)]
+        oldest = held[: max(0, len(held) - limit)]
+        self._release_points([self._pages[node] for node in oldest])
+        for node in oldest:
+            self._pages[node] = REBROWSE
+
+    def is_fetching(self, idx):
+        item = self.itemFromIndex(idx)
+        return item is not None and item.data(Qt.UserRole) in self._fetching
+
+    def hasChildren(self, idx):
+        # keep the expand arrow while children are on their way
+        if self.is_fetching(idx):
+            return True
+        if idx.data(MorePagesRole):
+            return False
+        return super().hasChildren(idx)
+
+    def _fetchMore(self, parent):
+        node = parent.data(Qt.UserRole)
+        self._fetching.add(node)
+        pidx = QPersistentModelIndex(self.indexFromItem(parent))
+        descs = self._prefetched.pop(node.nodeid, None)
+        if descs is not None:
+            self._add_children(pidx, node, descs)
+            return
+        if self.page_size:
+            self.uaclient.submit(
+                self.uaclient.browse_page_async(node, self.page_size),
+                callback=partial(self._add_page, pidx, node),
+                errback=partial(self._fetch_failed, node),
+            )
+            return
+        self.uaclient.submit(
+            self.uaclient.get_children_async(node),
+            callback=partial(self._add_children, pidx, node),
+            errback=partial(self._fetch_failed, node),
+        )
+
+    def _add_children(self, pidx, node, descs):
+        self._fetching.discard(node)
+        if not pidx.isValid():  # model was cleared meanwhile
+            return
+        self._add_rows(self.itemFromIndex(QModelIndex(pidx)), descs)
+        self.children_fetched.emit(QModelIndex(pidx))
+
+    def _add_rows(self, parent, descs):
+        added = set()
+        for desc in descs:
+            if desc.NodeId not in added:
+                self.add_item(desc, parent)
+                added.add(desc.NodeId)
+
+    def _add_page(self, pidx, node, page):
+        descs, point = page
+        self._fetching.discard(node)
+        if not pidx.isValid():  # model was cleared meanwhile
+            self._release_points([point])
+            return
+        parent = self.itemFromIndex(QModelIndex(pidx))
+        self._remove_more_row(parent)
+        if point is None and node not in self._pages:
+            # all children in one page, shown sorted as without paging.
+            # Pages are never sorted, rows would move as pages arrive
+            descs = sorted(descs, key=lambda desc: desc.BrowseName)
+        # the server may list a node again, e.g. after reordering its
+        # references between pages or before browsing again
+        shown = {
+            parent.child(row, 0).data(Qt.UserRole).nodeid
+            for row in range(parent.rowCount())
+        }
+        descs = [desc for desc in descs if desc.NodeId not in shown]
+        self._add_rows(parent, descs)
+        if point is not None or node in self._pages:
+            # the most recent last, the oldest are released first
+            self._pages.pop(node, None)
+            self._pages[node] = point
+            self._release_oldest_pages()
+        if point is not None:
+            more = QStandardItem("Load more...")
+            more.setData(True, MorePagesRole)
+            more.setToolTip(f"{parent.rowCount()} children shown")
+            parent.appendRow([more, QStandardItem(), QStandardItem()])
+        self.children_fetched.emit(QModelIndex(pidx))
+
+    def _page_failed(self, pidx, node, ex):
+        self._fetching.discard(node)
+        if not pidx.isValid():
+            return
+        # the continuation point is gone, the "Load more..." row stays and
+        # browses again
+        self._pages[node] = REBROWSE
+        invalid = ua.StatusCodes.BadContinuationPointInvalid
+        if isinstance(ex, ua.UaStatusCodeError) and ex.code == invalid:
+            logger.info("Continuation point of %s expired, browsing again", node)
+            self.fetch_next_page(QModelIndex(pidx))
+            return
+        logger.warning("Browsing next children of %s failed: %r", node, ex)
+        self.error.emit(ex)
+
+    def _remove_more_row(self, parent):
+        last = parent.rowCount() - 1
+        if last >= 0 and parent.child(last, 0).data(MorePagesRole):
+            parent.removeRow(last)
+
+    def add_item(self, desc, parent=None, node=None):
+        super().add_item(desc, parent, node)
+        if parent is None:
+            parent = self.invisibleRootItem()
+        parent.child(parent.rowCount() - 1, 0).setData(desc.NodeClass, NodeClassRole)
+
+    def update_children(self, pidx, descs):
+        """
+        show descs as the children of an item already fetched: rows of
+        nodes no longer there are removed, new nodes inserted in order
+        """
+        parent = self.itemFromIndex(QModelIndex(pidx))
+        wanted = {desc.NodeId for desc in descs}
+        shown = set()
+        for row in reversed(range(parent.rowCount())):
+            node = parent.child(row, 0).data(Qt.UserRole)
+            if node.nodeid in wanted and node.nodeid not in shown:
+                shown.add(node.nodeid)
+            else:
+                self.forget_subtree(parent.child(row, 0))
+                parent.removeRow(row)
+        row = 0
+        placed = set()
+        for desc in descs:
+            if desc.NodeId in placed:
+                continue
+            placed.add(desc.NodeId)
+            if desc.NodeId not in shown:
+                self.add_item(desc, parent)
+                parent.insertRow(row, parent.takeRow(parent.rowCount() - 1))
+            row += 1
+
+    def mimeData(self, idxs):
+        # one NodeId per line, since string NodeIds may contain commas
+        mdata = QMimeData()
+        nodes = []
+        for idx in idxs:
+            node = idx.data(Qt.UserRole) if idx.column() == 0 else None
+            if node is not None:
+                nodes.append(node.nodeid.to_string())
+        mdata.setText("\n".join(nodes))
+        return mdata
+
+    def _fetch_failed(self, node, ex):
+        self._fetching.discard(node)
+        self.reset_cache(node)
+        logger.warning("Browsing %s failed: %r", node, ex)
+        self.error.emit(ex)
@@ -1,11 +1,31 @@
+from array import array
+import asyncio
 import logging
+import math
+import os
+import time
+from urllib.parse import urlparse
 
-from PyQt5.QtCore import QSettings
+from PyQt5.QtCore import QSettings, QStandardPaths
 
-from asyncua import ua
-from asyncua.sync import Client, SyncNode
+from asyncua import ua, Node
+from asyncua import Client as AsyncClient
+from asyncua.sync import Client, SyncNode, Subscription
 from asyncua import crypto
 from asyncua.tools import endpoint_to_strings
+from asyncua.common.events import get_filter_from_event_type
+
+from uaclient.asyncloop import AsyncLoop
+from uaclient.browse_cache import BrowseCache, CHILDREN, PARENTS, REFERENCES
+from uaclient.data_types import (
+    DataTypeCache,
+    is_registered,
+    load_data_types,
+    read_model_key,
+    register_data_types,
+)
+from uaclient.model_change import ModelChange
+from uaclient.server_capabilities import ServerCapabilities
 
 
 logger = logging.getLogger(__name__)
@@ -20,12 +40,46 @@ class UaClient(object):
     def __init__(self):
         self.settings = QSettings()
         self.application_uri = "urn:key-technology:opc-explorer"
+        self.max_items_per_call = 1000  # nodes per call when the server sets no limit
+        self.max_concurrent_requests = 4  # chunks of a bulk operation in flight
+        self.history_page_size = 10000  # values per node per HistoryRead
+        self.max_references_per_browse = 1000  # per node, then BrowseNext
+        self.browse_cache = BrowseCache()
+        self.capabilities = ServerCapabilities()
+        self.root_description = None  # of the RootFolder, read when connecting
+        # custom data types of servers, None to read them on every connect
+        self.type_cache = DataTypeCache(
+            os.path.join(
+                QStandardPaths.writableLocation(QStandardPaths.CacheLocation),
+                "data_types",
+            )
+        )
+        # only read data types when a node needs them, unless cached
+        self.lazy_data_types = False
+        self.data_types_loaded = False
+        self.connect_timings = {}  # stage -> seconds of the last connect
+        self.endpoints_ttl = 300  # seconds endpoints of a server are reused
+        self.endpoints_timeout = 2  # seconds to wait for GetEndpoints
+        self.max_concurrent_probes = 8  # servers asked at a time by probing
+        self.prewarm_ttl = 60  # seconds a prewarmed secure channel is used
+        self._endpoints = {}  # uri -> (expiry, endpoints)
+        self._warm = None  # (uri, security, expiry, client) of prewarm_async
+        self._warm_lock = None
+        self._model_key = None  # (uri, model key) of the data types loaded
+        self.loop = AsyncLoop()
         self.client = None
+        self._username = None  # credentials of the uri connected to
+        self._password = None
         self._connected = False
+        self._page_points = set()  # continuation points of pages held by callers
         self._datachange_sub = None
         self._event_sub = None
+        self._graph_sub = None
+        self._model_sub = None
+        self._sub_lock = None
         self._subs_dc = {}
         self._subs_ev = {}
+        self._subs_graph = {}
         self.security_mode = None
         self.security_policy = None
         self.user_certificate_path = None
@@ -36,38 +90,98 @@ class UaClient(object):
 
     def _reset(self):
         self.client = None
+        self._username = None
+        self._password = None
+        self.browse_cache.clear()
+        self.capabilities = ServerCapabilities()
+        self.root_description = None
+        self.data_types_loaded = False
+        self._model_key = None
+        self._page_points = set()
         self._connected = False
         self._datachange_sub = None
         self._event_sub = None
+        self._graph_sub = None
+        self._model_sub = None
+        self._sub_lock = None
         self._subs_dc = {}
         self._subs_ev = {}
+        self._subs_graph = {}
+
+    def get_endpoints(self, uri):
+        return self.loop.run(self.get_endpoints_async(uri))
 
-    @staticmethod
-    def get_endpoints(uri):
-        client = Client(uri, timeout=2)
-        edps = client.connect_and_get_server_endpoints()
-        for i, ep in enumerate(edps, start=1):
+    async def get_endpoints_async(self, uri):
+        """
+        endpoints of the server at uri, asked again after endpoints_ttl seconds
+        """
+        expiry, endpoints = self._endpoints.get(uri, (0, None))
+        if time.monotonic() < expiry:
+            return endpoints
+        return await self._read_endpoints(uri)
+
+    async def _read_endpoints(self, uri):
+        client = AsyncClient(uri, timeout=self.endpoints_timeout)
+        endpoints = await client.connect_and_get_server_endpoints()
+        self._endpoints[uri] = (time.monotonic() + self.endpoints_ttl, endpoints)
+        for i, ep in enumerate(endpoints, start=1):
             logger.info("Endpoint %s:", i)
             for n, v in endpoint_to_strings(ep):
                 logger.info("  %s: %s", n, v)
             logger.info("")
-        return edps
+        return endpoints
+
+    async def probe_endpoints_async(self, uris, progress=None):
+        """
+        ask every uri for its endpoints, max_concurrent_probes at a time,
+        to learn which servers are up and how fast they answer. The
+        endpoints cache is refreshed on the way. progress(uri, seconds, ex)
+        is called in the loop thread as soon as a server answered or failed.
+        return {uri: (seconds, exception)}, exception being None on success
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrent_probes)
+        results = {}
+
+        async def probe(uri):
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await self._read_endpoints(uri)
+                    ex = None
+                except Exception as e:
+                    ex = e
+                results[uri] = (time.perf_counter() - started, ex)
+            if progress is not None:
+                progress(uri, *results[uri])
+
+        await asyncio.gather(*(probe(uri) for uri in dict.fromkeys(uris)))
+        return results
 
     def load_security_settings(self, uri):
-        self.security_mode = None
-        self.security_policy = None
-        self.user_certificate_path = None
-        self.user_private_key_path = None
+        (
+            self.security_mode,
+            self.security_policy,
+            self.user_certificate_path,
+            self.user_private_key_path,
+        ) = self.saved_security(uri)
 
+    def saved_security(self, uri):
+        """
+        saved (mode, policy, certificate, private key) of uri
+        """
         mysettings = self.settings.value("security_settings", None)
-        if mysettings is None:
-            return
-        if uri in mysettings:
-            mode, policy, cert, key = mysettings[uri]
-            self.security_mode = mode
-            self.security_policy = policy
-            self.user_certificate_path = cert
-            self.user_private_key_path = key
+        if mysettings is None or uri not in mysettings:
+            return None, None, None, None
+        return tuple(mysettings[uri])
+
+    @property
+    def security(self):
+        return (
+            self.security_mode,
+            self.security_policy,
+            self.user_certificate_path,
+            self.user_private_key_path,
+        )
 
     def save_security_settings(self, uri):
         mysettings = self.settings.value("security_settings", None)
@@ -99,11 +213,56 @@ class UaClient(object):
         mysettings["application_private_key"] = self.application_private_key_path
         self.settings.setValue("application_certificate_settings", mysettings)
 
+    @property
+    def connected(self):
+        return self._connected
+
     def get_node(self, nodeid):
         return self.client.get_node(nodeid)
 
+    def submit(self, coro, callback=None, errback=None):
+        """
+        run one of the coroutines below without blocking the GUI,
+        callback and errback are called in the GUI thread
+        """
+        return self.loop.submit(coro, callback, errback)
+
+    def progress(self, callback):
+        """
+        progress function for the coroutines below, callback is called
+        in the GUI thread
+        """
+        return self.loop.progress(callback)
+
+    def _aio_node(self, node):
+        if isinstance(node, SyncNode):
+            return node.aio_obj
+        if isinstance(node, Node):
+            return node
+        return self.client.aio_obj.get_node(node)
+
+    def _sync_node(self, node):
+        if isinstance(node, SyncNode):
+            return node
+        return SyncNode(self.loop.tloop, self._aio_node(node))
+
     def connect(self, uri):
-        self.disconnect()
+        self.loop.run(self.connect_async(uri))
+        self.save_security_settings(uri)
+
+    async def connect_async(self, uri, data_types=True, browse=()):
+        """
+        connect to uri. With data_types False, the caller is expected to
+        run load_data_types_async() itself, e.g. in the background.
+        The children of the nodes in browse are read together with the
+        server capabilities and root_description, return them like
+        get_children_list_async()
+        """
+        await self.disconnect_async()
+        url = urlparse(uri)
+        self._username, self._password = url.username, url.password
+        self.connect_timings = {}
+        started = time.perf_counter()
         logger.info(
             "Connecting to %s with parameters %s, %s, %s, %s",
             uri,
@@ -112,70 +271,519 @@ class UaClient(object):
             self.user_certificate_path,
             self.user_private_key_path,
         )
-        self.client = Client(uri)
-        self.client.application_uri = self.application_uri
-        self.client.description = "OPC Explorer GUI"
+        self.client = await self._take_warm(uri, self.security)
+        if self.client is not None:
+            try:
+                await self._timed("session", self._open_session())
+            except Exception as ex:
+                logger.info("Prewarmed channel to %s failed, reconnecting: %r", uri, ex)
+                self.client.aio_obj.disconnect_socket()
+                self.client = None
+        if self.client is None:
+            self.client = await self._new_client(uri, self.security)
+            await self._timed("session", self.client.aio_obj.connect())
+        client = self.client.aio_obj
+        self._connected = True
+        root = ua.NodeId(ua.ObjectIds.RootFolder)
+        self.capabilities, children, self.root_description = await asyncio.gather(
+            self._timed("capabilities", ServerCapabilities.read(client)),
+            self._timed("browse", self.get_children_list_async(browse)),
+            self.read_description_async(root),
+        )
+        if data_types:
+            await self.load_data_types_async(uri)
+        self.connect_timings["total"] = time.perf_counter() - started
+        logger.info("Connected to %s: %s", uri, format_timings(self.connect_timings))
+        return children
+
+    async def _new_client(self, uri, security):
+        """
+        Client of uri with the given (mode, policy, certificate, private key)
+        """
+        mode, policy, cert, key = security
+        # the sync client shares our loop thread so nodes handed to the
+        # widgets and the native client use the same connection
+        client = Client(uri, tloop=self.loop.tloop)
+        aio_client = client.aio_obj
+        aio_client.application_uri = self.application_uri
+        aio_client.description = "OPC Explorer GUI"
 
         # Set user identity token
-        if self.user_private_key_path:
-            self.client.load_private_key(self.user_private_key_path)
-        if self.user_certificate_path:
-            self.client.load_client_certificate(self.user_certificate_path)
-
-        # Set security mode and security policy
-        if self.security_mode is not None and self.security_policy is not None:
-            self.client.set_security(
-                getattr(
-                    crypto.security_policies, "SecurityPolicy" + self.security_policy
-                ),
+        if key:
+            await aio_client.load_private_key(key)
+        if cert:
+            await aio_client.load_client_certificate(cert)
+
+        # Set security mode and security policy, the server certificate
+        # comes from the endpoints, cached by prewarming
+        if mode is not None and policy is not None:
+            policy = getattr(crypto.security_policies, "SecurityPolicy" + policy)
+            mode = getattr(ua.MessageSecurityMode, mode)
+            endpoints = await self.get_endpoints_async(uri)
+            endpoint = AsyncClient.find_endpoint(endpoints, mode, policy.URI)
+            await aio_client.set_security(
+                policy,
                 self.application_certificate_path,
                 self.application_private_key_path,
-                mode=getattr(ua.MessageSecurityMode, self.security_mode),
+                server_certificate=_server_certificate(endpoint),
+                mode=mode,
             )
-        self.client.connect()
-        self._connected = True
-        self.client.load_data_type_definitions()
+        return client
+
+    def prewarm(self, uri, security=None):
+        self.loop.run(self.prewarm_async(uri, security))
+
+    async def prewarm_async(self, uri, security=None):
+        """
+        read the endpoints of uri and open a secure channel, so that
+        connecting to uri only has to create a session.
+        security defaults to the current settings, see saved_security()
+        """
+        if security is None:
+            security = self.security
+        async with self._prewarm_lock():
+            if self._connected and self.client.aio_obj.server_url.geturl() == uri:
+                return
+            if self._warm is not None:
+                if self._warm[:2] == (uri, security):
+                    return
+                await self._close_warm()
+            started = time.perf_counter()
+            await self.get_endpoints_async(uri)
+            client = await self._new_client(uri, security)
+            aio_client = client.aio_obj
+            await aio_client.connect_socket()
+            try:
+                await aio_client.send_hello()
+                await aio_client.open_secure_channel()
+            except BaseException:
+                aio_client.disconnect_socket()
+                raise
+            expiry = time.monotonic() + self.prewarm_ttl
+            self._warm = (uri, security, expiry, client)
+            logger.info(
+                "Prewarmed %s in %.0f ms", uri, (time.perf_counter() - started) * 1000
+            )
+
+    async def _take_warm(self, uri, security):
+        # the prewarmed client of uri if it is still fresh
+        async with self._prewarm_lock():
+            if self._warm is None:
+                return None
+            if self._warm[:2] == (uri, security) and time.monotonic() < self._warm[2]:
+                client, self._warm = self._warm[3], None
+                return client
+            await self._close_warm()
+            return None
+
+    async def _close_warm(self):
+        client, self._warm = self._warm[3].aio_obj, None
+        try:
+            await client.close_secure_channel()
+        except Exception as ex:
+            logger.info("Closing prewarmed channel failed: %r", ex)
+        finally:
+            client.disconnect_socket()
+
+    def _prewarm_lock(self):
+        # created lazily so it belongs to the loop running in our thread
+        if self._warm_lock is None:
+            self._warm_lock = asyncio.Lock()
+        return self._warm_lock
+
+    async def _open_session(self):
+        # second half of asyncua Client.connect(), on a prewarmed channel
+        client = self.client.aio_obj
+        await client.create_session()
+        try:
+            await client.activate_session(
+                username=self._username,
+                password=self._password,
+                certificate=client.user_certificate,
+            )
+        except Exception:
+            await client.close_session()
+            raise
+
+    async def _timed(self, stage, coro):
+        started = time.perf_counter()
+        try:
+            return await coro
+        finally:
+            self.connect_timings[stage] = time.perf_counter() - started
+
+    async def load_data_types_async(self, uri, progress=None):
+        """
+        generate classes for the custom data types of the server, from
+        type_cache if the server model did not change since last time.
+        In lazy mode types which are not cached are left to
+        load_node_data_types_async(). progress(text) is called in the
+        loop thread as loading goes on, cancelling is safe at any point
+        """
+        await self._timed("data types", self._load_data_types(uri, progress))
+        logger.info(
+            "Data types of %s loaded in %.0f ms",
+            uri,
+            self.connect_timings["data types"] * 1000,
+        )
+
+    async def _load_data_types(self, uri, progress):
+        key = await read_model_key(self, uri)
+        self._model_key = (uri, key)
+        cached = self.type_cache.load(uri, key) if self.type_cache else None
+        if cached is None:
+            if self.lazy_data_types:
+                logger.info("Data types of %s are read when needed", uri)
+                return
+            types = await self._read_data_types(progress)
+            dictionaries = True  # unknown until loaded below
+        else:
+            types, dictionaries = cached
+            if progress is not None:
+                progress(f"Generating {len(types)} data types")
+            new = await register_data_types(types)
+            self.data_types_loaded = True
+            logger.info("%s cached data types, %s new ones", len(types), len(new))
+        if self.lazy_data_types or not dictionaries:
+            return
+        if progress is not None:
+            progress("Reading data type dictionaries")
+        if not await self._load_type_dictionaries() and self.type_cache:
+            # not read again while the model stays the same
+            self.type_cache.save(uri, key, types, dictionaries=False)
+
+    async def _read_data_types(self, progress=None):
+        # all custom data types of the server, cached for the next connect
+        types = await load_data_types(self, progress)
+        self.data_types_loaded = True
+        logger.info("%s custom data types read", len(types))
+        if self.type_cache and self._model_key is not None:
+            self.type_cache.save(*self._model_key, types)
+        return types
+
+    async def _load_type_dictionaries(self):
+        # structures of spec <= 1.03 type dictionaries, False if the server
+        # has none
         try:
-            self.client.load_enums()
-            self.client.load_type_definitions()
+            dictionaries, _ = await self.client.aio_obj.load_type_definitions()
         except Exception:
             logger.exception("Loading custom stuff with spec <= 1.03 did not work")
-        self.save_security_settings(uri)
+            return True
+        return bool(dictionaries)
+
+    async def load_node_data_types_async(self, nodes):
+        """
+        make sure there are classes for the DataType of variable nodes. In
+        lazy mode all data types are read the first time a node needs one.
+        return {name: class} of the types read
+        """
+        if self.data_types_loaded or not nodes:
+            return {}
+        dvs = await self.read_attributes_async(nodes, ua.AttributeIds.DataType)
+        missing = [
+            dv.Value.Value
+            for dv in dvs
+            if dv.StatusCode.is_good()
+            and isinstance(dv.Value.Value, ua.NodeId)
+            and not is_registered(dv.Value.Value)
+        ]
+        if not missing:
+            return {}
+        logger.info("Reading data types, %s is needed", missing[0])
+        types = await self._read_data_types()
+        return {datatype.name: getattr(ua, datatype.name) for datatype in types}
 
     def disconnect(self):
+        self.loop.run(self.disconnect_async())
+
+    async def disconnect_async(self):
         if self._connected:
-            print("Disconnecting from server")
-            self._connected = False
-            try:
-                self.client.disconnect()
-            finally:
-                self._reset()
+            logger.info("Disconnecting from server")
+            client = self.client.aio_obj
+            # forgotten first, a connect submitted meanwhile starts afresh
+            self._reset()
+            await client.disconnect()
+
+    async def _create_subscription(self, handler, period=500):
+        aio_sub = await self.client.aio_obj.create_subscription(
+            period, _SyncNodeHandler(self.loop.tloop, handler)
+        )
+        return Subscription(self.loop.tloop, aio_sub)
 
     def subscribe_datachange(self, node, handler):
-        if not self._datachange_sub:
-            self._datachange_sub = self.client.create_subscription(500, handler)
-        handle = self._datachange_sub.subscribe_data_change(node)
-        self._subs_dc[node.nodeid] = handle
+        return self.loop.run(self.subscribe_datachange_async(node, handler))
+
+    async def subscribe_datachange_async(self, node, handler):
+        handle = (await self.subscribe_datachange_list_async([node], handler))[0]
+        if isinstance(handle, ua.StatusCode):
+            handle.check()
         return handle
 
+    def subscribe_datachange_list(self, nodes, handler):
+        return self.loop.run(self.subscribe_datachange_list_async(nodes, handler))
+
+    async def subscribe_datachange_list_async(self, nodes, handler):
+        """
+        subscribe to many nodes with one CreateMonitoredItems per chunk.
+        return one handle per node, or the StatusCode if it failed
+        """
+        async with self._subscription_lock():
+            if not self._datachange_sub:
+                self._datachange_sub = await self._create_subscription(handler)
+        nodes = [self._sync_node(node) for node in nodes]
+        try:
+            await self.load_node_data_types_async(nodes)
+        except Exception as ex:
+            logger.warning("Could not read data types of %s: %r", nodes, ex)
+        handles = await self._bulk(
+            nodes,
+            self.capabilities.max_monitored_items_per_call,
+            lambda chunk: self._datachange_sub.aio_obj.subscribe_data_change(
+                [node.aio_obj for node in chunk]
+            ),
+        )
+        for node, handle in zip(nodes, handles):
+            if not isinstance(handle, ua.StatusCode):
+                self._subs_dc[node.nodeid] = handle
+        return handles
+
     def unsubscribe_datachange(self, node):
-        self._datachange_sub.unsubscribe(self._subs_dc[node.nodeid])
+        self.loop.run(self.unsubscribe_datachange_async(node))
+
+    async def unsubscribe_datachange_async(self, node):
+        await self.unsubscribe_datachange_list_async([node])
+
+    def unsubscribe_datachange_list(self, nodes):
+        self.loop.run(self.unsubscribe_datachange_list_async(nodes))
+
+    async def unsubscribe_datachange_list_async(self, nodes):
+        """
+        unsubscribe from many nodes with one DeleteMonitoredItems per chunk
+        """
+        handles = [
+            self._subs_dc.pop(node.nodeid)
+            for node in nodes
+            if node.nodeid in self._subs_dc
+        ]
+        if not handles:
+            return
+        await self._bulk(
+            handles,
+            self.capabilities.max_monitored_items_per_call,
+            self._datachange_sub.aio_obj.unsubscribe,
+        )
+
+    def subscribe_graph_list(self, nodes, handler, sampling_interval):
+        return self.loop.run(
+            self.subscribe_graph_list_async(nodes, handler, sampling_interval)
+        )
+
+    async def subscribe_graph_list_async(self, nodes, handler, sampling_interval):
+        """
+        subscribe graph channels, on their own subscription so they do not
+        interfere with the data change view.
+        the queue of each item holds all samples taken between two publishes
+        so no change is lost. return one handle or StatusCode per node
+        """
+        async with self._subscription_lock():
+            if not self._graph_sub:
+                self._graph_sub = await self._create_subscription(handler)
+        period = self._graph_sub.aio_obj.parameters.RequestedPublishingInterval
+        queuesize = max(1, math.ceil(period / max(sampling_interval, 1)))
+        nodes = [self._sync_node(node) for node in nodes]
+        handles = await self._bulk(
+            nodes,
+            self.capabilities.max_monitored_items_per_call,
+            lambda chunk: self._graph_sub.aio_obj.subscribe_data_change(
+                [node.aio_obj for node in chunk],
+                queuesize=queuesize,
+                sampling_interval=sampling_interval,
+            ),
+        )
+        for node, handle in zip(nodes, handles):
+            if not isinstance(handle, ua.StatusCode):
+                self._subs_graph[node.nodeid] = handle
+        return handles
+
+    def unsubscribe_graph_list(self, nodes):
+        self.loop.run(self.unsubscribe_graph_list_async(nodes))
+
+    async def unsubscribe_graph_list_async(self, nodes):
+        handles = [
+            self._subs_graph.pop(node.nodeid)
+            for node in nodes
+            if node.nodeid in self._subs_graph
+        ]
+        if not handles:
+            return
+        await self._bulk(
+            handles,
+            self.capabilities.max_monitored_items_per_call,
+            self._graph_sub.aio_obj.unsubscribe,
+        )
 
     def subscribe_events(self, node, handler):
-        if not self._event_sub:
-            print("subscirbing with handler: ", handler, dir(handler))
-            self._event_sub = self.client.create_subscription(500, handler)
-        handle = self._event_sub.subscribe_events(node)
-        self._subs_ev[node.nodeid] = handle
+        return self.loop.run(self.subscribe_events_async(node, handler))
+
+    async def subscribe_events_async(self, node, handler):
+        handle = (await self.subscribe_events_list_async([node], handler))[0]
+        if isinstance(handle, ua.StatusCode):
+            handle.check()
         return handle
 
+    def subscribe_events_list(self, nodes, handler):
+        return self.loop.run(self.subscribe_events_list_async(nodes, handler))
+
+    async def subscribe_events_list_async(self, nodes, handler):
+        """
+        subscribe to events of many nodes with one CreateMonitoredItems per chunk.
+        return one handle per node, or the StatusCode if it failed
+        """
+        async with self._subscription_lock():
+            if not self._event_sub:
+                logger.info("Subscribing to events with handler %s", handler)
+                self._event_sub = await self._create_subscription(handler)
+        nodes = [self._sync_node(node) for node in nodes]
+        evfilter = await get_filter_from_event_type(
+            [self.client.aio_obj.get_node(ua.ObjectIds.BaseEventType)],
+            where_clause_generation=False,
+        )
+        # Subscription.subscribe_events() takes a single source node and
+        # sends one CreateMonitoredItems per call. _subscribe() is what it
+        # calls with the filter built above and accepts a list of nodes, so
+        # each chunk is one request. It is private, requirements.txt pins
+        # the asyncua version it was checked against
+        handles = await self._bulk(
+            nodes,
+            self.capabilities.max_monitored_items_per_call,
+            lambda chunk: self._event_sub.aio_obj._subscribe(
+                [node.aio_obj for node in chunk],
+                ua.AttributeIds.EventNotifier,
+                evfilter,
+            ),
+        )
+        for node, handle in zip(nodes, handles):
+            if not isinstance(handle, ua.StatusCode):
+                self._subs_ev[node.nodeid] = handle
+        return handles
+
     def unsubscribe_events(self, node):
-        self._event_sub.unsubscribe(self._subs_ev[node.nodeid])
+        self.loop.run(self.unsubscribe_events_async(node))
+
+    async def unsubscribe_events_async(self, node):
+        await self.unsubscribe_events_list_async([node])
+
+    def unsubscribe_events_list(self, nodes):
+        self.loop.run(self.unsubscribe_events_list_async(nodes))
+
+    async def unsubscribe_events_list_async(self, nodes):
+        handles = [
+            self._subs_ev.pop(node.nodeid)
+            for node in nodes
+            if node.nodeid in self._subs_ev
+        ]
+        if not handles:
+            return
+        await self._bulk(
+            handles,
+            self.capabilities.max_monitored_items_per_call,
+            self._event_sub.aio_obj.unsubscribe,
+        )
+
+    def subscribe_model_changes(self, handler):
+        return self.loop.run(self.subscribe_model_changes_async(handler))
+
+    async def subscribe_model_changes_async(self, handler):
+        """
+        watch GeneralModelChangeEvents and SemanticChangeEvents of the server.
+        For each event the cached references of affected nodes and of their
+        parents are dropped, then handler.model_changed(change) is called
+        with the ModelChange, in the thread of the loop
+        """
+        async with self._subscription_lock():
+            if self._model_sub:
+                return
+            evfilter = await get_filter_from_event_type(
+                [
+                    self.client.aio_obj.get_node(
+                        ua.ObjectIds.GeneralModelChangeEventType
+                    ),
+                    self.client.aio_obj.get_node(ua.ObjectIds.SemanticChangeEventType),
+                ]
+            )
+            sub = await self.client.aio_obj.create_subscription(
+                500, _ModelChangeHandler(self, handler)
+            )
+            handle = (
+                await sub._subscribe(
+                    [self.client.aio_obj.nodes.server],
+                    ua.AttributeIds.EventNotifier,
+                    evfilter,
+                )
+            )[0]
+            if isinstance(handle, ua.StatusCode):
+                await sub.delete()
+                handle.check()
+            self._model_sub = sub
+
+    async def invalidate_async(self, change):
+        """
+        drop the cached references of nodes made stale by change, a
+        ModelChange. The parents of added and deleted nodes are added to
+        change.references: the cached ones, and for added nodes those
+        found by browsing
+        """
+        if change.everything:
+            self.browse_cache.clear()
+            return
+        for nodeid in change.added | change.deleted:
+            change.references |= self.browse_cache.referrers(nodeid)
+        for nodeid in change.references | change.added | change.deleted:
+            self.browse_cache.invalidate(nodeid)
+        if change.added:
+            parents = await self.browse_async(list(change.added), PARENTS)
+            for descs in parents.values():
+                if not isinstance(descs, ua.StatusCode):
+                    change.references.update(desc.NodeId for desc in descs)
+            for nodeid in change.references:
+                self.browse_cache.invalidate(nodeid)
+
+    def _chunks(self, items, limit=0):
+        size = min(limit, self.max_items_per_call) if limit else self.max_items_per_call
+        for start in range(0, len(items), size):
+            end = start + size
+            yield items[start:end]
+
+    async def _bulk(self, items, limit, func):
+        """
+        split items in chunks respecting the server limit and run func on
+        up to max_concurrent_requests chunks at a time.
+        return the results of all chunks concatenated in order
+        """
+        chunks = list(self._chunks(list(items), limit))
+        if len(chunks) == 1:
+            return list(await func(chunks[0]) or [])
+        semaphore = asyncio.Semaphore(self.max_concurrent_requests)
+
+        async def run(chunk):
+            async with semaphore:
+                return await func(chunk)
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        return [item for result in results for item in result or []]
+
+    def _subscription_lock(self):
+        # created lazily so it belongs to the loop running in our thread
+        if self._sub_lock is None:
+            self._sub_lock = asyncio.Lock()
+        return self._sub_lock
 
     def get_node_attrs(self, node):
-        if not isinstance(node, SyncNode):
-            node = self.client.get_node(node)
-        attrs = node.read_attributes(
+        return self.loop.run(self.get_node_attrs_async(node))
+
+    async def get_node_attrs_async(self, node):
+        node = self._sync_node(node)
+        attrs = await node.aio_obj.read_attributes(
             [
                 ua.AttributeIds.DisplayName,
                 ua.AttributeIds.BrowseName,
@@ -184,8 +792,592 @@ class UaClient(object):
         )
         return node, [attr.Value.Value.to_string() for attr in attrs]
 
-    @staticmethod
-    def get_children(node):
-        descs = node.get_children_descriptions()
-        descs.sort(key=lambda x: x.BrowseName)
+    def read_node_view(self, node):
+        return self.loop.run(self.read_node_view_async(node))
+
+    async def read_node_view_async(self, node):
+        """
+        what the attribute and reference views show of node, read with one
+        Read of all attributes and one Browse, sent together.
+        return [(AttributeId, DataValue)] of the readable attributes sorted
+        by name, and the forward references of node
+        """
+        attrs, refs = await asyncio.gather(
+            self.read_all_attributes_async(node), self.get_references_async(node)
+        )
+        return attrs, refs
+
+    async def read_all_attributes_async(self, node):
+        """
+        readable attributes of node with one Read.
+        return [(AttributeId, DataValue)] sorted by name
+        """
+        attrs = list(ua.AttributeIds)
+        dvs = await self.read_node_attributes_async(node, attrs)
+        values = [(attr, dv) for attr, dv in zip(attrs, dvs) if dv.StatusCode.is_good()]
+        values.sort(key=lambda x: x[0].name)
+        return values
+
+    async def get_references_async(self, node):
+        """
+        forward references of node sorted by BrowseName, see browse_async()
+        """
+        nodeid = self._aio_node(node).nodeid
+        refs = (await self.browse_async([nodeid], REFERENCES))[nodeid]
+        if isinstance(refs, ua.StatusCode):
+            refs.check()
+        return refs
+
+    async def get_display_name_async(self, node):
+        dname = await self._aio_node(node).read_display_name()
+        return str(dname.Text)
+
+    def get_display_names(self, nodes):
+        return self.loop.run(self.get_display_names_async(nodes))
+
+    async def get_display_names_async(self, nodes):
+        """
+        read DisplayName of many nodes with one Read per chunk
+        """
+        dvs = await self.read_attributes_async(nodes, ua.AttributeIds.DisplayName)
+        names = []
+        for node, dv in zip(nodes, dvs):
+            if dv.StatusCode.is_good():
+                names.append(str(dv.Value.Value.Text))
+            else:
+                names.append(node.nodeid.to_string())
+        return names
+
+    def read_attributes(self, nodes, attr=ua.AttributeIds.Value):
+        return self.loop.run(self.read_attributes_async(nodes, attr))
+
+    async def read_attributes_async(self, nodes, attr=ua.AttributeIds.Value):
+        """
+        read one attribute of many nodes, in chunks of MaxNodesPerRead
+        """
+        return await self._bulk(
+            [self._aio_node(node) for node in nodes],
+            self.capabilities.max_nodes_per_read,
+            lambda chunk: self.client.aio_obj.read_attributes(chunk, attr),
+        )
+
+    async def read_node_attributes_async(self, node, attrs):
+        """
+        read many attributes of one node with one Read
+        """
+        return await self._aio_node(node).read_attributes(attrs)
+
+    async def read_description_async(self, node):
+        """
+        ReferenceDescription of node read from its attributes, for nodes
+        not reached by browsing like the root of the tree
+        """
+        dvs = await self.read_node_attributes_async(
+            node,
+            [
+                ua.AttributeIds.DisplayName,
+                ua.AttributeIds.BrowseName,
+                ua.AttributeIds.NodeId,
+                ua.AttributeIds.NodeClass,
+            ],
+        )
+        desc = ua.ReferenceDescription()
+        desc.DisplayName, desc.BrowseName, desc.NodeId, desc.NodeClass = [
+            dv.Value.Value for dv in dvs
+        ]
+        desc.TypeDefinition = ua.TwoByteNodeId(ua.ObjectIds.FolderType)
+        return desc
+
+    def read_values(self, nodes, timestamps=ua.TimestampsToReturn.Both):
+        return self.loop.run(self.read_values_async(nodes, timestamps))
+
+    async def read_values_async(self, nodes, timestamps=ua.TimestampsToReturn.Both):
+        """
+        read Value of many nodes with one Read per chunk of MaxNodesPerRead,
+        asking for the given timestamps
+        """
+
+        async def read(chunk):
+            params = ua.ReadParameters()
+            params.TimestampsToReturn = timestamps
+            for node in chunk:
+                rv = ua.ReadValueId()
+                rv.NodeId = node.nodeid
+                rv.AttributeId = ua.AttributeIds.Value
+                params.NodesToRead.append(rv)
+            return await self.client.aio_obj.uaclient.read(params)
+
+        return await self._bulk(
+            [self._aio_node(node) for node in nodes],
+            self.capabilities.max_nodes_per_read,
+            read,
+        )
+
+    async def register_nodes_async(self, nodes):
+        """
+        register nodes for repeated access.
+        return new Node objects using the server assigned NodeIds,
+        the given nodes are left untouched
+        """
+        registered = [Node(self.client.aio_obj, node.nodeid) for node in nodes]
+        return await self._bulk(
+            registered,
+            self.capabilities.max_nodes_per_register_nodes,
+            self.client.aio_obj.register_nodes,
+        )
+
+    async def unregister_nodes_async(self, nodes):
+        await self._bulk(
+            [self._aio_node(node) for node in nodes],
+            self.capabilities.max_nodes_per_register_nodes,
+            self.client.aio_obj.unregister_nodes,
+        )
+
+    def write_values(self, nodes, values):
+        return self.loop.run(self.write_values_async(nodes, values))
+
+    async def write_values_async(self, nodes, values):
+        """
+        write values of many nodes, in chunks of MaxNodesPerWrite.
+        return one StatusCode per node
+        """
+        pairs = list(zip([self._aio_node(node) for node in nodes], values))
+        return await self._bulk(
+            pairs,
+            self.capabilities.max_nodes_per_write,
+            lambda chunk: self.client.aio_obj.write_values(
+                [node for node, _ in chunk],
+                [value for _, value in chunk],
+                raise_on_partial_error=False,
+            ),
+        )
+
+    def browse_nodes(self, nodes):
+        return self.loop.run(self.browse_nodes_async(nodes))
+
+    async def browse_nodes_async(self, nodes):
+        """
+        browse many nodes, in chunks of MaxNodesPerBrowse.
+        return one BrowseResult per node
+        """
+        results = await self._bulk(
+            [self._aio_node(node) for node in nodes],
+            self.capabilities.max_nodes_per_browse,
+            self.client.aio_obj.browse_nodes,
+        )
+        return [result for _, result in results]
+
+    def get_children(self, node):
+        return self.loop.run(self.get_children_async(node))
+
+    async def get_children_async(self, node):
+        """
+        hierarchical children of node sorted by BrowseName, see browse_async()
+        """
+        nodeid = self._aio_node(node).nodeid
+        descs = (await self.browse_async([nodeid]))[nodeid]
+        if isinstance(descs, ua.StatusCode):
+            descs.check()
         return descs
+
+    def get_children_list(self, nodes):
+        return self.loop.run(self.get_children_list_async(nodes))
+
+    async def get_children_list_async(self, nodes):
+        """
+        children of many nodes like get_children_async().
+        return {nodeid: descriptions}, nodes which cannot be browsed are left out
+        """
+        results = await self.browse_async(nodes)
+        for nodeid, descs in list(results.items()):
+            if isinstance(descs, ua.StatusCode):
+                logger.info("Could not browse %s: %s", nodeid, descs.name)
+                del results[nodeid]
+        return results
+
+    async def browse_async(self, nodes, browse_filter=CHILDREN, cache=True):
+        """
+        references of many nodes sorted by BrowseName, from browse_cache
+        if possible. The other nodes are browsed in chunks of
+        MaxNodesPerBrowse, following continuation points with BrowseNext.
+        With cache False all nodes are browsed and browse_cache is left
+        alone, e.g. to walk a whole address space.
+        return {nodeid: descriptions, or the StatusCode if browsing failed}
+        """
+        results = {}
+        missing = []
+        for node in nodes:
+            nodeid = self._aio_node(node).nodeid
+            descs = self.browse_cache.get(nodeid, browse_filter) if cache else None
+            if descs is not None:
+                results[nodeid] = list(descs)
+            elif nodeid not in missing:
+                missing.append(nodeid)
+        limit = self.capabilities.max_nodes_per_browse
+        points = self.capabilities.max_browse_continuation_points
+        if points:
+            # chunks browsed concurrently may all hold continuation points,
+            # besides the ones of pages held by callers
+            points = max(1, points - len(self._page_points))
+            share = max(1, points // self.max_concurrent_requests)
+            limit = min(limit, share) if limit else share
+        browsed = await self._bulk(
+            missing, limit, lambda chunk: self._browse(chunk, browse_filter)
+        )
+        for nodeid, descs in zip(missing, browsed):
+            if not isinstance(descs, ua.StatusCode):
+                descs.sort(key=lambda x: x.BrowseName)
+                if cache:
+                    self.browse_cache.put(nodeid, descs, browse_filter)
+                    descs = list(descs)
+            results[nodeid] = descs
+        return results
+
+    async def browse_page_async(
+        self, node, max_references, browse_filter=CHILDREN, cache=True
+    ):
+        """
+        first max_references references of node, in the order of the server,
+        and the continuation point of the next page or None.
+        Complete results are cached like by browse_async(), with cache
+        False the server is asked even if node is cached
+        """
+        nodeid = self._aio_node(node).nodeid
+        descs = self.browse_cache.get(nodeid, browse_filter) if cache else None
+        if descs is not None:
+            return list(descs), None
+        params = self._browse_parameters([nodeid], browse_filter, max_references)
+        result = (await self.client.aio_obj.uaclient.browse(params))[0]
+        result.StatusCode.check()
+        descs = list(result.References or [])
+        if result.ContinuationPoint:
+            self._page_points.add(result.ContinuationPoint)
+            return descs, result.ContinuationPoint
+        self.browse_cache.put(
+            nodeid, sorted(descs, key=lambda x: x.BrowseName), browse_filter
+        )
+        return descs, None
+
+    async def browse_next_page_async(self, point):
+        """
+        next page of references for a continuation point of
+        browse_page_async(), with the continuation point of the following page
+        """
+        self._page_points.discard(point)
+        result = (await self._browse_next([point]))[0]
+        result.StatusCode.check()
+        if result.ContinuationPoint:
+            self._page_points.add(result.ContinuationPoint)
+        return list(result.References or []), result.ContinuationPoint or None
+
+    @property
+    def held_continuation_points(self):
+        """
+        continuation points of browse_page_async() not given back yet
+        """
+        return len(self._page_points)
+
+    async def release_continuation_points_async(self, points):
+        self._page_points.difference_update(points)
+        if points and self._connected:
+            await self._browse_next(list(points), release=True)
+
+    def _browse_parameters(self, nodeids, browse_filter, max_references):
+        params = ua.BrowseParameters()
+        params.View = ua.ViewDescription()
+        params.RequestedMaxReferencesPerNode = max_references
+        params.NodesToBrowse = [browse_filter.description(nodeid) for nodeid in nodeids]
+        return params
+
+    async def _browse(self, nodeids, browse_filter):
+        # one Browse, then BrowseNext for all nodes with more references
+        params = self._browse_parameters(
+            nodeids, browse_filter, self.max_references_per_browse
+        )
+        results = []
+        pending = []  # (index in results, continuation point held by the server)
+        for result in await self.client.aio_obj.uaclient.browse(params):
+            if result.StatusCode.is_good():
+                if result.ContinuationPoint:
+                    pending.append((len(results), result.ContinuationPoint))
+                results.append(list(result.References or []))
+            else:
+                results.append(result.StatusCode)
+        try:
+            while pending:
+                next_results = await self._browse_next([point for _, point in pending])
+                current, pending = pending, []
+                for (i, _), result in zip(current, next_results):
+                    if not result.StatusCode.is_good():
+                        results[i] = result.StatusCode
+                        continue
+                    results[i].extend(result.References or [])
+                    if result.ContinuationPoint:
+                        pending.append((i, result.ContinuationPoint))
+        finally:
+            if pending and self._connected:
+                try:
+                    await self._browse_next(
+                        [point for _, point in pending], release=True
+                    )
+                except Exception as ex:
+                    logger.warning("Could not release continuation points: %r", ex)
+        return results
+
+    async def _browse_next(self, points, release=False):
+        params = ua.BrowseNextParameters()
+        params.ReleaseContinuationPoints = release
+        params.ContinuationPoints = points
+        return await self.client.aio_obj.uaclient.browse_next(params)
+
+    async def get_path_async(self, node):
+        path = await self._aio_node(node).get_path()
+        return [self._sync_node(n) for n in path]
+
+    def read_history(self, node, start, end, max_values=0):
+        return self.loop.run(self.read_history_async(node, start, end, max_values))
+
+    async def read_history_async(self, node, start, end, max_values=0):
+        """
+        read raw history of node between start and end datetimes, following
+        continuation points until max_values values are read (0 for all).
+        return (timestamps, values) as array("d") of POSIX seconds and
+        floats sorted by time, bad and non numeric values are skipped
+        """
+        page_size = self.history_page_size
+        if max_values:
+            page_size = min(page_size, max_values)
+        details = ua.ReadRawModifiedDetails(
+            IsReadModified=False,
+            StartTime=start,
+            EndTime=end,
+            NumValuesPerNode=page_size,
+            ReturnBounds=False,
+        )
+        return await self._collect_history(node, details, max_values)
+
+    def read_processed_history(self, node, start, end, interval, aggregate):
+        return self.loop.run(
+            self.read_processed_history_async(node, start, end, interval, aggregate)
+        )
+
+    async def read_processed_history_async(self, node, start, end, interval, aggregate):
+        """
+        read history of node computed by the server with the aggregate
+        function (an ObjectIds.AggregateFunction_* id), one value per
+        interval seconds. return (timestamps, values) like read_history
+        """
+        details = ua.ReadProcessedDetails(
+            StartTime=start,
+            EndTime=end,
+            ProcessingInterval=interval * 1000,
+            AggregateType=[ua.NodeId(aggregate)],
+        )
+        return await self._collect_history(node, details)
+
+    async def _collect_history(self, node, details, max_values=0):
+        times, values = array("d"), array("d")
+        failed = {}
+        pages = self.history_pages_async([node], details, failed)
+        try:
+            async for _, datavalues in pages:
+                for dv in datavalues:
+                    timestamp = dv.SourceTimestamp or dv.ServerTimestamp
+                    if not dv.StatusCode.is_good() or timestamp is None:
+                        continue
+                    try:
+                        value = float(dv.Value.Value)
+                    except (TypeError, ValueError):
+                        continue
+                    times.append(timestamp.timestamp())
+                    values.append(value)
+                if max_values and len(values) >= max_values:
+                    del times[max_values:]
+                    del values[max_values:]
+                    break
+        finally:
+            await pages.aclose()
+        for status in failed.values():
+            status.check()
+        if any(a > b for a, b in zip(times, times[1:])):
+            samples = sorted(zip(times, values))
+            times = array("d", (t for t, _ in samples))
+            values = array("d", (v for _, v in samples))
+        return times, values
+
+    async def history_pages_async(self, nodes, details, failed=None):
+        """
+        yield (node, DataValues) pages of the history of many nodes,
+        reading all nodes with one HistoryRead per chunk of
+        MaxNodesPerHistoryReadData and following continuation points.
+        Nodes whose history cannot be read are logged and skipped, their
+        StatusCode stored by NodeId in failed if given, the others are
+        paged on. Continuation points still held are released when the
+        generator is closed early
+        """
+        nodes = [self._aio_node(node) for node in nodes]
+        points = {}  # index in nodes -> continuation point held by the server
+        todo = list(range(len(nodes)))
+        try:
+            while todo:
+                current, todo = todo, []
+                limit = self.capabilities.max_nodes_per_history_read_data
+                for chunk in self._chunks(current, limit):
+                    results = await self._history_read(
+                        [(nodes[i], points.pop(i, None)) for i in chunk], details
+                    )
+                    dropped = {}  # continuation points of failed nodes
+                    for i, result in zip(chunk, results):
+                        if not result.StatusCode.is_good():
+                            logger.warning(
+                                "Reading history of %s failed: %s",
+                                nodes[i].nodeid.to_string(),
+                                result.StatusCode.name,
+                            )
+                            if failed is not None:
+                                failed[nodes[i].nodeid] = result.StatusCode
+                            if result.ContinuationPoint:
+                                dropped[i] = result.ContinuationPoint
+                        elif result.ContinuationPoint:
+                            points[i] = result.ContinuationPoint
+                            todo.append(i)
+                    await self._release_history_points(nodes, dropped, details)
+                    for i, result in zip(chunk, results):
+                        if result.StatusCode.is_good():
+                            yield nodes[i], result.HistoryData.DataValues or []
+        finally:
+            await self._release_history_points(nodes, points, details)
+
+    async def _release_history_points(self, nodes, points, details):
+        # points maps indexes in nodes to their continuation point
+        if points and self._connected:
+            try:
+                await self._history_read(
+                    [(nodes[i], point) for i, point in points.items()],
+                    details,
+                    release=True,
+                )
+            except Exception as ex:
+                logger.warning("Could not release continuation points: %r", ex)
+
+    async def raw_history_pages_async(self, nodes, start, end, failed=None):
+        """
+        yield (node, DataValues) pages of the raw history of many nodes
+        between start and end datetimes, pages of different nodes in no
+        particular order. Failed nodes are skipped like by
+        history_pages_async().
+        Nodes are split in up to max_concurrent_requests groups read
+        concurrently, each request asking about history_page_size values
+        in total. Pages are handed over through a queue of one page per
+        group, so memory stays bounded whatever the length of the history
+        """
+        nodes = [self._aio_node(node) for node in nodes]
+        if not nodes:
+            return
+        count = min(self.max_concurrent_requests, len(nodes))
+        groups = [nodes[i::count] for i in range(count)]
+        limit = self.capabilities.max_nodes_per_history_read_data
+        per_request = len(next(self._chunks(groups[0], limit)))
+        details = ua.ReadRawModifiedDetails(
+            IsReadModified=False,
+            StartTime=start,
+            EndTime=end,
+            NumValuesPerNode=max(1, self.history_page_size // per_request),
+            ReturnBounds=False,
+        )
+        queue = asyncio.Queue(count)
+
+        async def read(group):
+            # a group ends with None or the exception it failed with
+            pages = self.history_pages_async(group, details, failed)
+            try:
+                async for page in pages:
+                    await queue.put(page)
+                await queue.put(None)
+            except Exception as ex:
+                await queue.put(ex)
+            finally:
+                await pages.aclose()
+
+        tasks = [asyncio.ensure_future(read(group)) for group in groups]
+        try:
+            while count:
+                page = await queue.get()
+                if page is None:
+                    count -= 1
+                elif isinstance(page, Exception):
+                    raise page
+                else:
+                    yield page
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _history_read(self, items, details, release=False):
+        params = ua.HistoryReadParameters()
+        params.HistoryReadDetails = details
+        params.TimestampsToReturn = ua.TimestampsToReturn.Both
+        params.ReleaseContinuationPoints = release
+        for node, point in items:
+            rv = ua.HistoryReadValueId()
+            rv.NodeId = node.nodeid
+            rv.ContinuationPoint = point
+            params.NodesToRead.append(rv)
+        return await self.client.aio_obj.uaclient.history_read(params)
+
+
+def _server_certificate(endpoint):
+    # like asyncua, keep the first certificate of a chain
+    length = int.from_bytes(endpoint.ServerCertificate[2:4], byteorder="big") + 4
+    return endpoint.ServerCertificate[:length]
+
+
+def format_timings(timings):
+    """
+    "stage 12 ms, ..." for the log
+    """
+    return ", ".join(
+        f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in timings.items()
+    )
+
+
+class _ModelChangeHandler(object):
+    """
+    invalidate caches of UaClient on model change events, then tell handler
+    """
+
+    def __init__(self, uaclient, handler):
+        self.uaclient = uaclient
+        self.handler = handler
+
+    async def event_notification(self, event):
+        change = ModelChange.from_event(event)
+        try:
+            await self.uaclient.invalidate_async(change)
+        except Exception as ex:
+            # whatever could not be narrowed down is read again
+            logger.warning("Could not find nodes affected by %s: %r", event, ex)
+            change.everything = True
+            self.uaclient.browse_cache.clear()
+        self.handler.model_changed(change)
+
+
+class _SyncNodeHandler(object):
+    """
+    hand SyncNode objects to the GUI handlers, which store and compare them
+    """
+
+    def __init__(self, tloop, handler):
+        self.tloop = tloop
+        self.handler = handler
+
+    def datachange_notification(self, node, val, data):
+        self.handler.datachange_notification(SyncNode(self.tloop, node), val, data)
+
+    def event_notification(self, event):
+        self.handler.event_notification(event)
+
+    def status_change_notification(self, status):
+        if hasattr(self.handler, "status_change_notification"):
+            self.handler.status_change_notification(status)
@@ -0,0 +1,106 @@
+import dataclasses
+
+from asyncua import ua
+
+
+class ValueFormatter(object):
+    """
+    Turn variant values into display text.
+    One formatting function is built per DataType of the node, VariantType
+    and arrayness, and cached.
+    Arrays and structures are truncated so the cost of formatting a cell
+    does not depend on the size of the value
+    """
+
+    def __init__(self, max_items=20, max_chars=200, max_depth=2):
+        self.max_items = max_items
+        self.max_chars = max_chars
+        self.max_depth = max_depth
+        self._formatters = {}
+
+    def format(self, variant, data_type=None):
+        """
+        text of variant, a value of a node of DataType data_type, a NodeId
+        or None if unknown
+        """
+        key = (data_type, variant.VariantType, bool(variant.is_array))
+        func = self._formatters.get(key)
+        if func is None:
+            func = self._formatters[key] = self._make_formatter(*key)
+        return func(variant.Value)
+
+    def _make_formatter(self, data_type, variant_type, is_array):
+        cls = ua.extension_objects_by_datatype.get(data_type)
+        if variant_type == ua.VariantType.ExtensionObject and cls is not None:
+            scalar = self._make_struct_formatter(cls)
+        elif variant_type == ua.VariantType.ExtensionObject:
+            scalar = self._format_struct
+        elif variant_type == ua.VariantType.ByteString:
+            scalar = self._format_bytes
+        else:
+            scalar = self._format_text
+        if is_array:
+            return lambda value: self._truncate(self._format_list(value, scalar))
+        return scalar  # scalar formatters bound their own output
+
+    def _truncate(self, text):
+        if len(text) > self.max_chars:
+            return text[: self.max_chars] + "..."
+        return text
+
+    def _format_text(self, value, depth=0):
+        return self._truncate(str(value))
+
+    def _format_bytes(self, value, depth=0):
+        if value is None:
+            return "None"
+        text = value[: self.max_chars // 2].hex()
+        if len(value) > self.max_chars // 2:
+            text += f"... ({len(value)} bytes)"
+        return text
+
+    def _format_list(self, value, scalar, depth=0):
+        if value is None:
+            return "None"
+        items = []
+        for item in value[: self.max_items]:
+            if isinstance(item, (list, tuple)):  # matrix
+                items.append(self._format_list(item, scalar, depth + 1))
+            else:
+                items.append(scalar(item, depth + 1))
+        if len(value) > self.max_items:
+            items.append(f"... ({len(value)} items)")
+        return "[" + ", ".join(items) + "]"
+
+    def _make_struct_formatter(self, cls):
+        # fields of the class of the DataType are looked up once
+        names = [field.name for field in dataclasses.fields(cls)]
+
+        def scalar(value, depth=0):
+            if type(value) is not cls:  # e.g. a subtype
+                return self._format_struct(value, depth)
+            return self._format_fields(value, names, depth)
+
+        return scalar
+
+    def _format_struct(self, value, depth=0):
+        if not dataclasses.is_dataclass(value):
+            return self._format_text(value)
+        names = [field.name for field in dataclasses.fields(value)]
+        return self._format_fields(value, names, depth)
+
+    def _format_fields(self, value, names, depth):
+        name = type(value).__name__
+        if depth >= self.max_depth:
+            return f"{name}(...)"
+        items = []
+        for field in names[: self.max_items]:
+            member = getattr(value, field)
+            if isinstance(member, (list, tuple)):
+                text = self._format_list(member, self._format_struct, depth + 1)
+            else:
+                text = self._format_struct(member, depth + 1)
+            items.append(f"{field}={text}")
+        if len(names) > self.max_items:
+            items.append("...")
+        return self._truncate(f"{name}(" + ", ".join(items) + ")")